@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Preparation Benchmark - Wall time, rows/s and peak RSS of each data stage on synthetic CRM exports"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import resource
+import tempfile
+import subprocess
+import contextlib
+import importlib.util
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crm_generator import brevo_export, cleaned_contacts, iter_contacts, parse_rows, write_contacts_csv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STAGES = ['load', 'prepare', 'split', 'brevo_filter']
+
+
+def _status_kb(field: str) -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def reset_peak_rss() -> bool:
+    """Restart the process high-water mark (Linux); False where only the lifetime peak is available"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb() -> float:
+    try:
+        return _status_kb('VmRSS') / 1024
+    except (OSError, KeyError):
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    try:
+        return _status_kb('VmHWM') / 1024
+    except (OSError, KeyError):
+        # ru_maxrss is in kB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+# ─── Stages (each run in its own process) ─────────────────────────────────────
+
+def _inputs(workdir: str, rows: int, seed: int) -> dict:
+    name = f'crm_{rows}_{seed}'
+    return {
+        'raw': os.path.join(workdir, f'{name}.csv'),
+        'prepared': os.path.join(workdir, f'{name}_prepared.parquet'),
+        'brevo_dir': os.path.join(workdir, f'{name}_brevo'),
+    }
+
+
+def _load_raw(paths: dict) -> pd.DataFrame:
+    return pd.read_csv(paths['raw'], dtype=str)
+
+
+def _prepared(paths: dict) -> pd.DataFrame:
+    from src.data_processor import DataProcessor
+    from src.storage import read_table, write_table
+    if not os.path.exists(paths['prepared']):
+        df, _ = DataProcessor.process_database(_load_raw(paths))
+        write_table(df, paths['prepared'])
+    return read_table(paths['prepared'])
+
+
+def _brevo_filter():
+    spec = importlib.util.spec_from_file_location('brevo_filter', os.path.join(ROOT, 'scripts', '3_filter_whatsapp_brevo.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.filter_whatsapp_contacts
+
+
+def run_stage(stage: str, paths: dict) -> dict:
+    """Sets the stage input up, then times the stage alone; returns the measurements"""
+    from src.data_processor import DataProcessor
+    from src.ab_test_splitter import ABTestSplitter
+    from src.storage import write_table
+
+    if stage == 'load':
+        def work():
+            return _load_raw(paths)
+    elif stage == 'prepare':
+        df = _load_raw(paths)
+
+        def work():
+            return DataProcessor.process_database(df)[0]
+    elif stage == 'split':
+        df = _prepared(paths)
+
+        def work():
+            return ABTestSplitter.split_contacts(df)
+    elif stage == 'brevo_filter':
+        work = _brevo_filter()
+        os.chdir(paths['brevo_dir'])
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    rss_before = rss_mb()
+    peak_is_stage = reset_peak_rss()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = work()
+        elapsed = time.perf_counter() - start
+
+    if stage == 'prepare':
+        write_table(result, paths['prepared'])
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_is_stage': peak_is_stage,
+        'output_rows': len(result),
+    }
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def ensure_inputs(paths: dict, rows: int, seed: int):
+    """Generates what is missing for this (rows, seed); files are reused across runs"""
+    if not os.path.exists(paths['raw']):
+        print(f"   Generating {rows:,} contacts -> {paths['raw']}")
+        write_contacts_csv(paths['raw'], rows, seed)
+
+    data_dir = os.path.join(paths['brevo_dir'], 'data')
+    brevo_path = os.path.join(data_dir, 'brevo_emails_sent.csv')
+    index_path = os.path.join(data_dir, 'suppression_index.parquet')
+    if not os.path.exists(brevo_path):
+        from src.storage import TableWriter
+        os.makedirs(data_dir, exist_ok=True)
+        with TableWriter(os.path.join(data_dir, 'cleaned_contacts.parquet')) as writer:
+            for i, contacts in enumerate(iter_contacts(rows, seed)):
+                writer.write(cleaned_contacts(contacts, seed + i))
+                brevo_export(contacts, seed=seed + i).to_csv(brevo_path, sep=';', index=False, mode='a' if i else 'w', header=not i)
+    if not os.path.exists(index_path):
+        # The filter stage measures a steady-state run: the export is already in the suppression index
+        from src.suppression_index import SuppressionIndex
+        SuppressionIndex(index_path).load().add_export(brevo_path)
+
+
+def measure(stage: str, rows: int, args) -> dict:
+    paths = _inputs(args.workdir, rows, args.seed)
+    child = subprocess.run([sys.executable, __file__, '--run-stage', stage, '--rows', str(rows), '--seed', str(args.seed),
+                            '--workdir', args.workdir], capture_output=True, text=True, cwd=ROOT)
+    if child.returncode != 0:
+        raise RuntimeError(f"Stage {stage} failed on {rows:,} rows:\n{child.stderr}")
+    row = json.loads(child.stdout.strip().splitlines()[-1])
+
+    input_rows = pq.ParquetFile(paths['prepared']).metadata.num_rows if stage == 'split' else rows
+    row.update({
+        'stage': stage,
+        'rows': rows,
+        'input_rows': input_rows,
+        'rows_per_s': round(input_rows / row['elapsed_s']) if row['elapsed_s'] else None,
+    })
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the data preparation stages on synthetic CRM exports')
+    parser.add_argument('--sizes', default='100k,1M', help='Comma-separated row counts, e.g. 100k,1M,10M')
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"Comma-separated: {', '.join(STAGES)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'elit_prep_bench'),
+                        help='Generated exports are kept here and reused')
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=parse_rows, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger('src').setLevel(logging.CRITICAL)
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, _inputs(args.workdir, args.rows, args.seed))))
+        return
+
+    sizes = [parse_rows(size) for size in args.sizes.split(',') if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    os.makedirs(args.workdir, exist_ok=True)
+
+    print("=" * 70)
+    print("⏱️  DATA PREPARATION BENCHMARK (synthetic CRM)")
+    print("=" * 70)
+    print(f"   Sizes: {', '.join(f'{size:,}' for size in sizes)} | seed: {args.seed} | data: {args.workdir}")
+
+    report = []
+    for rows in sizes:
+        print(f"\n▶ {rows:,} rows")
+        ensure_inputs(_inputs(args.workdir, rows, args.seed), rows, args.seed)
+        for stage in stages:
+            row = measure(stage, rows, args)
+            report.append(row)
+            peak = f"{row['peak_rss_mb']:>8,.0f} MB" + ('' if row['peak_is_stage'] else ' (process)')
+            print(f"   {stage:<13} {row['elapsed_s']:>8.2f} s | {row['rows_per_s']:>10,} rows/s | "
+                  f"peak RSS {peak} (from {row['rss_before_mb']:,.0f} MB) | out {row['output_rows']:,}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Sender Load-Test Harness - Drives the send paths against the local Twilio stand-in"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import logging
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.twilio_standin import TwilioStandIn, parse_error_mix
+from src.http_transport import PooledTwilioHttpClient, PooledAsyncTwilioHttpClient
+from src.whatsapp_sender import WhatsAppSender
+from src.async_sender import AsyncWhatsAppSender
+from src.sender_pool import SenderPool
+from src.rate_limiter import TokenBucket, AdaptiveRateLimiter
+from src.result_sink import ResultSink
+from src.metrics import sender_metrics
+
+ACCOUNT_SID = 'AC' + '0' * 32
+TEMPLATE_SID = 'HX' + '0' * 32
+
+
+class TimedStandInHttpClient(PooledTwilioHttpClient):
+    def __init__(self, base_url: str, latencies: list, pool_size: int = 1):
+        super().__init__(pool_size=pool_size, base_url=base_url)
+        self.latencies = latencies
+
+    def request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+class TimedAsyncStandInHttpClient(PooledAsyncTwilioHttpClient):
+    def __init__(self, base_url: str, latencies: list, pool_size: int = 10):
+        super().__init__(pool_size=pool_size, base_url=base_url)
+        self.latencies = latencies
+
+    async def request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().request(*args, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def build_limiter(args, capacity=None) -> TokenBucket:
+    if args.adaptive:
+        return AdaptiveRateLimiter(args.rate_limit, max_rate=args.max_rate, capacity=capacity)
+    return TokenBucket(args.rate_limit, capacity)
+
+
+def build_sender(mode: str, base_url: str, latencies: list, args):
+    if mode == 'sync':
+        return WhatsAppSender(ACCOUNT_SID, 'token', '+33100000000', rate_limit=args.rate_limit,
+                              limiter=build_limiter(args, capacity=1), http_client=TimedStandInHttpClient(base_url, latencies))
+    if mode == 'async':
+        return AsyncWhatsAppSender(ACCOUNT_SID, 'token', '+33100000000', rate_limit=args.rate_limit, concurrency=args.concurrency,
+                                   limiter=build_limiter(args), http_client_factory=lambda: TimedAsyncStandInHttpClient(base_url, latencies, args.concurrency))
+    if mode == 'pool':
+        return SenderPool([
+            AsyncWhatsAppSender(ACCOUNT_SID, 'token', f'+3310000000{i}', rate_limit=args.rate_limit, concurrency=args.concurrency,
+                                limiter=build_limiter(args), http_client_factory=lambda: TimedAsyncStandInHttpClient(base_url, latencies, args.concurrency))
+            for i in range(args.numbers)
+        ])
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def run_mode(mode: str, args) -> dict:
+    standin = TwilioStandIn(latency=args.latency, quota=args.quota, throttle_probability=args.throttle_prob,
+                            error_mix=parse_error_mix(args.error_mix), seed=args.seed)
+    contacts = [{'client_phone': f'+336{i:08d}', 'first_name': 'Client'} for i in range(args.messages)]
+    latencies = []
+
+    with standin, tempfile.TemporaryDirectory() as tmp_dir:
+        sender = build_sender(mode, standin.base_url, latencies, args)
+        with ResultSink(os.path.join(tmp_dir, 'results.ndjson.gz')) as sink:
+            summary = sender.send_batch(contacts=contacts, template_sid=TEMPLATE_SID, sink=sink)
+            counts = sink.summary()
+
+    stats = sender.get_stats()
+    http_stats = list(stats['http'].values()) if mode == 'pool' else [stats['http']]
+    snapshots = [m.snapshot() for m in sender_metrics(sender)]
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+
+    return {
+        'mode': mode,
+        'messages': args.messages,
+        'sent': counts['sent'],
+        'failed': counts['failed'],
+        'elapsed_s': round(summary['elapsed_time_seconds'], 3),
+        'msgs_per_s': round(summary['messages_per_second'], 1),
+        'api_calls': len(latencies),
+        'p50_ms': round(percentiles[49] * 1000, 1),
+        'p99_ms': round(percentiles[98] * 1000, 1),
+        'retries': counts['attempts'] - counts['total'],
+        'throttled': standin.counts['throttled'],
+        'error_counts': counts['error_counts'],
+        'final_rate': round(stats['current_rate'], 1),
+        'limiter_wait_s': round(sum(snap['limiter_wait']['sum'] for snap in snapshots), 2),
+        'connections': sum(h['connections_opened'] for h in http_stats),
+        'peak_in_flight': sum(h['peak_in_flight'] for h in http_stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark send paths against a local Twilio stand-in')
+    parser.add_argument('--modes', default='sync,async', help='Comma-separated: sync, async, pool')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--rate-limit', type=int, default=0, help='Sender RATE_LIMIT (0 = unlimited)')
+    parser.add_argument('--adaptive', action='store_true', help='Use the AIMD limiter')
+    parser.add_argument('--max-rate', type=float, default=200, help='AIMD ceiling with --adaptive')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--numbers', type=int, default=3, help='Sender numbers in pool mode')
+    parser.add_argument('--latency', default='lognormal:0.15:0.4', help="fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--quota', type=int, default=0, help='Stand-in messages/sec before 20429 (0 = unlimited)')
+    parser.add_argument('--throttle-prob', type=float, default=0.0)
+    parser.add_argument('--error-mix', default='', help="e.g. 21211=0.01,63016=0.02")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger('src').setLevel(logging.CRITICAL)
+
+    print("=" * 70)
+    print("⏱️  SENDER BENCHMARK (local Twilio stand-in)")
+    print("=" * 70)
+    print(f"   Messages: {args.messages:,} | latency: {args.latency} | quota: {args.quota or '∞'}/s | concurrency: {args.concurrency}")
+
+    report = []
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        print(f"\n▶ {mode} ...")
+        row = run_mode(mode, args)
+        report.append(row)
+        print(f"   {row['msgs_per_s']:>8,.1f} msg/s | p50 {row['p50_ms']:>7.1f} ms | p99 {row['p99_ms']:>7.1f} ms | "
+              f"retries {row['retries']:,} | throttled {row['throttled']:,} | sent {row['sent']:,}/{row['messages']:,} | "
+              f"conns {row['connections']:,} | limiter wait {row['limiter_wait_s']:,.1f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
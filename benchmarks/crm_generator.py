@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Synthetic CRM Generator - Seeded dirty contact exports shaped like the real CRM dump"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Iterator
+
+CHUNK_ROWS = 500_000
+
+FIRST_NAMES = np.array(['Jean', 'Marie', 'Pierre', 'Sophie', 'Luc', 'Anne', 'Éric', 'Hélène', 'Jean-Paul', 'Françoise',
+                        'Thomas', 'Camille', 'Nicolas', 'Léa', 'Julien', 'Chloé', 'Mohamed', 'Inès', 'Kevin', 'Zoé'], dtype=object)
+LAST_NAMES = np.array(['DUPONT', 'Martin', 'LEFEBVRE', 'Moreau', 'Bernard', 'petit', 'Roux', 'Dubois', 'GARCIA',
+                       'Lambert', 'Fontaine', 'Rousseau', 'Vincent', 'Muller', 'Faure', 'André'], dtype=object)
+CIVILITIES = np.array(['', '', '', '', '', 'M. ', 'Mme ', 'Mr ', 'Dr '], dtype=object)
+# Notes the agents type into the name field
+NAME_SUFFIXES = np.array(['', ' doit 20€', ' doit 35€ lavage', ' nous doit 15€', ' P12', ' P3 route de Lyon',
+                          ' (client VIP)', ' (portail bleu)', ' lavage int', ' impoli', ' gardée', ' effectuer rappel'], dtype=object)
+NAME_SUFFIX_WEIGHTS = np.array([.70, .04, .02, .02, .04, .02, .03, .03, .03, .02, .02, .03])
+EMAIL_DOMAINS = np.array(['gmail.com', 'orange.fr', 'hotmail.fr', 'free.fr', 'yahoo.fr', 'sfr.fr', 'laposte.net'], dtype=object)
+CITIES = np.array(['Paris', 'Lyon', 'Marseille', 'Nice', 'Toulouse', 'Bordeaux', 'Nantes', 'Lille'], dtype=object)
+JUNK_PHONES = np.array(['', 'n/a', '0000', '123', '06', 'inconnu', '+33'], dtype=object)
+
+
+def _spaced(digits: pd.Series, sep: str) -> pd.Series:
+    """'0612345678' -> '06<sep>12<sep>34<sep>56<sep>78'"""
+    pairs = [digits.str[i:i + 2] for i in range(0, 10, 2)]
+    return pairs[0] + sep + pairs[1] + sep + pairs[2] + sep + pairs[3] + sep + pairs[4]
+
+
+def _phones(person: np.ndarray, rng: np.random.Generator) -> pd.Series:
+    """One spelling of each person's number: mostly French mobiles in every usual format, some landlines, foreign and junk"""
+    n = len(person)
+    # Number owned by the person: national significant number, 9 digits
+    # Metropolitan mobile ranges only: 060-068 and 073-079
+    mobile = np.where(person % 4 == 0, 730_000_000 + person * 7_919 % 70_000_000, 600_000_000 + person * 7_919 % 90_000_000)
+    landline = 100_000_000 + (person * 104_729 % 400_000_000)
+    kind = (person * 2_654_435_761 >> 7) % 100
+    national = pd.Series(np.where(kind < 88, mobile, landline).astype(str), dtype=object)
+    zero = '0' + national
+
+    formats = [
+        zero,                               # 0612345678
+        _spaced(zero, ' '),                 # 06 12 34 56 78
+        _spaced(zero, '.'),                 # 06.12.34.56.78
+        '+33' + national,                   # +33612345678
+        '+33 ' + national.str[0] + ' ' + _spaced(zero, ' ').str[3:],   # +33 6 12 34 56 78
+        '0033' + national,                  # 0033612345678
+        '33' + national,                    # 33612345678
+        '+33 (0)' + national,               # +33 (0)612345678
+    ]
+    choice = rng.choice(len(formats), n, p=[.30, .20, .05, .20, .08, .05, .08, .04])
+    phones = np.select([choice == i for i in range(len(formats))], [f.to_numpy() for f in formats])
+
+    foreign = kind >= 96
+    phones[foreign & (kind % 2 == 0)] = ('+44 7' + pd.Series((person[foreign & (kind % 2 == 0)] % 10**9).astype(str)).str.zfill(9)).to_numpy()
+    phones[foreign & (kind % 2 == 1)] = ('+1 212' + pd.Series((2_000_000 + person[foreign & (kind % 2 == 1)] % 8_000_000).astype(str))).to_numpy()
+
+    junk = rng.random(n) < 0.02
+    phones[junk] = rng.choice(JUNK_PHONES, junk.sum())
+    phones[rng.random(n) < 0.02] = None
+    return pd.Series(phones, dtype=object)
+
+
+def _names(person: np.ndarray, rng: np.random.Generator) -> pd.Series:
+    n = len(person)
+    first = FIRST_NAMES[person % len(FIRST_NAMES)]
+    last = LAST_NAMES[(person // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    # Same person typed "Prénom NOM" or "NOM Prénom", with civilities, notes and case noise
+    last_first = rng.random(n) < 0.4
+    full = np.where(last_first, last + ' ' + first, first + ' ' + last)
+    full = rng.choice(CIVILITIES, n) + full + rng.choice(NAME_SUFFIXES, n, p=NAME_SUFFIX_WEIGHTS)
+
+    names = pd.Series(full, dtype=object)
+    case = rng.random(n)
+    names[case < 0.05] = names[case < 0.05].str.upper()
+    names[(case >= 0.05) & (case < 0.08)] = names[(case >= 0.05) & (case < 0.08)].str.lower()
+    names[rng.random(n) < 0.02] = None
+    names[rng.random(n) < 0.01] = 'X'
+    return names
+
+
+def _emails(person: np.ndarray, rng: np.random.Generator) -> pd.Series:
+    n = len(person)
+    first = pd.Series(FIRST_NAMES[person % len(FIRST_NAMES)]).str.lower()
+    last = pd.Series(LAST_NAMES[(person // len(FIRST_NAMES)) % len(LAST_NAMES)]).str.lower()
+    emails = first + '.' + last + pd.Series(person.astype(str)) + '@' + EMAIL_DOMAINS[person % len(EMAIL_DOMAINS)]
+
+    noise = rng.random(n)
+    emails[noise < 0.05] = emails[noise < 0.05].str.upper()
+    emails[(noise >= 0.05) & (noise < 0.08)] = ' ' + emails[(noise >= 0.05) & (noise < 0.08)] + ' '
+    # About half the CRM has no email; some are blank strings rather than empty cells
+    missing = rng.random(n)
+    emails[missing < 0.45] = None
+    emails[(missing >= 0.45) & (missing < 0.48)] = '  '
+    return emails.astype(object)
+
+
+def iter_contacts(rows: int, seed: int = 42, duplicate_ratio: float = 0.3,
+                  chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Raw CRM rows in chunks; the same (rows, seed) always gives the same data
+
+    About `duplicate_ratio` of the rows repeat a person from an earlier row (same number, often spelled
+    differently, with another name variant or email state).
+    """
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        rng = np.random.default_rng([seed, start])
+        person = np.arange(start, start + n)
+        repeat = (rng.random(n) < duplicate_ratio) & (person > 0)
+        person[repeat] = (rng.random(repeat.sum()) * person[repeat]).astype(np.int64)
+        yield pd.DataFrame({
+            'id': np.arange(start + 1, start + n + 1),
+            'client_name': _names(person, rng),
+            'client_phone': _phones(person, rng),
+            'client_email': _emails(person, rng),
+            'city': rng.choice(CITIES, n),
+        })
+
+
+def write_contacts_csv(path: str, rows: int, seed: int = 42, duplicate_ratio: float = 0.3) -> str:
+    for i, chunk in enumerate(iter_contacts(rows, seed, duplicate_ratio)):
+        chunk.to_csv(path, mode='a' if i else 'w', header=not i, index=False)
+    return path
+
+
+def cleaned_contacts(contacts: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """The cleaned base 3_filter_whatsapp_brevo.py reads: raw phones plus first names, scores and validity flags"""
+    rng = np.random.default_rng([seed, 1])
+    first_names = contacts['client_name'].str.extract(r'([A-Za-zÀ-ÿ-]{2,})', expand=False)
+    return pd.DataFrame({
+        'id': contacts['id'],
+        'client_phone': contacts['client_phone'],
+        'client_email': contacts['client_email'],
+        'first_name': first_names,
+        'quality_score': rng.integers(0, 6, len(contacts)).astype(np.int8),
+        'is_valid_phone': rng.choice(np.array(['True', '1', 'False'], dtype=object), len(contacts), p=[.6, .25, .15]),
+    })
+
+
+def brevo_export(contacts: pd.DataFrame, fraction: float = 0.3, seed: int = 42) -> pd.DataFrame:
+    """Brevo 'emails sent' export (EMAIL;SMS) covering `fraction` of the contacts, in Brevo's own spellings"""
+    rng = np.random.default_rng([seed, 2])
+    sample = contacts.sample(frac=fraction, random_state=rng.integers(2**31))
+    sms = sample['client_phone'].str.replace(r'[^\d+]', '', regex=True)
+    sms = sms.where(rng.random(len(sample)) < 0.5)
+    return pd.DataFrame({'EMAIL': sample['client_email'].str.strip().str.lower(), 'SMS': sms})
+
+
+def parse_rows(value: str) -> int:
+    """'100k', '1M', '2.5m', '10000' -> row count"""
+    value = value.strip().lower().replace('_', '')
+    scale = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a seeded synthetic CRM export (dirty names, phones, duplicates)')
+    parser.add_argument('--rows', type=parse_rows, default=parse_rows('100k'), help='Row count, e.g. 100k, 1M, 10M')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3, help='Share of rows repeating an earlier person')
+    parser.add_argument('--output', default='data/synthetic_crm.csv')
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_contacts_csv(args.output, args.rows, args.seed, args.duplicate_ratio)
+    print(f"💾 {args.rows:,} synthetic contacts written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
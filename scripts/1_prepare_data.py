@@ -11,7 +11,11 @@ import logging
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.data_processor import DataProcessor
-from src.ab_test_splitter import ABTestSplitter
+from src.ab_test_splitter import DEFAULT_SALT, METHODS, ABTestSplitter
+from src.chunked_prep import STREAMING_METHODS, ChunkedPreparer
+from src.parallel_prep import ParallelPreparer
+from src.incremental_prep import IncrementalPreparer
+from src.storage import FORMATS, PARTITION_COLUMN, write_partitioned, write_table
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -22,8 +26,24 @@ def main():
     parser.add_argument('--input', default='data/raw_contacts.csv', help='Input CSV file path')
     parser.add_argument('--output-dir', default='outputs', help='Output directory')
     parser.add_argument('--all-countries', action='store_true', help='Keep all countries')
+    parser.add_argument('--chunk-size', type=int, help='Stream the input N rows at a time (bounded memory, same output)')
+    parser.add_argument('--workers', type=int, help='Process the input on N cores, partitioned by phone (same output)')
+    parser.add_argument('--format', choices=FORMATS, default='parquet', help='Output format (csv for export)')
+    parser.add_argument('--single-file', action='store_true',
+                        help='Write one file instead of a directory with one file per test group and a manifest')
+    parser.add_argument('--split', choices=METHODS, default='random',
+                        help='random: seeded draw over the whole file (default, same groups as before); '
+                             'hash: stable group per phone; stratified: balanced on email and quality band. '
+                             'Changing it moves contacts between groups, only do it for a new test')
+    parser.add_argument('--salt', default=DEFAULT_SALT, help='Hash split salt; a new salt reshuffles everyone for a new experiment')
+    parser.add_argument('--incremental', nargs='?', const='', metavar='CACHE',
+                        help='Only re-clean rows changed since the last run (cache default: <output-dir>/prep_cache.parquet)')
     
     args = parser.parse_args()
+    if sum(bool(mode) for mode in (args.chunk_size, args.workers, args.incremental is not None)) > 1:
+        parser.error('--chunk-size, --workers and --incremental are separate modes, pick one')
+    if args.chunk_size and args.split not in STREAMING_METHODS:
+        parser.error(f"--split {args.split} needs the whole file in memory, it cannot run with --chunk-size")
     
     if not os.path.exists(args.input):
         logger.error(f"Input file not found: {args.input}")
@@ -35,37 +55,71 @@ def main():
     print("🧹 ELIT PARKING - DATA PREPARATION")
     print("=" * 70)
     
-    print(f"\n📂 Loading data from: {args.input}")
-    df = pd.read_csv(args.input)
-    print(f"   ✓ Loaded {len(df):,} raw records")
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = os.path.join(args.output_dir, f'prepared_contacts_{timestamp}' + (f'.{args.format}' if args.single_file else ''))
+    partition_by = None if args.single_file else PARTITION_COLUMN
+    # The stratified split bands contacts by the score dedup ranked them by; dropped again before writing
+    keep_score = args.split == 'stratified'
     
-    print("\n🔧 Processing database...")
-    df_clean, stats = DataProcessor.process_database(df, french_only=not args.all_countries)
+    if args.chunk_size:
+        print(f"\n📂 Streaming data from: {args.input} ({args.chunk_size:,} rows per chunk)")
+        print("\n🔧 Processing database in chunks...")
+        preparer = ChunkedPreparer(chunk_size=args.chunk_size, french_only=not args.all_countries,
+                                   method=args.split, salt=args.salt)
+        stats, group_stats = preparer.run(args.input, output_file, partition_by, args.format)
+    else:
+        if args.workers:
+            print(f"\n📂 Loading data from: {args.input}")
+            print(f"\n🔧 Processing database on {args.workers} workers...")
+            df_clean, stats = ParallelPreparer(args.workers, french_only=not args.all_countries,
+                                                 keep_score=keep_score).process_csv(args.input)
+        elif args.incremental is not None:
+            cache_file = args.incremental or os.path.join(args.output_dir, 'prep_cache.parquet')
+            print(f"\n📂 Loading data from: {args.input}")
+            df = pd.read_csv(args.input, dtype=str)
+            print(f"   ✓ Loaded {len(df):,} raw records")
+            
+            print(f"\n🔧 Processing database incrementally (cache: {cache_file})...")
+            preparer = IncrementalPreparer(cache_file, french_only=not args.all_countries, keep_score=keep_score)
+            df_clean, stats = preparer.process(df)
+            print(f"   ✓ {preparer.counts['reused']:,} rows unchanged since the last run, {preparer.counts['computed']:,} re-cleaned")
+        else:
+            print(f"\n📂 Loading data from: {args.input}")
+            df = pd.read_csv(args.input, dtype=str)
+            print(f"   ✓ Loaded {len(df):,} raw records")
+            
+            print("\n🔧 Processing database...")
+            df_clean, stats = DataProcessor.process_database(df, french_only=not args.all_countries, keep_score=keep_score)
+        
+        print("\n🔀 Splitting into A/B/C test groups...")
+        df_final = ABTestSplitter.split_contacts(df_clean, method=args.split, salt=args.salt)
+        df_final = df_final.drop(columns=['quality_score'], errors='ignore')
+        group_stats = ABTestSplitter.get_group_statistics(df_final)
+        
+        if args.single_file:
+            write_table(df_final, output_file)
+        else:
+            write_partitioned(df_final, output_file, partition_by, args.format)
     
     print("\n📊 PROCESSING STATISTICS:")
     print(f"   Initial records      : {stats['initial_count']:,}")
     print(f"   Duplicates removed   : {stats['duplicates_removed']:,}")
-    if not args.all_countries:
-        print(f"   Foreign numbers removed : {stats['foreign_numbers_removed']:,}")
+    print("   Removed by filter    :")
+    for name, count in stats['dropped'].items():
+        print(f"     {name:18} : {count:,}")
     print(f"   Final contacts       : {stats['final_count']:,}")
     print(f"   Reduction            : {stats['reduction_percentage']:.1f}%")
     print(f"\n   With email           : {stats['has_email_count']:,} ({stats['email_percentage']:.1f}%)")
     print(f"   With first name      : {stats['has_first_name_count']:,} ({stats['first_name_percentage']:.1f}%)")
     
-    print("\n🔀 Splitting into A/B/C test groups...")
-    df_final = ABTestSplitter.split_contacts(df_clean)
-    
-    group_stats = ABTestSplitter.get_group_statistics(df_final)
     print("\n   Group distribution:")
     for group, gstats in sorted(group_stats.items()):
         print(f"   Group {group}: {gstats['total_contacts']:,} contacts ({gstats['percentage']:.1f}%)")
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = os.path.join(args.output_dir, f'prepared_contacts_{timestamp}.csv')
-    
-    print(f"\n💾 Saving prepared data to: {output_file}")
-    df_final.to_csv(output_file, index=False)
-    print(f"   ✓ Saved {len(df_final):,} contacts")
+    print(f"\n💾 Prepared data saved to: {output_file}")
+    print(f"   ✓ Saved {stats['final_count']:,} contacts")
+    if not args.single_file:
+        print(f"   ✓ One {args.format} file per test group, row counts and checksums in manifest.json")
     
     cost_per_msg = 0.005
     total_cost = stats['final_count'] * cost_per_msg
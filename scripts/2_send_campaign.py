@@ -13,10 +13,20 @@ import pandas as pd
 from datetime import datetime
 import logging
 import json
+from typing import Dict, List
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.whatsapp_sender import create_sender_from_env
+from src.async_sender import create_async_sender_from_env
+from src.sender_pool import create_sender_pool_from_env
+from src.outbox import SendOutbox
+from src.reconciler import create_reconciler_from_env, resolve_in_flight
+from src.result_sink import ResultSink
+from src.metrics import MetricsExporter, sender_metrics
+from src.simulator import create_simulator_from_env, simulation_report_lines
+from src.twilio_standin import parse_error_mix
+from src.storage import find_latest_table, is_partitioned, read_partitions, read_table
 from config.templates import WhatsAppTemplates
 
 log_dir = 'logs'
@@ -31,10 +41,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# All the send path needs from the prepared file
+SEND_COLUMNS = ['client_phone', 'first_name', 'test_group']
+
 
 def validate_environment():
-    required_vars = ['TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_WHATSAPP_NUMBER', 'TEMPLATE_A_SID', 'TEMPLATE_B_SID', 'TEMPLATE_C_SID']
+    required_vars = ['TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TEMPLATE_A_SID', 'TEMPLATE_B_SID', 'TEMPLATE_C_SID']
     missing = [var for var in required_vars if not os.getenv(var)]
+    if not (os.getenv('TWILIO_WHATSAPP_NUMBER') or os.getenv('TWILIO_WHATSAPP_NUMBERS')):
+        missing.append('TWILIO_WHATSAPP_NUMBER')
     
     if missing:
         logger.error("Missing required environment variables:")
@@ -51,20 +66,61 @@ def validate_environment():
     return True
 
 
+def load_groups(input_file: str, groups: List[str]) -> Dict[str, pd.DataFrame]:
+    """Contacts of each group to send; from a partitioned table only those groups' files are read"""
+    if is_partitioned(input_file):
+        return {group: read_partitions(input_file, [group], SEND_COLUMNS) for group in groups}
+    
+    df = read_table(input_file, columns=SEND_COLUMNS)
+    grouped = df.groupby('test_group', observed=True, sort=False)
+    return {group: grouped.get_group(group) if group in grouped.groups else df.iloc[:0] for group in groups}
+
+
+def dry_run(frames: Dict[str, pd.DataFrame], args):
+    """Runs the campaign through the real send path against a simulated API on a virtual clock"""
+    logging.getLogger('src').setLevel(logging.CRITICAL)
+    simulator = create_simulator_from_env(use_async=args.use_async, concurrency=args.concurrency, latency=args.sim_latency,
+                                          quota=args.sim_quota, throttle_probability=args.sim_throttle_prob,
+                                          error_mix=parse_error_mix(args.sim_error_mix))
+    
+    contacts = []
+    for group_df in frames.values():
+        contacts += group_df[['client_phone', 'first_name']].to_dict('records')
+    if args.test:
+        contacts = contacts[:args.limit]
+    
+    print(f"\n🧪 DRY RUN: simulating {len(contacts):,} messages "
+          f"({'async, concurrency ' + str(simulator.concurrency) if args.use_async else 'sync'}, {len(simulator.numbers)} number(s))...")
+    report = simulator.run(contacts)
+    
+    print("\n📊 PROJECTION:")
+    for line in simulation_report_lines(report):
+        print(f"   {line}")
+    print("\n" + "=" * 70)
+
+
 def find_latest_prepared_file(data_dir='outputs'):
-    files = [f for f in os.listdir(data_dir) if f.startswith('prepared_contacts_') and f.endswith('.csv')]
-    if not files:
-        return None
-    files.sort(reverse=True)
-    return os.path.join(data_dir, files[0])
+    return find_latest_table(data_dir, 'prepared_contacts_')
 
 
 def main():
     parser = argparse.ArgumentParser(description='Launch WhatsApp campaign')
-    parser.add_argument('--input', help='Input CSV file')
+    parser.add_argument('--input', help='Prepared contacts file (.parquet or .csv)')
     parser.add_argument('--group', choices=['A', 'B', 'C', 'ALL'], default='ALL')
     parser.add_argument('--test', action='store_true', help='Test mode')
     parser.add_argument('--limit', type=int, default=5, help='Test limit')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Use the concurrent async sender')
+    parser.add_argument('--concurrency', type=int, default=None, help='Requests in flight with --async (default: SEND_CONCURRENCY)')
+    parser.add_argument('--outbox', help='Outbox database (default: <input>.outbox.db)')
+    parser.add_argument('--resume', action='store_true', help='Skip contacts already sent or in flight in the outbox')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on this port while sending')
+    parser.add_argument('--metrics-file', help='Append JSON metrics snapshots to this file')
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help='Seconds between JSON snapshots')
+    parser.add_argument('--dry-run', action='store_true', help='Simulate the campaign (duration, throughput, retries, cost) without sending')
+    parser.add_argument('--sim-latency', default='lognormal:0.15:0.4', help='Simulated API latency: fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA')
+    parser.add_argument('--sim-quota', type=int, default=0, help='Simulated accepted messages/sec per number before 20429 (0 = unlimited)')
+    parser.add_argument('--sim-throttle-prob', type=float, default=0.0, help='Simulated random 20429 probability')
+    parser.add_argument('--sim-error-mix', default='', help='Simulated error codes, e.g. 21211=0.01,63016=0.02')
     
     args = parser.parse_args()
     
@@ -72,26 +128,48 @@ def main():
     print("📱 ELIT PARKING - WHATSAPP CAMPAIGN LAUNCHER")
     print("=" * 70)
     
-    print("\n🔐 Validating environment...")
-    if not validate_environment():
-        sys.exit(1)
-    print("   ✓ Environment validated")
+    if not args.dry_run:
+        print("\n🔐 Validating environment...")
+        if not validate_environment():
+            sys.exit(1)
+        print("   ✓ Environment validated")
     
     input_file = args.input or find_latest_prepared_file()
     if not input_file or not os.path.exists(input_file):
         logger.error("No prepared file found")
         sys.exit(1)
     
-    print(f"   ✓ Loading: {input_file}")
-    df = pd.read_csv(input_file)
-    print(f"   ✓ Loaded {len(df):,} contacts")
+    groups_to_send = [args.group] if args.group != 'ALL' else ['A', 'B', 'C']
     
-    if args.group != 'ALL':
-        df = df[df['test_group'] == args.group].copy()
+    print(f"   ✓ Loading: {input_file} (group{'s' if len(groups_to_send) > 1 else ''} {', '.join(groups_to_send)})")
+    frames = load_groups(input_file, groups_to_send)
+    print(f"   ✓ Loaded {sum(len(group_df) for group_df in frames.values()):,} contacts")
+    
+    if args.dry_run:
+        dry_run(frames, args)
+        return
+    
+    outbox_file = args.outbox or SendOutbox.path_for(input_file)
+    outbox = SendOutbox(outbox_file, campaign=WhatsAppTemplates.CAMPAIGN_NAME)
+    print(f"   ✓ Outbox: {outbox_file}")
+    
+    if args.resume:
+        if outbox.counts().get(SendOutbox.IN_FLIGHT):
+            print("\n🔎 Looking up contacts in flight when the previous run stopped...")
+            lookup = resolve_in_flight(outbox, create_reconciler_from_env())
+            print(f"   ✓ {len(lookup['found']):,} were sent, {len(lookup['missing']):,} were not and are sent now")
+        sent_phones = outbox.phones_in_states([SendOutbox.SENT])
+        in_flight_phones = outbox.phones_in_states([SendOutbox.IN_FLIGHT])
+        handled = sent_phones | in_flight_phones
+        before = sum(len(group_df) for group_df in frames.values())
+        frames = {group: group_df[~group_df['client_phone'].isin(handled)] for group, group_df in frames.items()}
+        print(f"\n♻️  RESUME: skipping {before - sum(len(group_df) for group_df in frames.values()):,} contacts already handled")
+        if in_flight_phones:
+            print(f"   ⚠ {len(in_flight_phones):,} could not be looked up and are NOT resent (run --resume again to retry)")
     
     print("\n📊 CAMPAIGN SUMMARY:")
     print(f"   MODE: {'TEST' if args.test else 'PRODUCTION'}")
-    print(f"   Contacts: {len(df):,}")
+    print(f"   Contacts: {sum(len(group_df) for group_df in frames.values()):,}")
     
     if not args.test:
         response = input("\nType 'YES' to confirm: ")
@@ -100,15 +178,23 @@ def main():
             sys.exit(0)
     
     print("\n📲 Initializing sender...")
-    sender = create_sender_from_env()
+    if os.getenv('TWILIO_WHATSAPP_NUMBERS'):
+        sender = create_sender_pool_from_env(use_async=args.use_async, concurrency=args.concurrency)
+        print(f"   ✓ Sender pool: {', '.join(sender.numbers)}")
+    elif args.use_async:
+        sender = create_async_sender_from_env(concurrency=args.concurrency)
+    else:
+        sender = create_sender_from_env()
+    
+    exporter = None
+    if args.metrics_port is not None or args.metrics_file:
+        exporter = MetricsExporter(sender_metrics(sender), port=args.metrics_port, snapshot_path=args.metrics_file, interval=args.metrics_interval).start()
     
     print("\n🚀 Starting campaign...")
     all_results = {}
     
-    groups_to_send = [args.group] if args.group != 'ALL' else ['A', 'B', 'C']
-    
     for group in groups_to_send:
-        group_df = df[df['test_group'] == group]
+        group_df = frames[group]
         if len(group_df) == 0:
             continue
         
@@ -116,16 +202,30 @@ def main():
         
         template_config = WhatsAppTemplates.get_template_config(group)
         contacts = group_df[['client_phone', 'first_name']].to_dict('records')
+        outbox.enqueue(contacts, template=group, template_sid=template_config['sid'])
         
-        results = sender.send_batch(contacts=contacts, template_sid=template_config['sid'], test_mode=args.test, test_limit=args.limit)
+        sink_file = os.path.join('outputs', f'campaign_results_{timestamp}_group_{group}.ndjson.gz')
+        with ResultSink(sink_file) as sink:
+            results = sender.send_batch(contacts=contacts, template_sid=template_config['sid'], test_mode=args.test, test_limit=args.limit, outbox=outbox, sink=sink)
         all_results[f'group_{group}'] = results
         
         print(f"\n✓ Group {group}: {results['sent']:,} sent, {results['failed']:,} failed")
     
+    if exporter is not None:
+        exporter.stop()
+    
+    for snapshot in (m.snapshot() for m in sender_metrics(sender)):
+        print(f"\n⏱️  {snapshot['sender']}: API p50 ≤{snapshot['api_latency']['p50']}s, p99 ≤{snapshot['api_latency']['p99']}s | "
+              f"limiter wait {snapshot['limiter_wait']['sum']:.1f}s | retries {snapshot['retries'] or '-'}")
+    
     results_file = os.path.join('outputs', f'campaign_results_{timestamp}.json')
     with open(results_file, 'w') as f:
         json.dump(all_results, f, indent=2)
     
+    outbox_counts = outbox.counts()
+    outbox.close()
+    print(f"\n📦 Outbox: {', '.join(f'{state}={count:,}' for state, count in sorted(outbox_counts.items()))}")
+    
     print("\n" + "=" * 70)
     print("✅ CAMPAIGN COMPLETE!")
     print("=" * 70)
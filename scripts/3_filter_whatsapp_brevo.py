@@ -4,47 +4,38 @@ Script de filtrage WhatsApp - Campagne Noël 2025
 Exclut les contacts Brevo (par email ET téléphone) et génère la liste WhatsApp
 """
 
-import pandas as pd
+import os
+import sys
+import argparse
 from datetime import datetime
 from pathlib import Path
 
-def clean_phone(phone):
-    """Nettoie et normalise un numéro de téléphone"""
-    if pd.isna(phone):
-        return None
-    
-    phone = str(phone).strip()
-    
-    # Retirer tous les espaces, tirets, points
-    phone = phone.replace(' ', '').replace('-', '').replace('.', '')
-    
-    # Si commence par +, garder tel quel
-    if phone.startswith('+'):
-        return phone
-    
-    # Si commence par 33, ajouter +
-    if phone.startswith('33'):
-        return '+' + phone
-    
-    # Si commence par 0, remplacer par +33
-    if phone.startswith('0'):
-        return '+33' + phone[1:]
-    
-    return '+33' + phone
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.storage import FORMATS, read_table, write_table
+from src.phone_normalizer import PhoneNormalizer
+from src.suppression_index import SuppressionIndex
+
+# Colonnes de la base nettoyée utilisées par le filtrage
+CLEANED_COLUMNS = ['id', 'client_phone', 'client_email', 'first_name', 'quality_score', 'is_valid_phone']
 
-def filter_whatsapp_contacts():
-    """Filtre les contacts pour WhatsApp en excluant les emails Brevo"""
+def filter_whatsapp_contacts(output_format='parquet', exclusion_files=(), index_file='data/suppression_index.parquet'):
+    """Filtre les contacts pour WhatsApp en excluant les emails Brevo et les listes d'exclusion"""
     
     print("="*70)
     print("🔧 FILTRAGE CONTACTS WHATSAPP - CAMPAGNE NOËL 2025 ELIT")
     print("="*70)
     
     # Chemins
-    CLEANED_FILE = Path("data/cleaned_contacts.csv")
+    CLEANED_FILE = Path("data/cleaned_contacts.parquet")
+    if not CLEANED_FILE.exists():
+        CLEANED_FILE = Path("data/cleaned_contacts.csv")
     BREVO_FILE = Path("data/brevo_emails_sent.csv")  # Le fichier uploadé
+    INDEX_FILE = Path(index_file)                       # Exclusions de tous les exports déjà importés
     
+    phone_normalizer = PhoneNormalizer()                # même normalisation que DataProcessor
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    OUTPUT_FILE = Path(f"outputs/whatsapp_contacts_{timestamp}.csv")
+    OUTPUT_FILE = Path(f"outputs/whatsapp_contacts_{timestamp}.{output_format}")
     
     # 1. Charger la base nettoyée
     print(f"\n📂 ÉTAPE 1 : Chargement de la base nettoyée")
@@ -54,63 +45,50 @@ def filter_whatsapp_contacts():
         print(f"❌ ERREUR : {CLEANED_FILE} non trouvé !")
         return
     
-    df_all = pd.read_csv(CLEANED_FILE)
+    df_all = read_table(str(CLEANED_FILE), columns=CLEANED_COLUMNS)
     print(f"   ✅ {len(df_all):,} contacts chargés")
     print(f"   Colonnes : {', '.join(df_all.columns.tolist())}")
     
-    # 2. Charger le fichier Brevo
-    print(f"\n📧 ÉTAPE 2 : Chargement du fichier Brevo")
-    print(f"   Fichier : {BREVO_FILE}")
+    # 2. Charger l'index d'exclusion, y ajouter les exports pas encore importés
+    print(f"\n📧 ÉTAPE 2 : Index d'exclusion")
+    print(f"   Fichier : {INDEX_FILE}")
+    
+    index = SuppressionIndex(str(INDEX_FILE), normalizer=phone_normalizer).load()
+    print(f"   ✅ {len(index.imports):,} exports déjà importés")
     
-    if not BREVO_FILE.exists():
-        print(f"❌ ERREUR : {BREVO_FILE} non trouvé !")
+    exports = ([BREVO_FILE] if BREVO_FILE.exists() else []) + [Path(f) for f in exclusion_files]
+    for export in exports:
+        added = index.add_export(str(export))
+        if added is None:
+            print(f"   ✓ {export} : déjà importé")
+        else:
+            print(f"   ✅ {export} : +{added['email']:,} emails, +{added['phone']:,} téléphones")
+    
+    if not index.imports:
+        print(f"❌ ERREUR : {BREVO_FILE} non trouvé et index d'exclusion vide !")
         print(f"\n📝 Place le fichier Brevo ici :")
         print(f"   {BREVO_FILE.absolute()}")
         return
     
-    # Lire avec séparateur point-virgule
-    df_brevo = pd.read_csv(BREVO_FILE, sep=';')
-    print(f"   ✅ {len(df_brevo):,} contacts Brevo chargés")
-    print(f"   Colonnes : {', '.join(df_brevo.columns.tolist())}")
-    
-    # 3. Extraire emails et téléphones Brevo
-    print(f"\n🔍 ÉTAPE 3 : Extraction des emails et téléphones Brevo")
-    
-    # Emails
-    if 'EMAIL' in df_brevo.columns:
-        df_brevo['email_normalized'] = df_brevo['EMAIL'].str.lower().str.strip()
-        emails_sent = set(df_brevo['email_normalized'].dropna())
-    else:
-        print("⚠️  Colonne EMAIL non trouvée dans Brevo")
-        emails_sent = set()
-    
-    print(f"   ✅ {len(emails_sent):,} emails à exclure")
-    
-    # Téléphones
-    if 'SMS' in df_brevo.columns:
-        df_brevo['phone_normalized'] = df_brevo['SMS'].apply(clean_phone)
-        phones_sent = set(df_brevo['phone_normalized'].dropna())
-    else:
-        print("⚠️  Colonne SMS non trouvée dans Brevo")
-        phones_sent = set()
-    
-    print(f"   ✅ {len(phones_sent):,} téléphones à exclure")
+    # 3. Contenu de l'index
+    print(f"\n🔍 ÉTAPE 3 : Contenu de l'index")
+    print(f"   ✅ {len(index.keys['email']):,} emails à exclure")
+    print(f"   ✅ {len(index.keys['phone']):,} téléphones à exclure")
     
-    # 4. Normaliser la base complète
+    # 4. Normaliser les téléphones de la base complète (les emails sont normalisés par l'index)
     print(f"\n🧹 ÉTAPE 4 : Normalisation de la base complète")
     
-    df_all['email_normalized'] = df_all['client_email'].str.lower().str.strip()
-    df_all['phone_normalized'] = df_all['client_phone'].apply(clean_phone)
+    df_all['phone_normalized'] = phone_normalizer.e164(df_all['client_phone'])
     
-    print(f"   ✅ Emails et téléphones normalisés")
+    print(f"   ✅ Téléphones normalisés")
     
     # 5. Exclure les contacts Brevo
     print(f"\n❌ ÉTAPE 5 : Exclusion des contacts Brevo")
     
     # Marquer ceux qui ont reçu l'email (par email OU téléphone)
     df_all['received_email'] = (
-        df_all['email_normalized'].isin(emails_sent) |
-        df_all['phone_normalized'].isin(phones_sent)
+        index.contains_emails(df_all['client_email']) |
+        index.contains_phones(df_all['phone_normalized'])
     )
     
     excluded_count = df_all['received_email'].sum()
@@ -122,12 +100,12 @@ def filter_whatsapp_contacts():
     # 6. Garder seulement téléphones valides
     print(f"\n📱 ÉTAPE 6 : Filtrage téléphones valides")
     
-    df_whatsapp = df_filtered[
+    df_whatsapp = df_filtered[df_filtered['phone_normalized'].notna() & (
         (df_filtered['is_valid_phone'] == True) | 
         (df_filtered['is_valid_phone'] == 1) |
         (df_filtered['is_valid_phone'] == '1') |
         (df_filtered['is_valid_phone'] == 'True')
-    ].copy()
+    )].copy()
     
     excluded_no_phone = len(df_filtered) - len(df_whatsapp)
     print(f"   ✅ {excluded_no_phone:,} sans téléphone valide exclus")
@@ -160,14 +138,14 @@ def filter_whatsapp_contacts():
     })
     
     # Remplacer prénoms vides par "voyageur"
-    df_export['firstname'] = df_export['firstname'].fillna('voyageur')
+    df_export['firstname'] = df_export['firstname'].astype(object).fillna('voyageur')
     df_export['firstname'] = df_export['firstname'].replace('', 'voyageur')
     
     print(f"   ✅ Colonnes préparées : {', '.join(df_export.columns.tolist())}")
     
     # 9. Sauvegarder
     OUTPUT_FILE.parent.mkdir(exist_ok=True)
-    df_export.to_csv(OUTPUT_FILE, index=False)
+    write_table(df_export, str(OUTPUT_FILE))
     
     print(f"   ✅ Fichier sauvegardé : {OUTPUT_FILE}")
     
@@ -176,7 +154,7 @@ def filter_whatsapp_contacts():
     print("📊 STATISTIQUES FINALES")
     print(f"{'='*70}")
     print(f"Base complète (cleaned)     : {len(df_all):>8,} contacts")
-    print(f"Contacts Brevo (email)      : {len(df_brevo):>8,} contacts")
+    print(f"Index d'exclusion           : {len(index):>8,} emails/téléphones")
     print(f"")
     print(f"Exclus (email/téléphone)    : {excluded_count:>8,} contacts")
     print(f"Sans téléphone valide       : {excluded_no_phone:>8,} contacts")
@@ -212,4 +190,10 @@ def filter_whatsapp_contacts():
     return df_export
 
 if __name__ == "__main__":
-    filter_whatsapp_contacts()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Filtrage des contacts WhatsApp (exclusion Brevo)')
+    parser.add_argument('--format', choices=FORMATS, default='parquet', help='Format de sortie (csv pour export)')
+    parser.add_argument('--exclusions', nargs='+', default=[], metavar='CSV',
+                        help="Autres listes d'exclusion (colonnes EMAIL/SMS ou email/phone) à ajouter à l'index")
+    parser.add_argument('--index', default='data/suppression_index.parquet', help="Index d'exclusion persistant")
+    args = parser.parse_args()
+    filter_whatsapp_contacts(args.format, args.exclusions, args.index)
\ No newline at end of file
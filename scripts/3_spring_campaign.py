@@ -8,8 +8,8 @@ Tracking complet : date, template reçu, statut
 
 import os
 import sys
+import argparse
 import pandas as pd
-import re
 import json
 import logging
 from datetime import datetime
@@ -20,6 +20,16 @@ load_dotenv()
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.whatsapp_sender import create_sender_from_env
+from src.async_sender import create_async_sender_from_env
+from src.sender_pool import create_sender_pool_from_env
+from src.outbox import SendOutbox
+from src.reconciler import create_reconciler_from_env, resolve_in_flight
+from src.result_sink import ResultSink
+from src.name_cleaner import NameCleaner
+from src.phone_normalizer import PhoneNormalizer
+from src.filter_plan import FilterPlan
+from src.simulator import create_simulator_from_env, simulation_report_lines
+from src.twilio_standin import parse_error_mix
 
 # ─── CONFIG ───────────────────────────────────────────────────────────────────
 BATCH_SIZE        = 1000                                        # 1 000 par template
@@ -31,10 +41,14 @@ TEMPLATE_A_SID    = os.getenv('TEMPLATE_ETE_A_SID')            # elit_printemps_
 TEMPLATE_B_SID    = os.getenv('TEMPLATE_ETE_B_SID')            # elit_printemps_complicite
 RAW_DATA_FILE     = 'data/raw_contacts.csv'
 LOG_FILE          = 'data/campaign_log.csv'
+OUTBOX_FILE       = 'data/campaign_outbox.db'                   # état d'envoi durable (reprise)
 MIN_DAYS_BETWEEN  = 30                                          # jours minimum entre 2 envois
 FALLBACK_NAME     = 'Cher voyageur'                             # si prénom inconnu
 # ──────────────────────────────────────────────────────────────────────────────
 
+names = NameCleaner(fallback=FALLBACK_NAME)                     # règles partagées avec DataProcessor
+phone_normalizer = PhoneNormalizer()                            # E.164 + type de ligne, idem DataProcessor
+
 os.makedirs('logs', exist_ok=True)
 os.makedirs('outputs', exist_ok=True)
 
@@ -49,43 +63,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# ─── HELPERS ──────────────────────────────────────────────────────────────────
-
-def fix_phone(p):
-    if pd.isna(p): return None
-    p = str(p).strip()
-    if not p.startswith('+'): p = '+' + p
-    return p if re.match(r'^\+\d{10,15}$', p) else None
-
-def clean_name(name):
-    if pd.isna(name): return None
-    name = str(name).strip()
-    name = re.sub(r'\s*\([^)]*\)', '', name)
-    for pat in [r'\s+(nous doit|doit)\s+\d+€.*$', r'\s+P\d+.*$',
-                r'\s+(ROUTE|LAVAGE|INTE|BAC|portail|clef gardee).*$']:
-        name = re.sub(pat, '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name if len(name) >= 2 else None
-
-def extract_first_name(full_name):
-    if pd.isna(full_name): return FALLBACK_NAME
-    full_name = str(full_name).strip()
-    m = re.match(r'^([A-Z][a-zéèêëàâäôöûüçñ-]+)\s+[A-Z]', full_name)
-    if m: return m.group(1)
-    m = re.match(r'^[A-Z]+\s+([A-Z][a-zéèêëàâäôöûüçñ-]+)', full_name)
-    if m: return m.group(1)
-    words = full_name.split()
-    if not words: return FALLBACK_NAME
-    skip = ['M.', 'Mme', 'Madame', 'Monsieur', 'Dr', 'Mr']
-    first = words[1] if words[0] in skip and len(words) > 1 else words[0]
-    return first.capitalize()
-
-def sanitize_name(name: str) -> str:
-    """Évite les caractères spéciaux qui cassent le JSON Twilio"""
-    cleaned = re.sub(r'["\\\n\r\t]', '', str(name)).strip()
-    return cleaned if cleaned else FALLBACK_NAME
-
-
 # ─── LOG ──────────────────────────────────────────────────────────────────────
 
 def load_campaign_log() -> pd.DataFrame:
@@ -95,7 +72,7 @@ def load_campaign_log() -> pd.DataFrame:
         logger.info(f"Log chargé : {len(df):,} envois précédents")
         return df
     logger.info("Aucun log existant — premier batch")
-    return pd.DataFrame(columns=['client_phone', 'campaign', 'template', 'sent_at', 'status', 'batch_number'])
+    return pd.DataFrame(columns=['client_phone', 'campaign', 'template', 'sent_at', 'status', 'batch_number', 'message_sid'])
 
 def save_to_log(results: list, template_id: str, batch_number: int):
     now = datetime.now().isoformat()
@@ -105,7 +82,8 @@ def save_to_log(results: list, template_id: str, batch_number: int):
         'template':     template_id,
         'sent_at':      now,
         'status':       r['status'],
-        'batch_number': batch_number
+        'batch_number': batch_number,
+        'message_sid':  r.get('message_sid')
     } for r in results]
 
     df_new = pd.DataFrame(rows)
@@ -118,6 +96,16 @@ def save_to_log(results: list, template_id: str, batch_number: int):
     df_combined.to_csv(LOG_FILE, index=False)
     logger.info(f"Log mis à jour : {len(df_new):,} envois template {template_id} sauvegardés")
 
+def outbox_results(outbox: SendOutbox, log_df: pd.DataFrame, template_id: str, batch_number: int) -> list:
+    """Résultats du batch lus dans l'outbox, hors envois déjà présents dans le log"""
+    logged = set()
+    if not log_df.empty:
+        mask = ((log_df['campaign'] == CAMPAIGN_NAME) & (log_df['template'] == template_id)
+                & (log_df['batch_number'].astype(str) == str(batch_number)))
+        logged = set(log_df.loc[mask, 'client_phone'])
+    rows = outbox.rows(template=template_id, states=[SendOutbox.SENT, SendOutbox.FAILED, SendOutbox.IN_FLIGHT])
+    return [{'to': r['client_phone'], 'status': r['state'], 'message_sid': r['message_sid']} for r in rows if r['client_phone'] not in logged]
+
 def get_next_batch_number(log_df: pd.DataFrame) -> int:
     if log_df.empty: return 1
     campaign_logs = log_df[log_df['campaign'] == CAMPAIGN_NAME]
@@ -134,41 +122,74 @@ def prepare_contacts(log_df: pd.DataFrame) -> pd.DataFrame:
     df = pd.read_csv(RAW_DATA_FILE, dtype=str)
     logger.info(f"Base brute : {len(df):,} contacts")
 
-    # Pipeline nettoyage
-    df['client_phone'] = df['client_phone'].apply(fix_phone)
-    df = df[df['client_phone'].notna()].copy()
-    df = df.drop_duplicates(subset='client_phone', keep='first')
-    df = df[df['client_phone'].str.startswith('+33')].copy()
+    # Pipeline nettoyage : filtres déclarés puis appliqués en une seule passe
+    phones = phone_normalizer.normalize(df['client_phone'])
+    df['client_phone'] = phones['e164']
+    df['phone_type'] = phones['line_type']
     df['client_name'] = df.get('client_name', df.get('nom', '')).fillna('')
-    df = df[df['client_name'].str.len() > 1].copy()
-    df['first_name'] = df.get('prenom', df['client_name']).fillna(FALLBACK_NAME).apply(sanitize_name)
-
-    # Filtre SANS email uniquement
-    no_email = df['client_email'].isna() | (df['client_email'].str.strip() == '')
-    df = df[no_email].copy()
-    logger.info(f"Sans email : {len(df):,} contacts")
 
-    # Mobiles FR uniquement (+336 / +337)
-    df = df[df['client_phone'].str.match(r'^\+33[67]')].copy()
-    logger.info(f"Mobiles FR : {len(df):,} contacts")
+    plan = (FilterPlan()
+            .where('téléphone invalide', lambda d: d['client_phone'].notna())
+            .where('doublon', lambda d: ~d['client_phone'].duplicated(keep='first'))
+            .where('hors France', lambda d: d['client_phone'].str.startswith('+33'))
+            .where('nom manquant', lambda d: d['client_name'].str.len() > 1)
+            # SANS email uniquement
+            .where('avec email', lambda d: d['client_email'].isna() | (d['client_email'].str.strip() == ''))
+            # Mobiles FR uniquement (plages mobiles du plan de numérotation)
+            .where('non mobile', lambda d: d['phone_type'] == 'mobile'))
 
     # Exclure déjà contactés récemment
     if not log_df.empty:
-        camp_log = log_df[log_df['campaign'] == CAMPAIGN_NAME].copy()
+        camp_log = log_df[log_df['campaign'] == CAMPAIGN_NAME]
         if not camp_log.empty:
             cutoff = pd.Timestamp.now() - pd.Timedelta(days=MIN_DAYS_BETWEEN)
-            recent = camp_log[camp_log['sent_at'] > cutoff]['client_phone'].tolist()
-            before = len(df)
-            df = df[~df['client_phone'].isin(recent)].copy()
-            logger.info(f"Exclus (contactés < {MIN_DAYS_BETWEEN}j) : {before - len(df):,} contacts")
+            recent = camp_log.loc[camp_log['sent_at'] > cutoff, 'client_phone'].unique()
+            plan.where(f'contacté < {MIN_DAYS_BETWEEN}j', lambda d: ~d['client_phone'].isin(recent))
+
+    df = plan.apply(df)
+    df['first_name'] = names.sanitize(df.get('prenom', df['client_name']).fillna(FALLBACK_NAME))
+    for name, count in plan.dropped.items():
+        logger.info(f"Exclus ({name}) : {count:,} contacts")
 
     logger.info(f"Éligibles : {len(df):,} contacts")
     return df
 
 
+# ─── SIMULATION ───────────────────────────────────────────────────────────────
+
+def dry_run(args):
+    """Simule le prochain batch A/B (durée, débit, retries, coût) sans envoi ni écriture du log / de l'outbox"""
+    logging.getLogger('src').setLevel(logging.CRITICAL)
+    df_eligible = prepare_contacts(load_campaign_log())
+    contacts = df_eligible.iloc[:BATCH_SIZE * 2][['client_phone', 'first_name']].to_dict('records')
+
+    simulator = create_simulator_from_env(use_async=args.use_async, concurrency=args.concurrency, latency=args.sim_latency,
+                                          quota=args.sim_quota, throttle_probability=args.sim_throttle_prob,
+                                          error_mix=parse_error_mix(args.sim_error_mix))
+    print(f"\n🧪 SIMULATION : {len(contacts):,} messages "
+          f"({'async, concurrence ' + str(simulator.concurrency) if args.use_async else 'sync'}, {len(simulator.numbers)} numéro(s))...")
+    report = simulator.run(contacts)
+
+    print("\n📊 PROJECTION :")
+    for line in simulation_report_lines(report):
+        print(f"   {line}")
+    print("\n" + "=" * 70)
+
+
 # ─── MAIN ─────────────────────────────────────────────────────────────────────
 
 def main():
+    parser = argparse.ArgumentParser(description='Campagne WhatsApp Printemps/Été 2026')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Envoi concurrent (sender async)')
+    parser.add_argument('--concurrency', type=int, default=None, help='Requêtes simultanées avec --async (défaut : SEND_CONCURRENCY)')
+    parser.add_argument('--resume', action='store_true', help="Reprend le dernier batch interrompu depuis l'outbox")
+    parser.add_argument('--dry-run', action='store_true', help='Simule le batch (durée, débit, retries, coût) sans rien envoyer')
+    parser.add_argument('--sim-latency', default='lognormal:0.15:0.4', help='Latence API simulée : fixed:S | uniform:MIN:MAX | lognormal:MEDIANE:SIGMA')
+    parser.add_argument('--sim-quota', type=int, default=0, help='Messages acceptés/s par numéro avant 20429 (0 = illimité)')
+    parser.add_argument('--sim-throttle-prob', type=float, default=0.0, help='Probabilité de 20429 aléatoire')
+    parser.add_argument('--sim-error-mix', default='', help='Erreurs simulées, ex. 21211=0.01,63016=0.02')
+    args = parser.parse_args()
+
     print("=" * 70)
     print("🌸 ELIT PARKING - CAMPAGNE PRINTEMPS/ÉTÉ 2026")
     print("=" * 70)
@@ -179,6 +200,10 @@ def main():
     print(f"   Cible         : contacts SANS email uniquement")
     print(f"   Fallback nom  : '{FALLBACK_NAME}'")
 
+    if args.dry_run:
+        dry_run(args)
+        return
+
     # Vérifications SID
     if not TEMPLATE_A_SID or not TEMPLATE_A_SID.startswith('HX'):
         print("\n❌ TEMPLATE_ETE_A_SID manquant ou invalide dans .env !")
@@ -189,24 +214,53 @@ def main():
         print("   → Crée le template 'elit_printemps_complicite' dans Twilio puis ajoute son SID")
         sys.exit(1)
 
-    # Charger log
+    # Charger log + outbox
     log_df = load_campaign_log()
-    batch_number = get_next_batch_number(log_df)
-    print(f"\n   Batch n°      : {batch_number}")
+    outbox = SendOutbox(OUTBOX_FILE, campaign=CAMPAIGN_NAME)
+    unfinished_batch = outbox.latest_unfinished_batch()
+
+    if args.resume:
+        if unfinished_batch is None:
+            print("\n✅ Aucun batch interrompu à reprendre.")
+            sys.exit(0)
+
+        # Reprise : mêmes contacts A/B que le batch interrompu, sauf ceux déjà envoyés (les contacts en vol sont vérifiés chez Twilio)
+        batch_number = unfinished_batch
+        outbox.batch = batch_number
+        print(f"\n   Batch n°      : {batch_number} (reprise)")
+        if outbox.counts().get(SendOutbox.IN_FLIGHT):
+            print("   🔎 Vérification des contacts en vol lors de l'arrêt...")
+            lookup = resolve_in_flight(outbox, create_reconciler_from_env())
+            print(f"   ✓ {len(lookup['found']):,} déjà envoyés, {len(lookup['missing']):,} jamais envoyés (renvoyés)")
+            if lookup['unresolved']:
+                print(f"   ⚠️  {lookup['unresolved']:,} non vérifiés — NON renvoyés (relance --resume pour réessayer)")
+
+        resume_states = [SendOutbox.PENDING, SendOutbox.FAILED]
+        df_eligible = None
+        df_a = pd.DataFrame(outbox.rows(template='A', states=resume_states), columns=['client_phone', 'first_name'])
+        df_b = pd.DataFrame(outbox.rows(template='B', states=resume_states), columns=['client_phone', 'first_name'])
+    else:
+        if unfinished_batch is not None:
+            print(f"\n❌ Le batch n°{unfinished_batch} n'est pas terminé — relance avec --resume")
+            sys.exit(1)
 
-    # Préparer contacts
-    df_eligible = prepare_contacts(log_df)
+        batch_number = get_next_batch_number(log_df)
+        outbox.batch = batch_number
+        print(f"\n   Batch n°      : {batch_number}")
 
-    if len(df_eligible) == 0:
-        print("\n✅ Aucun contact éligible disponible.")
-        sys.exit(0)
+        # Préparer contacts
+        df_eligible = prepare_contacts(log_df)
+
+        if len(df_eligible) == 0:
+            print("\n✅ Aucun contact éligible disponible.")
+            sys.exit(0)
 
-    if len(df_eligible) < BATCH_SIZE * 2:
-        print(f"\n⚠️  Seulement {len(df_eligible):,} contacts éligibles (besoin de {BATCH_SIZE*2:,})")
+        if len(df_eligible) < BATCH_SIZE * 2:
+            print(f"\n⚠️  Seulement {len(df_eligible):,} contacts éligibles (besoin de {BATCH_SIZE*2:,})")
 
-    # Découper A/B
-    df_a = df_eligible.iloc[:BATCH_SIZE].copy()
-    df_b = df_eligible.iloc[BATCH_SIZE:BATCH_SIZE*2].copy()
+        # Découper A/B
+        df_a = df_eligible.iloc[:BATCH_SIZE].copy()
+        df_b = df_eligible.iloc[BATCH_SIZE:BATCH_SIZE*2].copy()
 
     print(f"\n📋 Répartition :")
     print(f"   Template A (elit_printemps_offre)       : {len(df_a):,} contacts")
@@ -229,17 +283,30 @@ def main():
         print("\n❌ Annulé.")
         sys.exit(0)
 
-    sender = create_sender_from_env()
+    if os.getenv('TWILIO_WHATSAPP_NUMBERS'):
+        sender = create_sender_pool_from_env(use_async=args.use_async, concurrency=args.concurrency)
+        print(f"   Numéros       : {', '.join(sender.numbers)}")
+    elif args.use_async:
+        sender = create_async_sender_from_env(concurrency=args.concurrency)
+    else:
+        sender = create_sender_from_env()
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     all_results = {}
 
+    # A et B enregistrés avant le premier envoi : une reprise retrouve tout le batch
+    contacts_a = df_a[['client_phone', 'first_name']].to_dict('records')
+    contacts_b = df_b[['client_phone', 'first_name']].to_dict('records')
+    if not args.resume:
+        outbox.enqueue(contacts_a, template='A', template_sid=TEMPLATE_A_SID)
+        outbox.enqueue(contacts_b, template='B', template_sid=TEMPLATE_B_SID)
+
     # ── Envoi Template A ──
     print(f"\n{'='*70}")
     print(f"📤 ENVOI TEMPLATE A — {len(df_a):,} contacts")
     print(f"{'='*70}")
-    contacts_a = df_a[['client_phone', 'first_name']].to_dict('records')
-    results_a = sender.send_batch(contacts=contacts_a, template_sid=TEMPLATE_A_SID)
-    save_to_log(results_a['detailed_results'], 'A', batch_number)
+    with ResultSink(f'outputs/spring_batch{batch_number}_{timestamp}_A.ndjson.gz') as sink:
+        results_a = sender.send_batch(contacts=contacts_a, template_sid=TEMPLATE_A_SID, outbox=outbox, sink=sink)
+    save_to_log(outbox_results(outbox, log_df, 'A', batch_number), 'A', batch_number)
     all_results['template_A'] = {
         'sent': results_a['sent'],
         'failed': results_a['failed'],
@@ -251,9 +318,9 @@ def main():
     print(f"\n{'='*70}")
     print(f"📤 ENVOI TEMPLATE B — {len(df_b):,} contacts")
     print(f"{'='*70}")
-    contacts_b = df_b[['client_phone', 'first_name']].to_dict('records')
-    results_b = sender.send_batch(contacts=contacts_b, template_sid=TEMPLATE_B_SID)
-    save_to_log(results_b['detailed_results'], 'B', batch_number)
+    with ResultSink(f'outputs/spring_batch{batch_number}_{timestamp}_B.ndjson.gz') as sink:
+        results_b = sender.send_batch(contacts=contacts_b, template_sid=TEMPLATE_B_SID, outbox=outbox, sink=sink)
+    save_to_log(outbox_results(outbox, log_df, 'B', batch_number), 'B', batch_number)
     all_results['template_B'] = {
         'sent': results_b['sent'],
         'failed': results_b['failed'],
@@ -283,14 +350,16 @@ def main():
     print("\n" + "=" * 70)
     print(f"✅ BATCH {batch_number} TERMINÉ")
     print("=" * 70)
-    sent_a = results_a['sent']
-    sent_b = results_b['sent'] - results_a['sent']
+    sent_a = len(outbox.rows(template='A', states=[SendOutbox.SENT]))
+    sent_b = len(outbox.rows(template='B', states=[SendOutbox.SENT]))
+    outbox.close()
     print(f"   Template A  : {sent_a:,} envoyés ({sent_a/BATCH_SIZE*100:.1f}%)")
     print(f"   Template B  : {sent_b:,} envoyés ({sent_b/BATCH_SIZE*100:.1f}%)")
     print(f"   Total       : {total_sent:,} / {BATCH_SIZE*2:,}")
     print(f"   Log         : {LOG_FILE}")
+    print(f"   Outbox      : {OUTBOX_FILE}")
     print(f"   Résultats   : {results_file}")
-    remaining = len(df_eligible) - (BATCH_SIZE * 2)
+    remaining = len(df_eligible) - (BATCH_SIZE * 2) if df_eligible is not None else 0
     if remaining > 0:
         print(f"\n   Contacts restants éligibles : {remaining:,}")
 
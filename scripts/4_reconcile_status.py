@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Delivery Status Reconciliation Script"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+from datetime import datetime
+import logging
+from typing import Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.delivery_status import DeliveryStatusStore, delivery_rate_lines
+from src.outbox import SendOutbox
+from src.reconciler import create_reconciler_from_env, to_utc
+from src.storage import find_latest_table
+from config.templates import WhatsAppTemplates
+
+log_dir = 'logs'
+os.makedirs(log_dir, exist_ok=True)
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+log_file = os.path.join(log_dir, f'reconcile_{timestamp}.log')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.FileHandler(log_file), logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+# Where 3_spring_campaign.py keeps its outbox and the campaign name it writes there
+SPRING_OUTBOX_FILE = 'data/campaign_outbox.db'
+SPRING_CAMPAIGN_NAME = os.getenv('CAMPAIGN_NAME_ETE', 'printemps_ete_2026')
+
+
+def resolve_outbox(args) -> Tuple[Optional[str], Optional[str]]:
+    """(outbox, campaign) the way the send scripts pick them, unless given explicitly"""
+    if args.spring:
+        return args.outbox or SPRING_OUTBOX_FILE, args.campaign or SPRING_CAMPAIGN_NAME
+    if args.outbox:
+        return args.outbox, args.campaign or WhatsAppTemplates.CAMPAIGN_NAME
+    # 2_send_campaign.py: <prepared input>.outbox.db, latest prepared output by default
+    input_file = args.input or find_latest_table('outputs', 'prepared_contacts_')
+    if not input_file:
+        return None, None
+    return SendOutbox.path_for(input_file), args.campaign or WhatsAppTemplates.CAMPAIGN_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-check delivery statuses of sent messages')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--input', help='Prepared contacts file sent by 2_send_campaign.py (default: latest in outputs/)')
+    source.add_argument('--spring', action='store_true', help=f'Campaign sent by 3_spring_campaign.py ({SPRING_OUTBOX_FILE})')
+    parser.add_argument('--outbox', help='Outbox database, if not the one the send script derives')
+    parser.add_argument('--campaign', help='Campaign name in the outbox (default: the one the send script writes)')
+    parser.add_argument('--batch', type=int, help='Only this batch number')
+    parser.add_argument('--all', action='store_true', help='Also re-check messages already delivered/read/failed')
+    parser.add_argument('--fetch-only', action='store_true', help='Skip date-window listing, fetch every message')
+    parser.add_argument('--concurrency', type=int, help='Requests in flight (default: SEND_CONCURRENCY or 10)')
+    parser.add_argument('--rate-limit', type=int, help='API requests per second (default: RECONCILE_RATE_LIMIT or 50)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔎 DELIVERY STATUS RECONCILIATION")
+    print("=" * 70)
+
+    outbox_file, campaign = resolve_outbox(args)
+    if not outbox_file or not os.path.exists(outbox_file):
+        logger.error(f"Outbox not found: {outbox_file or 'no prepared file in outputs/, pass --input, --spring or --outbox'}")
+        sys.exit(1)
+
+    store = DeliveryStatusStore(outbox_file)
+    rows = store.unresolved(campaign, batch=args.batch, include_final=args.all)
+    print(f"\n📂 Outbox: {outbox_file} (campaign: {campaign})")
+    print(f"   ✓ {len(rows):,} messages to check")
+
+    if not rows:
+        print("\n✅ Nothing to reconcile")
+        store.close()
+        return
+
+    reconciler = create_reconciler_from_env(concurrency=args.concurrency, rate_limit=args.rate_limit)
+    targets = {message_sid: to_utc(recorded_at) for message_sid, recorded_at in rows}
+    stats = reconciler.reconcile(targets, on_events=lambda events: store.record_many(events, source='reconcile'), use_listing=not args.fetch_only)
+
+    print(f"\n📊 Resolved: {stats['resolved_by_list']:,} by listing, {stats['resolved_by_fetch']:,} by fetch")
+    print(f"   Not found: {stats['not_found']:,} | errors: {stats['errors']:,} | API calls: {stats['api_calls']:,}")
+    print(f"   Time: {stats['elapsed_time_seconds']:.1f}s")
+
+    print("\n📈 Delivery rates:")
+    for line in delivery_rate_lines(store.delivery_rates(campaign, batch=args.batch)):
+        print(f"   {line}")
+
+    store.close()
+    print("\n" + "=" * 70)
+
+
+if __name__ == '__main__':
+    main()
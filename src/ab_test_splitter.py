@@ -1,24 +1,104 @@
 """A/B/C Test Splitter Module"""
 
+import hashlib
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import List, Optional, Sequence, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+METHODS = ('hash', 'stratified', 'random')
+DEFAULT_SALT = 'elit-ab'
+# Quality-score band edges for the stratified split: < 5, 5-14, 15+ (an email alone is worth 10)
+QUALITY_BANDS = [5, 15]
+
 
 class ABTestSplitter:
     """Splits contacts into A/B/C test groups"""
     
     @staticmethod
-    def split_contacts(df: pd.DataFrame, groups: list = ['A', 'B', 'C'], seed: int = 42) -> pd.DataFrame:
-        logger.info(f"Splitting {len(df):,} contacts into {len(groups)} groups...")
+    def _bounds(groups: Sequence[str], weights: Optional[Sequence[float]]) -> np.ndarray:
+        """Upper edge of each group's share of [0, 1)"""
+        weights = np.ones(len(groups)) if weights is None else np.asarray(weights, dtype=float)
+        if len(weights) != len(groups) or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError(f"Need one non-negative weight per group, got {list(weights)} for {list(groups)}")
+        return np.cumsum(weights) / weights.sum()
+    
+    @staticmethod
+    def _draws(phones, salt: str) -> np.ndarray:
+        """SipHash of each phone keyed by the salt; the top 53 bits as a uniform draw in [0, 1)"""
+        key = hashlib.md5(salt.encode('utf-8')).hexdigest()[:16]
+        values = np.asarray(phones, dtype=object)
+        return (pd.util.hash_array(values, hash_key=key, categorize=False) >> np.uint64(11)) * 2.0 ** -53
+    
+    @staticmethod
+    def _pick(groups: Sequence[str], bounds: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        buckets = np.minimum(np.searchsorted(bounds, positions, side='right'), len(groups) - 1)
+        return np.asarray(groups, dtype=object)[buckets]
+    
+    @classmethod
+    def assign_groups(cls, phones, groups: Sequence[str] = ('A', 'B', 'C'), weights: Optional[Sequence[float]] = None,
+                      salt: str = DEFAULT_SALT) -> np.ndarray:
+        """Group of each (E.164) phone from a salted hash: the same phone, salt and weights always give the
+        same group, whatever the other rows, their order or the process doing the split"""
+        bounds = cls._bounds(groups, weights)
+        return cls._pick(groups, bounds, cls._draws(phones, salt))
+    
+    @staticmethod
+    def strata(df: pd.DataFrame) -> np.ndarray:
+        """Stratum of each row: email presence x band of the quality_score dedup ranked it by"""
+        if 'quality_score' not in df.columns:
+            # A score recomputed from cleaned names is not the one dedup used: the bands would not match it
+            raise ValueError("Stratified split needs the dedup quality_score column (prepare with keep_score=True)")
+        has_email = df['client_email'].notna().to_numpy() if 'client_email' in df.columns else np.zeros(len(df), dtype=bool)
+        return has_email * (len(QUALITY_BANDS) + 1) + np.digitize(df['quality_score'].to_numpy(), QUALITY_BANDS)
+    
+    @classmethod
+    def assign_stratified(cls, phones, strata: np.ndarray, groups: Sequence[str] = ('A', 'B', 'C'),
+                          weights: Optional[Sequence[float]] = None, salt: str = DEFAULT_SALT) -> np.ndarray:
+        """Groups balanced within every stratum (to one contact): each stratum is ordered by the salted hash
+        draw and cut at the weights. Depends on the set of contacts, not their order; a contact may change
+        group when its stratum grows, so use assign_groups where groups must never move."""
+        bounds = cls._bounds(groups, weights)
+        strata = np.asarray(strata)
+        order = np.lexsort((cls._draws(phones, salt), strata))
+        
+        # Rank of each row within its stratum, as a position in (0, 1)
+        sorted_strata = strata[order]
+        starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]]) if len(order) else np.empty(0, dtype=np.intp)
+        sizes = np.diff(np.r_[starts, len(order)])
+        rank = np.arange(len(order)) - np.repeat(starts, sizes)
+        positions = np.empty(len(order))
+        positions[order] = (rank + 0.5) / np.repeat(sizes, sizes)
+        return cls._pick(groups, bounds, positions)
+    
+    @classmethod
+    def group_for(cls, phone: str, groups: Sequence[str] = ('A', 'B', 'C'), weights: Optional[Sequence[float]] = None,
+                  salt: str = DEFAULT_SALT) -> str:
+        """Group of one new contact, without re-splitting anyone else"""
+        return cls.assign_groups([phone], groups, weights, salt)[0]
+    
+    @classmethod
+    def split_contacts(cls, df: pd.DataFrame, groups: list = ['A', 'B', 'C'], seed: int = 42, method: str = 'random',
+                       weights: Optional[List[float]] = None, salt: str = DEFAULT_SALT) -> pd.DataFrame:
+        """'random' (default): the seeded draw over the whole frame, same groups as every earlier run;
+        'hash': stable per-phone groups (assign_groups); 'stratified': groups balanced on email presence and
+        quality band (assign_stratified). Switching method moves contacts between groups: start a new test."""
+        logger.info(f"Splitting {len(df):,} contacts into {len(groups)} groups ({method})...")
         
-        np.random.seed(seed)
         df_split = df.copy()
         
-        df_split['test_group'] = np.random.choice(groups, size=len(df_split), replace=True)
+        if method == 'hash':
+            df_split['test_group'] = cls.assign_groups(df_split['client_phone'], groups, weights, salt)
+        elif method == 'stratified':
+            df_split['test_group'] = cls.assign_stratified(df_split['client_phone'], cls.strata(df_split), groups, weights, salt)
+        elif method == 'random':
+            np.random.seed(seed)
+            df_split['test_group'] = np.random.choice(groups, size=len(df_split), replace=True,
+                                                      p=None if weights is None else np.asarray(weights) / np.sum(weights))
+        else:
+            raise ValueError(f"Unknown split method: {method} (expected one of {', '.join(METHODS)})")
         
         distribution = df_split['test_group'].value_counts().sort_index()
         logger.info("Group distribution:")
@@ -33,17 +113,24 @@ class ABTestSplitter:
         if 'test_group' not in df.columns:
             raise ValueError("DataFrame must have 'test_group' column")
         
+        # Every per-group count in one groupby pass over boolean flags
+        flags = pd.DataFrame({
+            'test_group': df['test_group'].to_numpy(),
+            'has_email': df['client_email'].notna().to_numpy(),
+            'has_first_name': df['first_name'].notna().to_numpy() if 'first_name' in df.columns else np.zeros(len(df), dtype=bool),
+        })
+        counts = flags.groupby('test_group', sort=True, observed=True).agg(
+            total=('has_email', 'size'), has_email=('has_email', 'sum'), has_first_name=('has_first_name', 'sum'))
+        
         stats = {}
         
-        for group in sorted(df['test_group'].unique()):
-            group_df = df[df['test_group'] == group]
-            
+        for group, row in counts.iterrows():
             stats[group] = {
-                'total_contacts': len(group_df),
-                'percentage': (len(group_df) / len(df)) * 100,
-                'has_email': group_df['client_email'].notna().sum(),
-                'email_percentage': (group_df['client_email'].notna().sum() / len(group_df)) * 100,
-                'has_first_name': group_df['first_name'].notna().sum() if 'first_name' in group_df.columns else 0
+                'total_contacts': int(row['total']),
+                'percentage': (row['total'] / len(df)) * 100,
+                'has_email': int(row['has_email']),
+                'email_percentage': (row['has_email'] / row['total']) * 100,
+                'has_first_name': int(row['has_first_name'])
             }
         
         return stats
@@ -53,7 +140,8 @@ class ABTestSplitter:
         if 'test_group' not in df.columns:
             raise ValueError("DataFrame must have 'test_group' column")
         
-        if group not in df['test_group'].unique():
+        in_group = (df['test_group'] == group).to_numpy()
+        if not in_group.any():
             raise ValueError(f"Group '{group}' not found in data")
         
-        return df[df['test_group'] == group].copy()
+        return df.take(np.flatnonzero(in_group))
@@ -0,0 +1,180 @@
+"""Async WhatsApp Sender Module - Concurrent Twilio API integration"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from twilio.rest import Client
+from twilio.http import AsyncHttpClient
+from twilio.base.exceptions import TwilioRestException
+import os
+
+from src.rate_limiter import TokenBucket, create_limiter_from_env
+from src.retry_queue import RetryQueue
+from src.outbox import SendOutbox
+from src.result_sink import ResultSink
+from src.whatsapp_sender import MAX_ERRORS_KEPT, SenderBase
+from src.http_transport import PooledAsyncTwilioHttpClient, transport_settings_from_env
+from src.metrics import SenderMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncWhatsAppSender(SenderBase):
+    """Sends WhatsApp messages via Twilio API with N requests in flight"""
+
+    def __init__(self, account_sid: str, auth_token: str, whatsapp_number: str, rate_limit: int = 10, concurrency: int = 10, subaccount_sid: Optional[str] = None,
+                 limiter: Optional[TokenBucket] = None, http_client_factory: Optional[Callable[[], AsyncHttpClient]] = None, status_callback: Optional[str] = None,
+                 metrics: Optional[SenderMetrics] = None, clock: Callable[[], float] = time.monotonic):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.subaccount_sid = subaccount_sid
+        self.whatsapp_number = whatsapp_number
+        self.rate_limit = rate_limit
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or TokenBucket(rate_limit, clock=clock)
+        self.status_callback = status_callback
+        self.http_client_factory = http_client_factory or (lambda: PooledAsyncTwilioHttpClient(pool_size=self.concurrency))
+        self.http_client: Optional[AsyncHttpClient] = None
+        self.clock = clock
+        self.metrics = metrics or SenderMetrics(whatsapp_number, rate_source=lambda: self.limiter.current_rate, clock=clock)
+
+        self.stats = {'sent': 0, 'failed': 0, 'errors': deque(maxlen=MAX_ERRORS_KEPT), 'error_counts': {}}
+
+        logger.info(f"Async WhatsApp Sender initialized (rate: {rate_limit} msg/sec, concurrency: {self.concurrency})")
+
+    def _create_client(self) -> Client:
+        """Built inside the running event loop, which owns the aiohttp session"""
+        self.http_client = self.http_client_factory()
+        return Client(self.account_sid, self.auth_token, account_sid=self.subaccount_sid, http_client=self.http_client)
+
+    async def _create_message(self, client: Client, result: Dict):
+        self.metrics.call_started()
+        call_start = self.metrics.clock()
+        outcome = 'UNEXPECTED'
+        try:
+            message = await client.messages.create_async(**self._message_params(result))
+            outcome = 'ok'
+            return message
+        except TwilioRestException as e:
+            outcome = str(e.code)
+            raise
+        finally:
+            self.metrics.call_finished(self.metrics.clock() - call_start, outcome)
+
+    async def _attempt_send(self, client: Client, result: Dict, attempt: int, retry_count: int) -> Optional[float]:
+        """Makes one send attempt; returns the backoff before the next one, or None once the result is final"""
+        self.metrics.observe_limiter_wait(await self.limiter.acquire_async())
+
+        result['attempts'] = attempt + 1
+
+        try:
+            message = await self._create_message(client, result)
+        except Exception as e:
+            return self._record_error(result, e, attempt, retry_count)
+
+        self._record_sent(result, message)
+        return None
+
+    async def send_batch_async(self, contacts: List[Dict], template_sid: str, test_mode: bool = False, test_limit: int = 5, retry_count: int = 3,
+                               outbox: Optional[SendOutbox] = None, sink: Optional[ResultSink] = None) -> Dict:
+        """With a sink, results are streamed to it and detailed_results stays empty"""
+        if test_mode:
+            logger.warning(f"🧪 TEST MODE: Limiting to {test_limit} messages")
+            contacts = contacts[:test_limit]
+
+        logger.info(f"Starting async batch send: {len(contacts):,} contacts ({self.concurrency} in flight)")
+
+        slots: List[Optional[Dict]] = [None] * len(contacts)
+        pending = iter(enumerate(contacts, 1))
+        retries = RetryQueue()
+        progress = {'done': 0, 'attempted': 0}
+        before = self._stats_snapshot()
+        start_time = self.clock()
+
+        client = self._create_client()
+
+        def next_job():
+            due = retries.pop_due(self.clock(), limit=1)
+            if due:
+                return due[0]
+
+            for i, contact in pending:
+                phone = contact.get('client_phone')
+                first_name = contact.get('first_name', 'Client')
+
+                if not phone:
+                    logger.warning(f"Skipping contact {i}: No phone number")
+                    continue
+
+                result = self._new_result(phone, template_sid, first_name)
+                progress['attempted'] += 1
+                if sink is None:
+                    slots[i - 1] = result
+                if outbox is not None:
+                    outbox.claim(phone, first_name, template_sid)
+                return result, 0
+
+            return None
+
+        async def worker():
+            while True:
+                job = next_job()
+                if job is None:
+                    if not retries:
+                        return
+                    await asyncio.sleep(max(0.0, retries.next_due() - self.clock()))
+                    continue
+
+                result, attempt = job
+                wait_time = await self._attempt_send(client, result, attempt, retry_count)
+                if wait_time is not None:
+                    retries.push(self.clock() + wait_time, (result, attempt + 1))
+                    continue
+
+                if outbox is not None:
+                    outbox.record(result)
+                if sink is not None:
+                    sink.write(result)
+
+                progress['done'] += 1
+                if progress['done'] % 100 == 0:
+                    logger.info(f"Progress: {progress['done']:,}/{len(contacts):,} ({progress['done']/len(contacts)*100:.1f}%)")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, max(1, len(contacts))))))
+        finally:
+            await client.http_client.close()
+            if outbox is not None:
+                outbox.flush()
+
+        results = [result for result in slots if result is not None]
+        attempted = progress['attempted']
+        elapsed_time = self.clock() - start_time
+
+        return self._batch_summary(before, attempted, elapsed_time, results, sink)
+
+    def send_batch(self, contacts: List[Dict], template_sid: str, test_mode: bool = False, test_limit: int = 5, retry_count: int = 3,
+                   outbox: Optional[SendOutbox] = None, sink: Optional[ResultSink] = None) -> Dict:
+        return asyncio.run(self.send_batch_async(contacts=contacts, template_sid=template_sid, test_mode=test_mode, test_limit=test_limit,
+                                                 retry_count=retry_count, outbox=outbox, sink=sink))
+
+
+def create_async_sender_from_env(concurrency: Optional[int] = None) -> AsyncWhatsAppSender:
+    account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+    auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+    whatsapp_number = os.getenv('TWILIO_WHATSAPP_NUMBER')
+    rate_limit = int(os.getenv('RATE_LIMIT', '10'))
+    if concurrency is None:
+        concurrency = int(os.getenv('SEND_CONCURRENCY', '10'))
+
+    if not all([account_sid, auth_token, whatsapp_number]):
+        raise ValueError("Missing required environment variables")
+
+    limiter = create_limiter_from_env(rate_limit)
+    transport = transport_settings_from_env()
+
+    return AsyncWhatsAppSender(account_sid=account_sid, auth_token=auth_token, whatsapp_number=whatsapp_number, rate_limit=rate_limit, concurrency=concurrency, limiter=limiter,
+                               http_client_factory=lambda: PooledAsyncTwilioHttpClient(pool_size=concurrency, **transport),
+                               status_callback=os.getenv('STATUS_CALLBACK_URL'))
@@ -0,0 +1,181 @@
+"""Chunked Preparation Module - Bounded-memory preparation of CSV exports larger than RAM"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import logging
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from src.data_processor import DataProcessor
+from src.ab_test_splitter import DEFAULT_SALT, ABTestSplitter
+from src.storage import PartitionedWriter, TableWriter
+
+logger = logging.getLogger(__name__)
+
+# Group assignments that need nothing but the row itself (stratified cuts need every row of a stratum)
+STREAMING_METHODS = ('hash', 'random')
+
+
+def phone_keys(phones: pd.Series) -> np.ndarray:
+    """int64 key per fixed phone ('+' and 10-15 digits): the number and its length, so '+0612…' and '+612…' stay apart"""
+    return np.fromiter((int(phone) * 100 + len(phone) for phone in phones), dtype=np.int64, count=len(phones))
+
+
+class PhoneBestIndex:
+    """phone key -> best quality score and the first row holding it, as sorted NumPy arrays (~17 bytes per phone)"""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.scores = np.empty(0, dtype=np.int8)
+        self.rows = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def update(self, keys: np.ndarray, scores: np.ndarray, rows: np.ndarray):
+        """keys unique, rows after every row already indexed: an equal score keeps the earlier row"""
+        order = np.argsort(keys)
+        keys, scores, rows = keys[order], scores[order].astype(np.int8), rows[order]
+
+        pos = np.searchsorted(self.keys, keys)
+        found = pos < len(self.keys)
+        found[found] = self.keys[pos[found]] == keys[found]
+
+        better = found.copy()
+        better[found] = scores[found] > self.scores[pos[found]]
+        self.scores[pos[better]] = scores[better]
+        self.rows[pos[better]] = rows[better]
+
+        new = ~found
+        self.keys = np.insert(self.keys, pos[new], keys[new])
+        self.scores = np.insert(self.scores, pos[new], scores[new])
+        self.rows = np.insert(self.rows, pos[new], rows[new])
+
+    def best_rows(self, keys: np.ndarray) -> np.ndarray:
+        return self.rows[np.searchsorted(self.keys, keys)]
+
+
+class ChunkedPreparer:
+    """Two streaming passes over the CSV with the same result as process_database + split_contacts
+
+    Pass 1 builds the phone -> best row index. Pass 2 keeps those rows, finishes them and spills them to one
+    temp file per quality score; the buckets are then written out from the highest score down, which is the
+    in-memory order (score descending, first occurrence first), and split into test groups on the way.
+    """
+
+    def __init__(self, chunk_size: int = 500_000, french_only: bool = True, groups: List[str] = ['A', 'B', 'C'],
+                 seed: int = 42, method: str = 'random', salt: str = DEFAULT_SALT, tmp_dir: Optional[str] = None):
+        if method not in STREAMING_METHODS:
+            raise ValueError(f"Split method {method!r} cannot stream (expected one of {', '.join(STREAMING_METHODS)})")
+        self.chunk_size = chunk_size
+        self.french_only = french_only
+        self.groups = groups
+        self.seed = seed
+        self.method = method
+        self.salt = salt
+        self.tmp_dir = tmp_dir
+
+    def _chunks(self, input_path: str):
+        return pd.read_csv(input_path, dtype=str, chunksize=self.chunk_size)
+
+    def _build_index(self, input_path: str) -> Tuple[PhoneBestIndex, int, int]:
+        index = PhoneBestIndex()
+        initial_count, valid_count = 0, 0
+
+        for chunk in self._chunks(input_path):
+            initial_count += len(chunk)
+            scored = DataProcessor.score_rows(chunk)
+            valid_count += len(scored)
+
+            best = DataProcessor.keep_best_per_phone(scored)
+            index.update(phone_keys(best['client_phone']), best['quality_score'].to_numpy(), best.index.to_numpy())
+            logger.info(f"Pass 1: {initial_count:,} rows read, {len(index):,} distinct phones")
+
+        return index, initial_count, valid_count
+
+    def _spill_buckets(self, input_path: str, index: PhoneBestIndex, bucket_dir: str) -> Tuple[Dict[int, str], Counter]:
+        buckets: Dict[int, str] = {}
+        dropped: Counter = Counter()
+
+        for chunk in self._chunks(input_path):
+            scored = DataProcessor.score_rows(chunk)
+            winners = scored[index.best_rows(phone_keys(scored['client_phone'])) == scored.index.to_numpy()].copy()
+            finished, chunk_dropped = DataProcessor.finish_rows(winners, self.french_only)
+            dropped.update(chunk_dropped)
+
+            for score, rows in finished.groupby('quality_score', sort=False):
+                path = buckets.setdefault(int(score), os.path.join(bucket_dir, f'score_{int(score)}.pkl'))
+                with open(path, 'ab') as f:
+                    pickle.dump(rows.drop(columns=['quality_score']), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        return buckets, dropped
+
+    @staticmethod
+    def _read_bucket(path: str):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def run(self, input_path: str, output_path: str, partition_by: Optional[str] = None,
+            format: str = 'parquet') -> Tuple[dict, dict]:
+        """Writes the prepared table (format from the extension), or a directory with one `format` file per value
+        of `partition_by`; returns process_database and get_group_statistics-style stats"""
+        logger.info(f"Chunked preparation of {input_path} ({self.chunk_size:,} rows per chunk)")
+        index, initial_count, valid_count = self._build_index(input_path)
+        duplicates_removed = valid_count - len(index)
+
+        bucket_dir = tempfile.mkdtemp(prefix='prep_buckets_', dir=self.tmp_dir)
+        try:
+            buckets, dropped = self._spill_buckets(input_path, index, bucket_dir)
+            del index
+
+            # 'random': same stream as split_contacts' np.random.seed(seed) + one choice() over every row
+            rng = np.random.RandomState(self.seed)
+            counts = {group: {'total': 0, 'email': 0, 'first_name': 0} for group in self.groups}
+            final_count = has_email_count = has_first_name_count = 0
+
+            writer = PartitionedWriter(output_path, partition_by, format) if partition_by else TableWriter(output_path)
+            with writer:
+                for score in sorted(buckets, reverse=True):
+                    for rows in self._read_bucket(buckets[score]):
+                        if self.method == 'hash':
+                            rows['test_group'] = ABTestSplitter.assign_groups(rows['client_phone'], self.groups, salt=self.salt)
+                        else:
+                            rows['test_group'] = rng.choice(self.groups, size=len(rows), replace=True)
+                        writer.write(rows)
+
+                        has_email = rows['client_email'].notna()
+                        has_first_name = rows['first_name'].notna()
+                        final_count += len(rows)
+                        has_email_count += has_email.sum()
+                        has_first_name_count += has_first_name.sum()
+                        for group in self.groups:
+                            in_group = (rows['test_group'] == group).to_numpy()
+                            counts[group]['total'] += in_group.sum()
+                            counts[group]['email'] += has_email.to_numpy()[in_group].sum()
+                            counts[group]['first_name'] += has_first_name.to_numpy()[in_group].sum()
+        finally:
+            shutil.rmtree(bucket_dir, ignore_errors=True)
+
+        dropped = {'invalid_phone': initial_count - valid_count, **dropped}
+        stats = DataProcessor.build_stats(initial_count, duplicates_removed, dropped.get('foreign', 0), final_count,
+                                          has_email_count, has_first_name_count, dropped)
+        group_stats = {
+            group: {
+                'total_contacts': c['total'],
+                'percentage': (c['total'] / final_count) * 100,
+                'has_email': c['email'],
+                'email_percentage': (c['email'] / c['total']) * 100,
+                'has_first_name': c['first_name'],
+            }
+            for group, c in sorted(counts.items()) if c['total']
+        }
+        logger.info(f"Chunked preparation complete: {final_count:,} contacts written to {output_path}")
+        return stats, group_stats
@@ -1,84 +1,55 @@
 """Data Processing Module - Customer data cleaning and validation"""
 
 import re
+import numpy as np
 import pandas as pd
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 import logging
 
+from src.filter_plan import FilterPlan
+from src.name_cleaner import NameCleaner, clean_name, extract_first_name
+from src.phone_normalizer import PhoneNormalizer, normalize_phone
+
 logger = logging.getLogger(__name__)
 
 
 class DataProcessor:
     """Processes and cleans customer data for WhatsApp campaigns"""
     
+    PHONE_PATTERN = r'^\+\d{10,15}$'
+    FRENCH_PREFIX = '+33'
+    PARASITIC_WORDS = ['doit', 'lavage', 'impoli', 'route', 'gardee', 'effectuer', 'portail']
+    names = NameCleaner()
+    phones = PhoneNormalizer()
+    
     @staticmethod
     def fix_phone_format(phone: str) -> Optional[str]:
-        if pd.isna(phone):
-            return None
-        
-        phone = str(phone).strip()
-        if not phone.startswith('+'):
-            phone = '+' + phone
-        
-        if not re.match(r'^\+\d{10,15}$', phone):
-            return None
-        
-        return phone
+        """E.164 form of a valid number ('06 12 34 56 78' -> '+33612345678'), None otherwise"""
+        return normalize_phone(phone)[0]
+    
+    @classmethod
+    def fix_phone_formats(cls, phones: pd.Series) -> pd.Series:
+        """fix_phone_format over a whole column, through the shared PhoneNormalizer"""
+        return cls.phones.e164(phones)
     
     @staticmethod
     def is_french_number(phone: str) -> bool:
         if pd.isna(phone):
             return False
-        return str(phone).startswith('+33')
+        return str(phone).startswith(DataProcessor.FRENCH_PREFIX)
+    
+    @classmethod
+    def french_number_mask(cls, phones: pd.Series) -> np.ndarray:
+        """is_french_number for fixed phones, as a fixed-width prefix compare in NumPy"""
+        return phones.to_numpy().astype(f'U{len(cls.FRENCH_PREFIX)}') == cls.FRENCH_PREFIX
     
     @staticmethod
     def clean_name(name: str) -> Optional[str]:
-        if pd.isna(name):
-            return None
-        
-        name = str(name).strip()
-        name = re.sub(r'\s*\([^)]*\)', '', name)
-        
-        patterns_to_remove = [
-            r'\s+(nous doit|doit)\s+\d+€.*$',
-            r'\s+P\d+.*$',
-            r'\s+(ROUTE|LAVAGE|INTE|BAC|portail|clef gardee).*$',
-        ]
-        
-        for pattern in patterns_to_remove:
-            name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-        
-        name = re.sub(r'\s+', ' ', name).strip()
-        
-        if len(name) < 2:
-            return None
-        
-        return name
+        return clean_name(name)
     
     @staticmethod
     def extract_first_name(full_name: str) -> Optional[str]:
-        if pd.isna(full_name):
-            return None
-        
-        full_name = str(full_name).strip()
-        
-        match = re.match(r'^([A-Z][a-zéèêëàâäôöûüçñ-]+)\s+[A-Z]', full_name)
-        if match:
-            return match.group(1)
-        
-        match = re.match(r'^[A-Z]+\s+([A-Z][a-zéèêëàâäôöûüçñ-]+)', full_name)
-        if match:
-            return match.group(1)
-        
-        first_word = full_name.split()[0] if full_name.split() else full_name
-        
-        skip_prefixes = ['M.', 'Mme', 'Madame', 'Monsieur', 'Dr', 'Mr']
-        if first_word in skip_prefixes:
-            words = full_name.split()
-            if len(words) > 1:
-                first_word = words[1]
-        
-        return first_word.capitalize()
+        return extract_first_name(full_name)
     
     @staticmethod
     def calculate_quality_score(row: pd.Series) -> int:
@@ -89,8 +60,7 @@ class DataProcessor:
         
         name = str(row.get('client_name', ''))
         
-        parasitic_words = ['doit', 'lavage', 'impoli', 'route', 'gardee', 'effectuer', 'portail']
-        if not any(word in name.lower() for word in parasitic_words):
+        if not any(word in name.lower() for word in DataProcessor.PARASITIC_WORDS):
             score += 5
         
         if re.match(r'^[A-Z][a-z]+ [A-Z]+', name):
@@ -102,46 +72,113 @@ class DataProcessor:
         return score
     
     @classmethod
-    def process_database(cls, df: pd.DataFrame, french_only: bool = True) -> Tuple[pd.DataFrame, dict]:
-        logger.info("Starting database processing...")
+    def calculate_quality_scores(cls, df: pd.DataFrame) -> pd.Series:
+        """calculate_quality_score for every row, computed once per distinct email and name"""
+        score = np.zeros(len(df), dtype=np.int64)
+        
+        if 'client_email' in df.columns:
+            codes, emails = pd.factorize(df['client_email'])
+            # Missing emails get code -1, which picks the trailing False
+            has_email = np.append(emails.astype(str).str.strip() != '', False)
+            score += 10 * has_email[codes]
+        
+        if 'client_name' in df.columns:
+            codes, names = pd.factorize(df['client_name'], use_na_sentinel=False)
+            names = pd.Series(names.astype(str))
+        else:
+            codes, names = np.zeros(len(df), dtype=np.intp), pd.Series([''])
         
-        initial_count = len(df)
+        lengths = names.str.len().to_numpy()
+        name_score = 5 * ~names.str.lower().str.contains('|'.join(cls.PARASITIC_WORDS)).to_numpy()
+        name_score += 3 * names.str.match(r'^[A-Z][a-z]+ [A-Z]+').to_numpy()
+        name_score -= 5 * ((lengths < 3) | (lengths > 50))
+        score += name_score[codes]
         
-        df['client_phone'] = df['client_phone'].apply(cls.fix_phone_format)
-        df = df[df['client_phone'].notna()].copy()
+        return pd.Series(score, index=df.index)
+    
+    @staticmethod
+    def keep_best_per_phone(df: pd.DataFrame, score_column: str = 'quality_score') -> pd.DataFrame:
+        """Highest-scoring row per phone (first occurrence on ties), ordered by score descending
         
-        df['quality_score'] = df.apply(cls.calculate_quality_score, axis=1)
+        Same result as a stable sort on the score followed by drop_duplicates(keep='first'),
+        but only the surviving rows get sorted.
+        """
+        codes, uniques = pd.factorize(df['client_phone'])
+        scores = df[score_column].to_numpy()
         
-        before_dedup = len(df)
-        df = df.sort_values('quality_score', ascending=False).drop_duplicates(
-            subset='client_phone', keep='first'
-        )
-        duplicates_removed = before_dedup - len(df)
+        best = np.full(len(uniques), np.iinfo(np.int64).min)
+        np.maximum.at(best, codes, scores)
         
-        df['client_name'] = df['client_name'].apply(cls.clean_name)
-        df = df[df['client_name'].notna()].copy()
+        first_best = np.full(len(uniques), len(df))
+        candidates = np.flatnonzero(scores == best[codes])
+        np.minimum.at(first_best, codes[candidates], candidates)
         
-        df['first_name'] = df['client_name'].apply(cls.extract_first_name)
+        keep = np.sort(first_best)
+        keep = keep[np.argsort(-scores[keep], kind='stable')]
+        return df.take(keep)
+    
+    @classmethod
+    def score_rows(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Row-local work before dedup: fixed phones, rows without a valid one dropped, quality_score added"""
+        df['client_phone'] = cls.fix_phone_formats(df['client_phone'])
+        df = FilterPlan().where('invalid_phone', lambda d: d['client_phone'].notna()).apply(df)
         
+        df['quality_score'] = cls.calculate_quality_scores(df)
+        return df
+    
+    @classmethod
+    def eligibility_plan(cls, french_only: bool = True) -> FilterPlan:
+        """Filters after dedup, on rows whose client_name is already cleaned"""
+        plan = FilterPlan().where('no_name', lambda d: d['client_name'].notna())
         if french_only:
-            before_filter = len(df)
-            df = df[df['client_phone'].apply(cls.is_french_number)].copy()
-            foreign_removed = before_filter - len(df)
-        else:
-            foreign_removed = 0
-        
-        df = df.drop(columns=['quality_score'])
-        
-        stats = {
+            plan.where('foreign', lambda d: cls.french_number_mask(d['client_phone']))
+        return plan
+    
+    @classmethod
+    def finish_rows(cls, df: pd.DataFrame, french_only: bool = True) -> Tuple[pd.DataFrame, Dict[str, int]]:
+        """Row-local work after dedup: cleaned names, name and French filters, first names; also returns rows dropped per filter"""
+        df['client_name'] = cls.names.clean(df['client_name'])
+        plan = cls.eligibility_plan(french_only)
+        df = plan.apply(df)
+        
+        df['first_name'] = cls.names.first_names(df['client_name'])
+        return df, plan.dropped
+    
+    @staticmethod
+    def build_stats(initial_count: int, duplicates_removed: int, foreign_removed: int, final_count: int,
+                    has_email_count: int, has_first_name_count: int, dropped: Optional[Dict[str, int]] = None) -> dict:
+        return {
             'initial_count': initial_count,
             'duplicates_removed': duplicates_removed,
             'foreign_numbers_removed': foreign_removed,
-            'final_count': len(df),
-            'reduction_percentage': ((initial_count - len(df)) / initial_count * 100),
-            'has_email_count': df['client_email'].notna().sum(),
-            'email_percentage': (df['client_email'].notna().sum() / len(df) * 100),
-            'has_first_name_count': df['first_name'].notna().sum(),
-            'first_name_percentage': (df['first_name'].notna().sum() / len(df) * 100)
+            'final_count': final_count,
+            'reduction_percentage': ((initial_count - final_count) / initial_count * 100),
+            'has_email_count': has_email_count,
+            'email_percentage': (has_email_count / final_count * 100),
+            'has_first_name_count': has_first_name_count,
+            'first_name_percentage': (has_first_name_count / final_count * 100),
+            'dropped': dict(dropped or {})
         }
+    
+    @classmethod
+    def process_database(cls, df: pd.DataFrame, french_only: bool = True, keep_score: bool = False) -> Tuple[pd.DataFrame, dict]:
+        """keep_score leaves the dedup quality_score column on the result (the stratified split needs it)"""
+        logger.info("Starting database processing...")
+        
+        initial_count = len(df)
+        
+        df = cls.score_rows(df)
+        
+        before_dedup = len(df)
+        df = cls.keep_best_per_phone(df)
+        duplicates_removed = before_dedup - len(df)
+        
+        df, dropped = cls.finish_rows(df, french_only)
+        if not keep_score:
+            df = df.drop(columns=['quality_score'])
+        dropped = {'invalid_phone': initial_count - before_dedup, **dropped}
+        
+        stats = cls.build_stats(initial_count, duplicates_removed, dropped.get('foreign', 0), len(df),
+                                df['client_email'].notna().sum(), df['first_name'].notna().sum(), dropped)
         
         return df, stats
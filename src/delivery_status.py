@@ -0,0 +1,107 @@
+"""Delivery Status Module - message_sid keyed delivery statuses stored next to the outbox"""
+
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Later statuses win; callbacks can arrive out of order (e.g. 'sent' after 'delivered')
+STATUS_RANK = {
+    'accepted': 0, 'scheduled': 0, 'queued': 1, 'sending': 2, 'sent': 3,
+    'delivered': 4, 'read': 5, 'undelivered': 6, 'failed': 6, 'canceled': 6,
+}
+FINAL_STATUSES = ('delivered', 'read', 'undelivered', 'failed', 'canceled')
+
+
+class DeliveryStatusStore:
+    """Upserts status events in bulk into the campaign outbox database"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS delivery_status (
+            message_sid  TEXT PRIMARY KEY,
+            status       TEXT NOT NULL,
+            status_rank  INTEGER NOT NULL,
+            error_code   TEXT,
+            source       TEXT,
+            updated_at   TEXT
+        )
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(self.SCHEMA)
+        self.conn.commit()
+
+    def record_many(self, events: Iterable[Dict], source: str = 'callback') -> int:
+        """Writes {'message_sid', 'status', 'error_code'} events in one transaction, never downgrading a status"""
+        now = datetime.now().isoformat()
+        rows = [
+            (e['message_sid'], e['status'], STATUS_RANK.get(e['status'], 0),
+             str(e['error_code']) if e.get('error_code') not in (None, '') else None, source, now)
+            for e in events if e.get('message_sid') and e.get('status')
+        ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self.conn.executemany(
+                'INSERT INTO delivery_status (message_sid, status, status_rank, error_code, source, updated_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (message_sid) DO UPDATE SET status = excluded.status, status_rank = excluded.status_rank, '
+                'error_code = COALESCE(excluded.error_code, delivery_status.error_code), source = excluded.source, updated_at = excluded.updated_at '
+                'WHERE excluded.status_rank >= delivery_status.status_rank',
+                rows
+            )
+            self.conn.commit()
+        return len(rows)
+
+    def unresolved(self, campaign: str, batch: Optional[int] = None, include_final: bool = False) -> List[Tuple[str, str]]:
+        """(message_sid, recorded_at) of accepted messages whose delivery status is still unknown or not final"""
+        query = ('SELECT o.message_sid, o.updated_at FROM outbox o '
+                 'LEFT JOIN delivery_status d ON d.message_sid = o.message_sid '
+                 'WHERE o.campaign = ? AND o.state = \'sent\' AND o.message_sid IS NOT NULL')
+        params = [campaign]
+        if batch is not None:
+            query += ' AND o.batch = ?'
+            params.append(batch)
+        if not include_final:
+            query += f" AND (d.status IS NULL OR d.status NOT IN ({', '.join('?' for _ in FINAL_STATUSES)}))"
+            params.extend(FINAL_STATUSES)
+
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def delivery_rates(self, campaign: str, batch: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """Counts of latest delivery status per template for messages Twilio accepted"""
+        query = ('SELECT o.template, COALESCE(d.status, \'unknown\'), COUNT(*) FROM outbox o '
+                 'LEFT JOIN delivery_status d ON d.message_sid = o.message_sid '
+                 'WHERE o.campaign = ? AND o.state = \'sent\'')
+        params = [campaign]
+        if batch is not None:
+            query += ' AND o.batch = ?'
+            params.append(batch)
+
+        rates: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for template, status, count in self.conn.execute(query + ' GROUP BY o.template, 2', params):
+                rates.setdefault(template or '-', {})[status] = count
+        return rates
+
+    def close(self):
+        self.conn.close()
+
+
+def delivery_rate_lines(rates: Dict[str, Dict[str, int]]) -> List[str]:
+    lines = []
+    for template, statuses in sorted(rates.items()):
+        total = sum(statuses.values())
+        delivered = statuses.get('delivered', 0) + statuses.get('read', 0)
+        lines.append(f"Template {template}: {delivered:,}/{total:,} delivered ({delivered / total * 100:.1f}%) {statuses}")
+    return lines
@@ -0,0 +1,41 @@
+"""Filter Plan Module - Row filters declared as named predicates and applied with a single materialization"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Predicate = Callable[[pd.DataFrame], Union[pd.Series, np.ndarray]]
+
+
+class FilterPlan:
+    """Named predicates combined into one mask; the frame is copied once, for the rows that pass them all
+
+    Predicates run in declaration order over the whole frame. A missing result counts as failing, and every
+    row is charged to the first predicate it fails, so `dropped` matches a chain of successive filters.
+    """
+
+    def __init__(self):
+        self.predicates: List[Tuple[str, Predicate]] = []
+        self.dropped: Dict[str, int] = {}
+
+    def where(self, name: str, predicate: Predicate) -> 'FilterPlan':
+        self.predicates.append((name, predicate))
+        return self
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        keep = np.ones(len(df), dtype=bool)
+        self.dropped = {}
+        for name, predicate in self.predicates:
+            passed = predicate(df)
+            if isinstance(passed, pd.Series):
+                passed = passed.to_numpy(dtype=bool, na_value=False)
+            self.dropped[name] = int(np.count_nonzero(keep & ~passed))
+            keep &= passed
+        return keep
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rows passing every predicate, as a new frame (safe to add columns to)"""
+        return df.take(np.flatnonzero(self.mask(df)))
@@ -0,0 +1,148 @@
+"""HTTP Transport Module - Pooled keep-alive clients for the Twilio SDK"""
+
+import os
+import threading
+import logging
+from typing import Dict, Optional
+
+from aiohttp import BasicAuth, ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from twilio.http.request import Request as TwilioRequest
+from twilio.http.response import Response
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_URL = 'https://api.twilio.com'
+
+
+class _PoolMetrics:
+    """Thread-safe request / connection counters shared by both transports"""
+
+    def __init__(self, pool_size: int):
+        self._lock = threading.Lock()
+        self.values = {'pool_size': pool_size, 'requests': 0, 'in_flight': 0, 'peak_in_flight': 0,
+                       'connections_opened': 0, 'connections_reused': 0, 'errors': 0}
+
+    def request_started(self):
+        with self._lock:
+            self.values['requests'] += 1
+            self.values['in_flight'] += 1
+            self.values['peak_in_flight'] = max(self.values['peak_in_flight'], self.values['in_flight'])
+
+    def request_finished(self, failed: bool = False):
+        with self._lock:
+            self.values['in_flight'] -= 1
+            if failed:
+                self.values['errors'] += 1
+
+    def add(self, key: str, count: int = 1):
+        with self._lock:
+            self.values[key] += count
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.values)
+
+
+class PooledTwilioHttpClient(TwilioHttpClient):
+    """requests-based client with a keep-alive pool sized to the caller's concurrency"""
+
+    def __init__(self, pool_size: int = 1, connect_timeout: float = 5.0, read_timeout: float = 30.0, base_url: Optional[str] = None, **kwargs):
+        super().__init__(pool_connections=True, **kwargs)
+        self.timeout = (connect_timeout, read_timeout)
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.metrics = _PoolMetrics(pool_size)
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._adapter = adapter
+
+    def request(self, method, url, *args, **kwargs):
+        if self.base_url:
+            url = url.replace(TWILIO_API_URL, self.base_url, 1)
+
+        self.metrics.request_started()
+        failed = True
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            failed = False
+            return response
+        finally:
+            self.metrics.request_finished(failed)
+
+    def pool_stats(self) -> Dict:
+        stats = self.metrics.snapshot()
+        pools = list(self._adapter.poolmanager.pools._container.values())
+        stats['connections_opened'] = sum(pool.num_connections for pool in pools)
+        stats['connections_reused'] = max(0, stats['requests'] - stats['connections_opened'])
+        return stats
+
+
+class PooledAsyncTwilioHttpClient(AsyncTwilioHttpClient):
+    """aiohttp-based client with a bounded keep-alive connector and explicit timeouts"""
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0, read_timeout: float = 30.0, keepalive_timeout: float = 60.0,
+                 base_url: Optional[str] = None, **kwargs):
+        super().__init__(pool_connections=False, **kwargs)
+        self.client_timeout = ClientTimeout(connect=connect_timeout, sock_read=read_timeout)
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.metrics = _PoolMetrics(pool_size)
+
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_created)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+
+        connector = TCPConnector(limit=pool_size, limit_per_host=pool_size, keepalive_timeout=keepalive_timeout)
+        self.session = ClientSession(connector=connector, timeout=self.client_timeout, trace_configs=[trace_config])
+
+    async def _on_connection_created(self, session, context, params):
+        self.metrics.add('connections_opened')
+
+    async def _on_connection_reused(self, session, context, params):
+        self.metrics.add('connections_reused')
+
+    async def request(self, method: str, url: str, params: Optional[Dict] = None, data: Optional[Dict] = None,
+                      headers: Optional[Dict] = None, auth=None, timeout: Optional[float] = None, allow_redirects: bool = False) -> Response:
+        """Same contract as AsyncTwilioHttpClient.request, but never sends requests without a timeout"""
+        if timeout is not None and timeout <= 0:
+            raise ValueError(timeout)
+        if self.base_url:
+            url = url.replace(TWILIO_API_URL, self.base_url, 1)
+
+        kwargs = {
+            'method': method.upper(),
+            'url': url,
+            'params': params,
+            'data': data,
+            'headers': headers,
+            'auth': BasicAuth(login=auth[0], password=auth[1]) if auth is not None else None,
+            'timeout': ClientTimeout(total=timeout) if timeout is not None else self.client_timeout,
+            'allow_redirects': allow_redirects,
+        }
+
+        self.log_request(kwargs)
+        self._test_only_last_request = TwilioRequest(**kwargs)
+
+        self.metrics.request_started()
+        failed = True
+        try:
+            async with self.session.request(**kwargs) as response:
+                self.log_response(response.status, response)
+                self._test_only_last_response = Response(response.status, await response.text(), response.headers)
+            failed = False
+            return self._test_only_last_response
+        finally:
+            self.metrics.request_finished(failed)
+
+    def pool_stats(self) -> Dict:
+        return self.metrics.snapshot()
+
+
+def transport_settings_from_env() -> Dict:
+    return {
+        'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+        'read_timeout': float(os.getenv('HTTP_READ_TIMEOUT', '30')),
+    }
@@ -0,0 +1,186 @@
+"""Incremental Preparation Module - Re-preparation that only recomputes rows changed since the previous run"""
+
+import os
+import glob
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from typing import List, Optional, Tuple
+
+from src.data_processor import DataProcessor
+from src.phone_normalizer import DEFAULT_REGION
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever phone, score or name rules or the row key change: a cache written by other rules is ignored
+CACHE_VERSION = 2
+# Delta files a cache collects before it is rewritten as one file holding only the last run's rows
+MAX_DELTAS = 8
+# The only columns the derived fields depend on, so edits elsewhere in a row keep its cache entry
+SOURCE_COLUMNS = ['client_phone', 'client_name', 'client_email']
+DERIVED_COLUMNS = ['client_phone', 'quality_score', 'client_name', 'first_name']
+DERIVED_SCHEMA = pa.schema([
+    ('client_phone', pa.string()),
+    ('quality_score', pa.int8()),
+    ('client_name', pa.string()),
+    ('first_name', pa.dictionary(pa.int32(), pa.string())),
+])
+_MISSING = '\x00'
+
+
+def row_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """64-bit hash of every row's key: its `columns` joined into one Arrow string, hashed once"""
+    # Joined in Arrow, missing values as a sentinel: one hash pass instead of one per column plus a combine
+    keys = pc.binary_join_element_wise(*(pa.Array.from_pandas(df[c], type=pa.string()) for c in columns), '\x1f',
+                                       null_handling='replace', null_replacement=_MISSING)
+    return pd.util.hash_pandas_object(pd.Series(pd.arrays.ArrowExtensionArray(keys), copy=False), index=False, categorize=False).to_numpy()
+
+
+class PrepCache:
+    """Derived fields of the source rows seen so far, keyed by row key hash, in a Parquet directory:
+    one base file plus a delta file for each run that met new rows"""
+
+    def __init__(self, path: str, columns: List[str]):
+        self.path = path
+        self.signature = json.dumps({'version': CACHE_VERSION, 'region': DEFAULT_REGION, 'columns': columns})
+        self.parts: List[str] = []
+        self.table: Optional[pa.Table] = None
+
+    def load(self) -> 'PrepCache':
+        parts = sorted(glob.glob(os.path.join(self.path, 'part-*.parquet')))
+        if not parts:
+            logger.info(f"No preparation cache at {self.path}, preparing every row")
+            return self
+
+        tables = []
+        for part in parts:
+            table = pq.read_table(part, read_dictionary=['first_name'])
+            if (table.schema.metadata or {}).get(b'prep_signature', b'').decode() != self.signature:
+                logger.info(f"Preparation cache {self.path} was built from other columns or rules, ignoring it")
+                return self
+            tables.append(table.replace_schema_metadata(None))
+
+        self.parts = parts
+        self.table = pa.concat_tables(tables)
+        logger.info(f"Preparation cache: {len(self.table):,} rows in {len(parts)} file(s)")
+        return self
+
+    def lookup(self, hashes: np.ndarray) -> np.ndarray:
+        """Cache row of every hash, -1 where it is not cached"""
+        if self.table is None:
+            return np.full(len(hashes), -1, dtype=np.intp)
+        return pd.Index(self.table['row_hash'].to_numpy()).get_indexer(hashes)
+
+    def save(self, hashes: np.ndarray, derived: pa.Table, new: np.ndarray):
+        """Appends the `new` rows (positions not found by lookup) as a delta file; a cache that was missing
+        or has MAX_DELTAS deltas is rewritten from this run's rows alone, dropping rows no longer in the source"""
+        if self.table is not None and not len(new):
+            logger.info("Preparation cache unchanged, nothing to save")
+            return
+
+        compact = self.table is None or len(self.parts) > MAX_DELTAS
+        rows = np.arange(len(hashes)) if compact else new
+        # Identical rows share a hash and their derived fields: one entry per hash
+        unique, first = np.unique(hashes[rows], return_index=True)
+        table = derived.take(pa.array(rows[first])).add_column(0, 'row_hash', pa.array(unique))
+        table = table.replace_schema_metadata({'prep_signature': self.signature})
+
+        if compact:
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = os.path.join(self.path, 'base.tmp')
+            pq.write_table(table, tmp_path)
+            for part in glob.glob(os.path.join(self.path, 'part-*.parquet')):
+                os.remove(part)
+            os.replace(tmp_path, os.path.join(self.path, 'part-00000.parquet'))
+            logger.info(f"Preparation cache rewritten: {len(unique):,} rows to {self.path}")
+        else:
+            number = int(os.path.basename(self.parts[-1])[5:10]) + 1
+            pq.write_table(table, os.path.join(self.path, f'part-{number:05d}.parquet'))
+            logger.info(f"Preparation cache: {len(unique):,} new rows appended to {self.path}")
+
+
+def _objects(column: pa.ChunkedArray) -> np.ndarray:
+    if pa.types.is_dictionary(column.type):
+        column = column.combine_chunks().dictionary_decode()
+    return column.to_numpy(zero_copy_only=False)
+
+
+class IncrementalPreparer:
+    """Same result as DataProcessor.process_database; rows already seen in the previous run reuse its
+    cleaned phone, quality score, cleaned name and first name, so only new or edited rows are cleaned"""
+
+    def __init__(self, cache_path: str, french_only: bool = True, keep_score: bool = False):
+        self.cache_path = cache_path
+        self.french_only = french_only
+        self.keep_score = keep_score
+        self.counts = {'reused': 0, 'computed': 0}
+
+    @staticmethod
+    def derive(df: pd.DataFrame) -> pd.DataFrame:
+        """Every row-local field process_database computes, for all rows (phone None where invalid)"""
+        clean_names = DataProcessor.names.clean(df['client_name'])
+        return pd.DataFrame({
+            'client_phone': DataProcessor.fix_phone_formats(df['client_phone']),
+            'quality_score': DataProcessor.calculate_quality_scores(df),
+            'client_name': clean_names,
+            'first_name': DataProcessor.names.first_names(clean_names),
+        }, index=df.index)
+
+    def _derived(self, df: pd.DataFrame, cache: PrepCache, cached: np.ndarray) -> pa.Table:
+        """Derived fields of every row of df, in row order, kept in Arrow: cached rows are never converted"""
+        hit = np.flatnonzero(cached >= 0)
+        new = np.flatnonzero(cached < 0)
+        computed = pa.Table.from_pandas(self.derive(df.iloc[new]), schema=DERIVED_SCHEMA, preserve_index=False)
+        if not len(hit):
+            derived = computed
+        else:
+            reused = cache.table.select(DERIVED_COLUMNS).take(pa.array(cached[hit]))
+            order = np.empty(len(df), dtype=np.int64)
+            order[np.concatenate([hit, new])] = np.arange(len(df))
+            derived = pa.concat_tables([reused, computed]).take(pa.array(order))
+
+        self.counts = {'reused': len(hit), 'computed': len(new)}
+        logger.info(f"Rows reused from the previous run: {len(hit):,}, recomputed: {len(new):,}")
+        return derived
+
+    def process(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+        logger.info("Starting incremental database processing...")
+        initial_count = len(df)
+        columns = [c for c in SOURCE_COLUMNS if c in df.columns]
+        cache = PrepCache(self.cache_path, columns).load()
+
+        hashes = row_hashes(df, columns)
+        cached = cache.lookup(hashes)
+        derived = self._derived(df, cache, cached)
+
+        # The process_database steps, with the row-local work already done
+        phones = _objects(derived['client_phone'])
+        valid = np.flatnonzero(pd.notna(phones))
+        scored = df.take(valid)
+        scored['client_phone'] = phones[valid]
+        scored['quality_score'] = derived['quality_score'].to_numpy()[valid].astype(np.int64)
+
+        best = DataProcessor.keep_best_per_phone(scored)
+        duplicates_removed = len(scored) - len(best)
+
+        # Names only for the rows left after dedup
+        rows = pa.array(df.index.get_indexer(best.index))
+        best['client_name'] = _objects(derived['client_name'].take(rows))
+        best['first_name'] = _objects(derived['first_name'].take(rows))
+        plan = DataProcessor.eligibility_plan(self.french_only)
+        best = plan.apply(best)
+        if not self.keep_score:
+            best = best.drop(columns=['quality_score'])
+        dropped = {'invalid_phone': initial_count - len(scored), **plan.dropped}
+
+        cache.save(hashes, derived, np.flatnonzero(cached < 0))
+
+        stats = DataProcessor.build_stats(initial_count, duplicates_removed, dropped.get('foreign', 0), len(best),
+                                          best['client_email'].notna().sum(), best['first_name'].notna().sum(), dropped)
+        return best, stats
@@ -0,0 +1,252 @@
+"""Metrics Module - Send-path instrumentation with Prometheus and JSON snapshot export"""
+
+import json
+import time
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+API_LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITER_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+RATE_WINDOW_SECONDS = 10
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets + (float('inf'),), self.cumulative()):
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+
+class SenderMetrics:
+    """Thread-safe hot-path counters, gauges and histograms for one sender"""
+
+    def __init__(self, sender: str = '', rate_source: Optional[Callable[[], float]] = None, clock: Callable[[], float] = time.monotonic):
+        self.sender = sender
+        self.rate_source = rate_source
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        self.api_latency = Histogram(API_LATENCY_BUCKETS)
+        self.limiter_wait = Histogram(LIMITER_WAIT_BUCKETS)
+        self.messages = {'sent': 0, 'failed': 0}
+        self.api_calls: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self.in_flight = 0
+
+        self._window_seconds = [-1] * RATE_WINDOW_SECONDS
+        self._window_counts = [0] * RATE_WINDOW_SECONDS
+
+    def observe_limiter_wait(self, seconds: float):
+        with self._lock:
+            self.limiter_wait.observe(seconds)
+
+    def call_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def call_finished(self, seconds: float, outcome: str = 'ok'):
+        with self._lock:
+            self.in_flight -= 1
+            self.api_latency.observe(seconds)
+            self.api_calls[outcome] = self.api_calls.get(outcome, 0) + 1
+
+    def record_retry(self, code):
+        with self._lock:
+            self.retries[str(code)] = self.retries.get(str(code), 0) + 1
+
+    def record_result(self, status: str, code=None):
+        now = self.clock()
+        second = int(now)
+        slot = second % RATE_WINDOW_SECONDS
+        with self._lock:
+            self.messages[status] = self.messages.get(status, 0) + 1
+            if code is not None:
+                self.failures[str(code)] = self.failures.get(str(code), 0) + 1
+            if self._window_seconds[slot] != second:
+                self._window_seconds[slot] = second
+                self._window_counts[slot] = 0
+            self._window_counts[slot] += 1
+
+    def send_rate(self) -> float:
+        """Final results per second over the last RATE_WINDOW_SECONDS"""
+        second = int(self.clock())
+        with self._lock:
+            done = sum(count for stamp, count in zip(self._window_seconds, self._window_counts) if second - stamp < RATE_WINDOW_SECONDS)
+        return done / RATE_WINDOW_SECONDS
+
+    def snapshot(self) -> Dict:
+        send_rate = self.send_rate()
+        with self._lock:
+            return {
+                'sender': self.sender,
+                'messages': dict(self.messages),
+                'in_flight': self.in_flight,
+                'send_rate': send_rate,
+                'limiter_rate': self.rate_source() if self.rate_source else None,
+                'api_calls': dict(self.api_calls),
+                'api_latency': {'count': self.api_latency.count, 'sum': self.api_latency.sum,
+                                'p50': self.api_latency.quantile(0.5), 'p99': self.api_latency.quantile(0.99)},
+                'limiter_wait': {'count': self.limiter_wait.count, 'sum': self.limiter_wait.sum,
+                                 'p50': self.limiter_wait.quantile(0.5), 'p99': self.limiter_wait.quantile(0.99)},
+                'retries': dict(self.retries),
+                'failures': dict(self.failures),
+            }
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+
+def _histogram_lines(name: str, histogram: Histogram, sender: str) -> List[str]:
+    lines = [f'{name}_bucket{_labels(sender=sender, le=bound)} {count}'
+             for bound, count in zip([str(b) for b in histogram.buckets] + ['+Inf'], histogram.cumulative())]
+    lines.append(f'{name}_sum{_labels(sender=sender)} {histogram.sum}')
+    lines.append(f'{name}_count{_labels(sender=sender)} {histogram.count}')
+    return lines
+
+
+def to_prometheus(metrics_list: Sequence[SenderMetrics]) -> str:
+    """Prometheus text exposition (0.0.4) for one or more senders"""
+    families = {
+        'whatsapp_messages_total': ('counter', 'Final send results by status', []),
+        'whatsapp_api_calls_total': ('counter', 'Twilio API calls by outcome (ok or error code)', []),
+        'whatsapp_retries_total': ('counter', 'Scheduled retries by error code', []),
+        'whatsapp_failures_total': ('counter', 'Final failures by error code', []),
+        'whatsapp_in_flight': ('gauge', 'Twilio API calls in flight', []),
+        'whatsapp_send_rate': ('gauge', f'Final results per second over the last {RATE_WINDOW_SECONDS}s', []),
+        'whatsapp_limiter_rate': ('gauge', 'Rate allowed by the limiter (msg/sec)', []),
+        'whatsapp_api_call_seconds': ('histogram', 'Twilio API call latency', []),
+        'whatsapp_limiter_wait_seconds': ('histogram', 'Time spent waiting for a rate-limiter token', []),
+    }
+
+    for metrics in metrics_list:
+        sender = metrics.sender
+        send_rate = metrics.send_rate()
+        with metrics._lock:
+            for status, count in metrics.messages.items():
+                families['whatsapp_messages_total'][2].append(f'whatsapp_messages_total{_labels(sender=sender, status=status)} {count}')
+            for outcome, count in metrics.api_calls.items():
+                families['whatsapp_api_calls_total'][2].append(f'whatsapp_api_calls_total{_labels(sender=sender, outcome=outcome)} {count}')
+            for code, count in metrics.retries.items():
+                families['whatsapp_retries_total'][2].append(f'whatsapp_retries_total{_labels(sender=sender, code=code)} {count}')
+            for code, count in metrics.failures.items():
+                families['whatsapp_failures_total'][2].append(f'whatsapp_failures_total{_labels(sender=sender, code=code)} {count}')
+            families['whatsapp_in_flight'][2].append(f'whatsapp_in_flight{_labels(sender=sender)} {metrics.in_flight}')
+            families['whatsapp_send_rate'][2].append(f'whatsapp_send_rate{_labels(sender=sender)} {send_rate}')
+            if metrics.rate_source:
+                families['whatsapp_limiter_rate'][2].append(f'whatsapp_limiter_rate{_labels(sender=sender)} {metrics.rate_source()}')
+            families['whatsapp_api_call_seconds'][2].extend(_histogram_lines('whatsapp_api_call_seconds', metrics.api_latency, sender))
+            families['whatsapp_limiter_wait_seconds'][2].extend(_histogram_lines('whatsapp_limiter_wait_seconds', metrics.limiter_wait, sender))
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        if samples:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', *samples]
+    return '\n'.join(lines) + '\n'
+
+
+def sender_metrics(sender) -> List[SenderMetrics]:
+    """Metrics of a sender, or of every shard of a SenderPool"""
+    return [s.metrics for s in getattr(sender, 'senders', [sender])]
+
+
+class MetricsExporter:
+    """Serves /metrics over HTTP and/or appends JSON snapshots to a file at a fixed interval"""
+
+    def __init__(self, metrics_list: Sequence[SenderMetrics], port: Optional[int] = None, snapshot_path: Optional[str] = None,
+                 interval: float = 10.0, host: str = '0.0.0.0'):
+        self.metrics_list = list(metrics_list)
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _make_handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = to_prometheus(exporter.metrics_list).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def write_snapshot(self):
+        snapshot = {'timestamp': time.time(), 'senders': [m.snapshot() for m in self.metrics_list]}
+        with open(self.snapshot_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot) + '\n')
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write_snapshot()
+
+    def start(self) -> 'MetricsExporter':
+        if self.port is not None:
+            self.server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+            self.server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+            logger.info(f"Metrics on http://{self.host}:{self.server.server_address[1]}/metrics")
+        if self.snapshot_path:
+            self._threads.append(threading.Thread(target=self._snapshot_loop, daemon=True))
+            logger.info(f"Metrics snapshots every {self.interval:g}s to {self.snapshot_path}")
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.snapshot_path:
+            self.write_snapshot()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,107 @@
+"""Name Cleaner Module - Compiled name rules applied once per distinct value"""
+
+import re
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARENTHESES = re.compile(r'\s*\([^)]*\)')
+TRAILING_NOTES = [
+    re.compile(r'\s+(nous doit|doit)\s+\d+€.*$', re.IGNORECASE),
+    re.compile(r'\s+P\d+.*$', re.IGNORECASE),
+    re.compile(r'\s+(ROUTE|LAVAGE|INTE|BAC|portail|clef gardee).*$', re.IGNORECASE),
+]
+WHITESPACE = re.compile(r'\s+')
+FIRST_THEN_LAST = re.compile(r'^([A-Z][a-zéèêëàâäôöûüçñ-]+)\s+[A-Z]')
+LAST_THEN_FIRST = re.compile(r'^[A-Z]+\s+([A-Z][a-zéèêëàâäôöûüçñ-]+)')
+TITLES = ('M.', 'Mme', 'Madame', 'Monsieur', 'Dr', 'Mr')
+UNSAFE_CHARS = re.compile(r'["\\\n\r\t]')
+
+
+def clean_name(name) -> Optional[str]:
+    """Drops parenthesised remarks and trailing staff notes; None if less than 2 characters remain"""
+    if pd.isna(name):
+        return None
+
+    name = PARENTHESES.sub('', str(name).strip())
+    for pattern in TRAILING_NOTES:
+        name = pattern.sub('', name)
+    name = WHITESPACE.sub(' ', name).strip()
+
+    return name if len(name) >= 2 else None
+
+
+def extract_first_name(full_name) -> Optional[str]:
+    """'Jean DUPONT' / 'DUPONT Jean' -> 'Jean', skipping a leading title; None if there is no word"""
+    if pd.isna(full_name):
+        return None
+
+    full_name = str(full_name).strip()
+    for pattern in (FIRST_THEN_LAST, LAST_THEN_FIRST):
+        match = pattern.match(full_name)
+        if match:
+            return match.group(1)
+
+    words = full_name.split()
+    if not words:
+        return None
+    first = words[1] if words[0] in TITLES and len(words) > 1 else words[0]
+    return first.capitalize()
+
+
+def sanitize_name(name) -> Optional[str]:
+    """Removes characters that break the Twilio ContentVariables JSON; None if nothing is left"""
+    if pd.isna(name):
+        return None
+
+    cleaned = UNSAFE_CHARS.sub('', str(name)).strip()
+    return cleaned or None
+
+
+class NameCleaner:
+    """Runs the name rules over whole columns: each distinct value once, results kept in a bounded LRU across calls"""
+
+    def __init__(self, cache_size: int = 200_000, fallback: Optional[str] = None):
+        self.cache_size = cache_size
+        self.fallback = fallback
+        self._caches = {rule: OrderedDict() for rule in (clean_name, extract_first_name, sanitize_name)}
+        self.counts = {'rows': 0, 'distinct': 0, 'cache_hits': 0}
+
+    def _cached(self, rule: Callable, value) -> Optional[str]:
+        cache = self._caches[rule]
+        try:
+            result = cache[value]
+            cache.move_to_end(value)
+            self.counts['cache_hits'] += 1
+        except KeyError:
+            result = cache[value] = rule(value)
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return result
+
+    def _apply(self, rule: Callable, values: pd.Series, use_fallback: bool) -> pd.Series:
+        codes, uniques = pd.factorize(values)
+        self.counts['rows'] += len(values)
+        self.counts['distinct'] += len(uniques)
+
+        # One slot per distinct value plus a trailing one for missing values (code -1)
+        mapped = np.empty(len(uniques) + 1, dtype=object)
+        mapped[:-1] = [self._cached(rule, value) for value in uniques.tolist()]
+        mapped[-1] = rule(None)
+        if use_fallback and self.fallback is not None:
+            mapped[pd.isna(mapped)] = self.fallback
+
+        return pd.Series(mapped[codes], index=values.index, dtype=object)
+
+    def clean(self, names: pd.Series) -> pd.Series:
+        return self._apply(clean_name, names, use_fallback=False)
+
+    def first_names(self, names: pd.Series) -> pd.Series:
+        return self._apply(extract_first_name, names, use_fallback=True)
+
+    def sanitize(self, names: pd.Series) -> pd.Series:
+        return self._apply(sanitize_name, names, use_fallback=True)
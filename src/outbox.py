@@ -0,0 +1,185 @@
+"""Outbox Module - Durable per-contact send state for crash-safe resume"""
+
+import os
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class SendOutbox:
+    """SQLite (WAL) record of every contact's send state, committed in batches"""
+
+    PENDING = 'pending'
+    IN_FLIGHT = 'in_flight'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            campaign      TEXT NOT NULL,
+            client_phone  TEXT NOT NULL,
+            first_name    TEXT,
+            template      TEXT,
+            template_sid  TEXT,
+            batch         INTEGER NOT NULL DEFAULT 0,
+            state         TEXT NOT NULL,
+            message_sid   TEXT,
+            error_code    TEXT,
+            error_message TEXT,
+            attempts      INTEGER DEFAULT 0,
+            updated_at    TEXT,
+            PRIMARY KEY (campaign, batch, client_phone)
+        )
+    """
+
+    @staticmethod
+    def path_for(input_file: str) -> str:
+        """Default outbox of a prepared contacts file or directory: <input>.outbox.db next to it"""
+        return os.path.splitext(os.path.normpath(input_file))[0] + '.outbox.db'
+
+    def __init__(self, path: str, campaign: str, batch: int = 0, batch_size: int = 200):
+        self.path = path
+        self.campaign = campaign
+        self.batch = batch
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._buffer = []
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(self.SCHEMA)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_state ON outbox (campaign, state, batch)')
+        self.conn.commit()
+
+        logger.info(f"Outbox opened: {path} (campaign: {campaign})")
+
+    def enqueue(self, contacts: List[Dict], template: str, template_sid: str) -> int:
+        """Registers contacts as pending; contacts already known to this campaign batch keep their state"""
+        now = datetime.now().isoformat()
+        rows = [
+            (self.campaign, c['client_phone'], c.get('first_name'), template, template_sid, self.batch, self.PENDING, now)
+            for c in contacts if c.get('client_phone')
+        ]
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO outbox (campaign, client_phone, first_name, template, template_sid, batch, state, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def claim(self, phone: str, first_name: Optional[str], template_sid: str):
+        """Marks one contact in-flight right before its send, committed together with the results buffered so far.
+        Only pending or failed rows move: a contact already sent never goes back to in-flight"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._write_buffer()
+            self.conn.execute(
+                'INSERT INTO outbox (campaign, batch, client_phone, first_name, template_sid, state, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (campaign, batch, client_phone) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at '
+                'WHERE outbox.state IN (?, ?)',
+                (self.campaign, self.batch, phone, first_name, template_sid, self.IN_FLIGHT, now, self.PENDING, self.FAILED)
+            )
+            self.conn.commit()
+
+    def record(self, result: Dict):
+        """Buffers a final send result; written with the next claim or batched commit"""
+        error = result.get('error') or {}
+        state = self.SENT if result['status'] == 'sent' else self.FAILED
+        row = (
+            state, result.get('message_sid'), str(error['code']) if error.get('code') is not None else None,
+            error.get('message'), result.get('attempts', 0), datetime.now().isoformat(), self.campaign, self.batch, result['to']
+        )
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def _write_buffer(self):
+        if not self._buffer:
+            return
+        self.conn.executemany(
+            'UPDATE outbox SET state = ?, message_sid = ?, error_code = ?, error_message = ?, attempts = ?, updated_at = ? '
+            'WHERE campaign = ? AND batch = ? AND client_phone = ?',
+            self._buffer
+        )
+        self._buffer = []
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        self._write_buffer()
+        self.conn.commit()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def phones_in_states(self, states: Iterable[str]) -> Set[str]:
+        states = list(states)
+        placeholders = ', '.join('?' for _ in states)
+        with self._lock:
+            cursor = self.conn.execute(
+                f'SELECT client_phone FROM outbox WHERE campaign = ? AND batch = ? AND state IN ({placeholders})',
+                [self.campaign, self.batch, *states]
+            )
+            return {row[0] for row in cursor}
+
+    def rows(self, template: Optional[str] = None, states: Optional[Iterable[str]] = None) -> List[Dict]:
+        query = 'SELECT * FROM outbox WHERE campaign = ? AND batch = ?'
+        params = [self.campaign, self.batch]
+        if template is not None:
+            query += ' AND template = ?'
+            params.append(template)
+        if states is not None:
+            states = list(states)
+            query += f" AND state IN ({', '.join('?' for _ in states)})"
+            params.extend(states)
+
+        with self._lock:
+            cursor = self.conn.execute(query + ' ORDER BY rowid', params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def settle_in_flight(self, found: Dict[str, Dict], missing: Iterable[str]) -> int:
+        """Resolves contacts left in-flight by a stopped run: sent with the message found for them, or pending again
+        when no message was created; returns how many rows changed"""
+        now = datetime.now().isoformat()
+        sent_rows = [(self.SENT, f['message_sid'], now, self.campaign, self.batch, phone, self.IN_FLIGHT) for phone, f in found.items()]
+        pending_rows = [(self.PENDING, None, now, self.campaign, self.batch, phone, self.IN_FLIGHT) for phone in missing]
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'UPDATE outbox SET state = ?, message_sid = ?, updated_at = ? WHERE campaign = ? AND batch = ? AND client_phone = ? AND state = ?',
+                sent_rows + pending_rows
+            )
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def latest_unfinished_batch(self) -> Optional[int]:
+        """Latest batch with contacts still pending or in flight"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT MAX(batch) FROM outbox WHERE campaign = ? AND state IN (?, ?)',
+                (self.campaign, self.PENDING, self.IN_FLIGHT)
+            ).fetchone()
+        return row[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            cursor = self.conn.execute(
+                'SELECT state, COUNT(*) FROM outbox WHERE campaign = ? AND batch = ? GROUP BY state', (self.campaign, self.batch)
+            )
+            return dict(cursor.fetchall())
+
+    def close(self):
+        self.flush()
+        self.conn.close()
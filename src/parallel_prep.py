@@ -0,0 +1,157 @@
+"""Parallel Preparation Module - process_database spread over a process pool, partitioned by phone"""
+
+import io
+import os
+import mmap
+import pickle
+import shutil
+import tempfile
+import logging
+import numpy as np
+import pandas as pd
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+from src.data_processor import DataProcessor
+from src.chunked_prep import phone_keys
+
+logger = logging.getLogger(__name__)
+
+# A slice's rows are indexed (slice << SLICE_SHIFT) + row within the slice until the real row numbers are known
+SLICE_SHIFT = 40
+SCAN_BLOCK = 64 * 1024 * 1024
+
+
+def _count(data: mmap.mmap, char: bytes, start: int, end: int) -> int:
+    return sum(data[pos:min(pos + SCAN_BLOCK, end)].count(char) for pos in range(start, end, SCAN_BLOCK))
+
+
+def record_starts(path: str, targets: List[int]) -> List[int]:
+    """Offset of the first CSV record starting at or after each (ascending) target
+
+    A newline ends a record only when an even number of '"' precede it, which also holds for escaped "" quotes,
+    so quoted fields spanning lines are never cut.
+    """
+    starts = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pos, quotes = 0, 0
+        for target in targets:
+            target = max(target, pos)
+            quotes += _count(data, b'"', pos, target)
+            pos = target
+            while pos < len(data):
+                newline = data.find(b'\n', pos)
+                if newline == -1:
+                    quotes += _count(data, b'"', pos, len(data))
+                    pos = len(data)
+                    break
+                quotes += _count(data, b'"', pos, newline)
+                pos = newline + 1
+                if quotes % 2 == 0:
+                    break
+            starts.append(pos)
+    return starts
+
+
+def split_csv(path: str, slices: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """End of the header line and (start, end) byte ranges of about equal size covering whole records"""
+    size = os.path.getsize(path)
+    if not size:
+        return 0, []
+    header_end = record_starts(path, [0])[0]
+    body = size - header_end
+    starts = [header_end] + record_starts(path, [header_end + body * i // slices for i in range(1, slices)]) + [size]
+    return header_end, [(start, end) for start, end in zip(starts, starts[1:]) if end > start]
+
+
+def _score_and_partition(args: Tuple[str, List[str], int, Tuple[int, int], int, str]) -> Tuple[int, int, int]:
+    """Map step: parse one byte slice, score its rows and spill them to one file per phone-hash partition"""
+    path, columns, slice_id, (start, end), partitions, spill_dir = args
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if not data.strip():
+        return slice_id, 0, 0
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=str)
+    chunk.index = pd.RangeIndex(len(chunk)) + (slice_id << SLICE_SHIFT)
+
+    scored = DataProcessor.score_rows(chunk)
+    part = phone_keys(scored['client_phone']) % partitions
+    for i in range(partitions):
+        with open(os.path.join(spill_dir, f'slice_{slice_id}_part_{i}.pkl'), 'wb') as f:
+            pickle.dump(scored[part == i], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return slice_id, len(chunk), len(scored)
+
+
+def _dedup_and_finish(args: Tuple[int, int, bool, str]) -> Tuple[pd.DataFrame, int, Dict[str, int]]:
+    """Reduce step: every row of a phone lands in the same partition, so dedup needs nothing from the others"""
+    partition, slices, french_only, spill_dir = args
+    pieces = []
+    for slice_id in range(slices):
+        path = os.path.join(spill_dir, f'slice_{slice_id}_part_{partition}.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                pieces.append(pickle.load(f))
+
+    # Slices in file order keep the partition in original row order, which keep_best_per_phone's ties rely on
+    scored = pd.concat(pieces)
+    best = DataProcessor.keep_best_per_phone(scored)
+    finished, dropped = DataProcessor.finish_rows(best, french_only)
+    return finished, len(scored) - len(best), dropped
+
+
+class ParallelPreparer:
+    """Same result as DataProcessor.process_database, with parsing and the work split across `workers` processes
+
+    The CSV is cut into byte slices on record boundaries that the workers parse themselves; scored rows are
+    exchanged through temp files, partitioned by phone hash so each worker can dedup its share alone.
+    """
+
+    def __init__(self, workers: int, slices_per_worker: int = 4, french_only: bool = True, tmp_dir: Optional[str] = None,
+                 keep_score: bool = False):
+        self.workers = max(1, workers)
+        self.slices_per_worker = slices_per_worker
+        self.french_only = french_only
+        self.keep_score = keep_score
+        self.tmp_dir = tmp_dir
+
+    def process_csv(self, input_path: str) -> Tuple[pd.DataFrame, dict]:
+        logger.info(f"Parallel preparation of {input_path} on {self.workers} workers")
+        columns = list(pd.read_csv(input_path, dtype=str, nrows=0).columns)
+        _, ranges = split_csv(input_path, self.workers * self.slices_per_worker)
+
+        spill_dir = tempfile.mkdtemp(prefix='prep_parallel_', dir=self.tmp_dir)
+        try:
+            with Pool(self.workers) as pool:
+                counts = {slice_id: (rows, valid) for slice_id, rows, valid in pool.imap_unordered(_score_and_partition, [
+                    (input_path, columns, slice_id, byte_range, self.workers, spill_dir)
+                    for slice_id, byte_range in enumerate(ranges)
+                ])}
+                slice_rows = {slice_id: rows for slice_id, (rows, _) in counts.items()}
+                logger.info(f"Scored {sum(slice_rows.values()):,} rows from {len(ranges)} slices")
+                results = pool.map(_dedup_and_finish, [
+                    (partition, len(ranges), self.french_only, spill_dir) for partition in range(self.workers)
+                ])
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+        df = pd.concat([finished for finished, _, _ in results])
+        initial_count = sum(slice_rows.values())
+        duplicates_removed = sum(duplicates for _, duplicates, _ in results)
+        dropped = Counter({'invalid_phone': initial_count - sum(valid for _, valid in counts.values())})
+        for _, _, partition_dropped in results:
+            dropped.update(partition_dropped)
+
+        # Real row numbers, then back to the single-process order: score descending, earliest row first
+        offsets = np.cumsum([0] + [slice_rows[i] for i in range(len(ranges))], dtype=np.int64)
+        index = df.index.to_numpy(dtype=np.int64)
+        df.index = offsets[index >> SLICE_SHIFT] + (index & ((1 << SLICE_SHIFT) - 1))
+        df = df.iloc[np.lexsort((df.index.to_numpy(), -df['quality_score'].to_numpy()))]
+        if not self.keep_score:
+            df = df.drop(columns=['quality_score'])
+
+        stats = DataProcessor.build_stats(initial_count, duplicates_removed, dropped['foreign'], len(df),
+                                          df['client_email'].notna().sum(), df['first_name'].notna().sum(), dropped)
+        logger.info(f"Parallel preparation complete: {len(df):,} contacts")
+        return df, stats
@@ -0,0 +1,186 @@
+"""Phone Normalizer Module - E.164, country and line type for whole columns of raw phone numbers"""
+
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import phonenumbers
+from phonenumbers import NumberParseException, PhoneNumberType
+from collections import OrderedDict
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = 'FR'
+
+LINE_TYPES = {
+    PhoneNumberType.MOBILE: 'mobile',
+    PhoneNumberType.FIXED_LINE: 'landline',
+    PhoneNumberType.FIXED_LINE_OR_MOBILE: 'landline_or_mobile',
+    PhoneNumberType.VOIP: 'voip',
+    PhoneNumberType.TOLL_FREE: 'toll_free',
+    PhoneNumberType.PREMIUM_RATE: 'premium_rate',
+    PhoneNumberType.SHARED_COST: 'shared_cost',
+    PhoneNumberType.PERSONAL_NUMBER: 'personal',
+    PhoneNumberType.PAGER: 'pager',
+    PhoneNumberType.UAN: 'uan',
+    PhoneNumberType.VOICEMAIL: 'voicemail',
+}
+
+# Number types phonenumbers checks before fixed line / mobile
+_OTHER_DESCS = ('premium_rate', 'toll_free', 'shared_cost', 'voip', 'personal_number', 'pager', 'uan', 'voicemail')
+SEPARATORS = re.compile(r'[\s.\-()/]+')
+
+Normalized = Tuple[Optional[str], Optional[str], Optional[str]]
+INVALID: Normalized = (None, None, None)
+
+
+def normalize_phone(raw, default_region: str = DEFAULT_REGION) -> Normalized:
+    """(E.164, region, line type) of one raw number through phonenumbers; INVALID if it is not a valid number"""
+    if pd.isna(raw):
+        return INVALID
+    try:
+        number = phonenumbers.parse(str(raw), default_region)
+    except NumberParseException:
+        return INVALID
+    # Length check first: far cheaper than is_valid_number, which implies it
+    if not phonenumbers.is_possible_number(number) or not phonenumbers.is_valid_number(number):
+        return INVALID
+    return (phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164),
+            phonenumbers.region_code_for_number(number),
+            LINE_TYPES.get(phonenumbers.number_type(number), 'unknown'))
+
+
+class _RegionFastPath:
+    """Resolves the usual spellings of default-region numbers in bulk, with the region's own phonenumbers
+    patterns run as Arrow (RE2) kernels over the whole array
+
+    Only decides where the result cannot differ from normalize_phone: an unambiguous national number that is
+    invalid for the region or matches exactly one of the fixed-line / mobile patterns.
+    """
+
+    UNDECIDED, INVALID, MOBILE, LANDLINE = 0, 1, 2, 3
+
+    def __init__(self, region: str):
+        metadata = phonenumbers.PhoneMetadata.metadata_for_region(region)
+        self.region = region
+        self.enabled = (
+            metadata is not None
+            and len(phonenumbers.COUNTRY_CODE_TO_REGION_CODE.get(metadata.country_code, ())) == 1
+            and metadata.mobile is not None and metadata.fixed_line is not None
+            and (metadata.national_prefix or '').isdigit()
+            and (metadata.national_prefix_for_parsing or metadata.national_prefix) == metadata.national_prefix
+            and (metadata.international_prefix or '').isdigit()
+        )
+        if not self.enabled:
+            return
+
+        cc, prefix, idd = str(metadata.country_code), metadata.national_prefix, metadata.international_prefix
+        self.country_code = cc
+        self.lengths = pa.array(sorted(set(metadata.general_desc.possible_length)), type=pa.int32())
+        # Leftmost branch wins: +CC..., IDD CC..., national prefix..., CC... without '+', bare national number
+        self.forms = rf'^(?:\+{cc}(?P<intl>\d*)|{idd}{cc}(?P<idd>\d*)|{prefix}(?P<national>\d*)|{cc}(?P<cc>\d*)|(?P<bare>[1-9]\d*))$'
+        self.general = _full(metadata.general_desc.national_number_pattern)
+        self.mobile = _full(metadata.mobile.national_number_pattern)
+        self.fixed = _full(metadata.fixed_line.national_number_pattern)
+        others = [getattr(metadata, name) for name in _OTHER_DESCS]
+        others = [desc.national_number_pattern for desc in others if desc is not None and desc.national_number_pattern]
+        self.other = _full('|'.join(f'(?:{pattern})' for pattern in others)) if others else None
+
+    def _has_length(self, values: pa.Array) -> pa.Array:
+        return pc.is_in(pc.utf8_length(values), value_set=self.lengths)
+
+    def _national_numbers(self, digits: pa.Array) -> pa.Array:
+        forms = pc.extract_regex(digits, pattern=self.forms)
+        intl, idd, national, cc, bare = [pc.struct_field(forms, [i]) for i in range(5)]
+        found = [pc.greater(pc.utf8_length(branch), 0) for branch in (intl, idd, national, cc, bare)]
+
+        # phonenumbers strips the national prefix only if the whole string is not a national number itself,
+        # and a leading country code only if the whole string cannot be one while the rest can
+        found[2] = pc.and_(found[2], pc.invert(pc.match_substring_regex(digits, self.general)))
+        found[3] = pc.and_(found[3], pc.and_(pc.invert(self._has_length(digits)), self._has_length(cc)))
+        return pc.case_when(pc.make_struct(*found), intl, idd, national, cc, bare)
+
+    def resolve_many(self, raw: pa.Array) -> Tuple[np.ndarray, pa.Array]:
+        """Per value: UNDECIDED / INVALID / MOBILE / LANDLINE, and the national number"""
+        national = self._national_numbers(pc.replace_substring_regex(raw, pattern=SEPARATORS.pattern, replacement=''))
+        usable = pc.and_(pc.is_valid(national), pc.invert(pc.starts_with(national, '0')))
+
+        def test(pattern: Optional[str]) -> np.ndarray:
+            if pattern is None:
+                return np.zeros(len(raw), dtype=bool)
+            return pc.match_substring_regex(national, pattern).fill_null(False).to_numpy(zero_copy_only=False)
+
+        usable = usable.fill_null(False).to_numpy(zero_copy_only=False)
+        possible = pc.and_(self._has_length(national), pc.match_substring_regex(national, self.general))
+        possible = possible.fill_null(False).to_numpy(zero_copy_only=False)
+        other, mobile, fixed = test(self.other), test(self.mobile), test(self.fixed)
+
+        status = np.full(len(raw), self.UNDECIDED, dtype=np.int8)
+        status[usable & ~possible] = self.INVALID
+        typed = usable & possible & ~other
+        status[typed & ~mobile & ~fixed] = self.INVALID
+        status[typed & mobile & ~fixed] = self.MOBILE
+        status[typed & fixed & ~mobile] = self.LANDLINE
+        return status, national
+
+
+def _full(pattern: str) -> str:
+    return f'^(?:{pattern})$'
+
+
+class PhoneNormalizer:
+    """normalize_phone over whole columns: each distinct raw string once, common spellings of default-region
+    numbers resolved from the region patterns, the rest parsed by phonenumbers and kept in a bounded LRU"""
+
+    def __init__(self, default_region: str = DEFAULT_REGION, cache_size: int = 200_000):
+        self.default_region = default_region
+        self.cache_size = cache_size
+        self._fast = _RegionFastPath(default_region)
+        self._cache: 'OrderedDict[str, Normalized]' = OrderedDict()
+        self.counts = {'rows': 0, 'distinct': 0, 'fast_path': 0, 'parsed': 0, 'cache_hits': 0}
+
+    def _parse(self, raw: str) -> Normalized:
+        try:
+            result = self._cache[raw]
+            self._cache.move_to_end(raw)
+            self.counts['cache_hits'] += 1
+        except KeyError:
+            result = self._cache[raw] = normalize_phone(raw, self.default_region)
+            self.counts['parsed'] += 1
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def normalize(self, phones: pd.Series) -> pd.DataFrame:
+        """e164 / country / line_type per row, all None where the number is missing or invalid"""
+        codes, uniques = pd.factorize(phones)
+        self.counts['rows'] += len(phones)
+        self.counts['distinct'] += len(uniques)
+
+        # One slot per distinct value plus a trailing one for missing values (code -1)
+        raw = [str(value) for value in uniques.tolist()]
+        e164 = np.full(len(raw) + 1, None, dtype=object)
+        country = np.full(len(raw) + 1, None, dtype=object)
+        line_type = np.full(len(raw) + 1, None, dtype=object)
+
+        undecided = np.arange(len(raw))
+        if self._fast.enabled and raw:
+            fast = self._fast
+            status, national = fast.resolve_many(pa.array(raw, type=pa.string()))
+            typed = np.flatnonzero(status >= fast.MOBILE)
+            e164[typed] = pc.binary_join_element_wise('+' + fast.country_code, national.take(pa.array(typed)), '').to_numpy(zero_copy_only=False)
+            country[typed] = fast.region
+            line_type[typed] = np.where(status[typed] == fast.MOBILE, 'mobile', 'landline')
+            undecided = np.flatnonzero(status == fast.UNDECIDED)
+            self.counts['fast_path'] += len(raw) - len(undecided)
+
+        for i in undecided.tolist():
+            e164[i], country[i], line_type[i] = self._parse(raw[i])
+
+        return pd.DataFrame({'e164': e164[codes], 'country': country[codes], 'line_type': line_type[codes]}, index=phones.index)
+
+    def e164(self, phones: pd.Series) -> pd.Series:
+        return self.normalize(phones)['e164']
@@ -0,0 +1,134 @@
+"""Rate Limiter Module - Token buckets shared by concurrent senders"""
+
+import time
+import asyncio
+import threading
+import logging
+from typing import Callable, Optional
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket, usable from threads and asyncio tasks"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.last_refill = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def current_rate(self) -> float:
+        return self.rate
+
+    def on_success(self):
+        pass
+
+    def on_error(self, code) -> bool:
+        return False
+
+    def _refill(self, now: float):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.last_refill = now
+
+    def try_acquire(self) -> float:
+        """Takes one token if available, otherwise returns the seconds to wait"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill(self.clock())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def reserve(self) -> float:
+        """Takes one token now, going into debt if needed, and returns the seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self) -> float:
+        wait_time = self.reserve()
+        if wait_time > 0:
+            self.sleep(wait_time)
+        return wait_time
+
+    async def acquire_async(self) -> float:
+        """One sleep per caller: waiters queue up on reserved tokens instead of all waking for each new one"""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """AIMD token bucket: additive increase on success, multiplicative decrease on throttling"""
+
+    THROTTLE_CODES = (20429, 20003)
+
+    def __init__(self, rate: float, min_rate: float = 1.0, max_rate: Optional[float] = None, increase: float = 1.0,
+                 decrease: float = 0.5, cooldown: float = 1.0, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        super().__init__(rate, capacity, clock, sleep)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.fixed_capacity = capacity is not None
+        self.last_decrease = float('-inf')
+
+    def _set_rate(self, rate: float):
+        self.rate = max(self.min_rate, min(self.max_rate, rate))
+        if not self.fixed_capacity:
+            self.capacity = max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def on_success(self):
+        """Adds `increase` msg/sec for roughly every second's worth of successful sends"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._set_rate(self.rate + self.increase / max(self.rate, 1.0))
+
+    def on_throttle(self):
+        """Cuts the shared rate once per cooldown, so a burst of 429s from in-flight calls counts once"""
+        with self._lock:
+            now = self.clock()
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self._refill(now)
+            self._set_rate(self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+            logger.warning(f"⚠ Throttled by Twilio, send rate cut to {self.rate:.1f} msg/sec")
+
+    def on_error(self, code) -> bool:
+        if code in self.THROTTLE_CODES:
+            self.on_throttle()
+            return True
+        return False
+
+
+def create_limiter_from_env(rate_limit: int, capacity: Optional[float] = None) -> TokenBucket:
+    """Fixed RATE_LIMIT bucket, or an AIMD limiter climbing to RATE_LIMIT_MAX when ADAPTIVE_RATE_LIMIT=true"""
+    adaptive = os.getenv('ADAPTIVE_RATE_LIMIT', 'false').lower() == 'true'
+
+    if adaptive and rate_limit > 0:
+        max_rate = float(os.getenv('RATE_LIMIT_MAX', '80'))
+        return AdaptiveRateLimiter(rate_limit, max_rate=max(max_rate, rate_limit), capacity=capacity)
+
+    return TokenBucket(rate_limit, capacity)
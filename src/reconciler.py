@@ -0,0 +1,192 @@
+"""Reconciler Module - Bulk re-check of delivery statuses through the Messages API"""
+
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from twilio.rest import Client
+from twilio.http import AsyncHttpClient
+from twilio.base.exceptions import TwilioRestException
+import os
+
+from src.rate_limiter import TokenBucket, create_limiter_from_env
+from src.outbox import SendOutbox
+from src.whatsapp_sender import RETRYABLE_CODES
+from src.http_transport import PooledAsyncTwilioHttpClient, transport_settings_from_env
+
+logger = logging.getLogger(__name__)
+
+
+class StatusReconciler:
+    """Lists messages by date window, then fetches the leftovers one by one, N requests in flight under a token bucket"""
+
+    def __init__(self, account_sid: str, auth_token: str, rate_limit: int = 50, concurrency: int = 10, subaccount_sid: Optional[str] = None,
+                 limiter: Optional[TokenBucket] = None, http_client_factory: Optional[Callable[[], AsyncHttpClient]] = None,
+                 window_minutes: int = 60, pad_minutes: int = 15, page_size: int = 1000, max_retries: int = 5, flush_size: int = 1000):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.subaccount_sid = subaccount_sid
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or TokenBucket(rate_limit)
+        self.http_client_factory = http_client_factory or (lambda: PooledAsyncTwilioHttpClient(pool_size=self.concurrency))
+        self.window = timedelta(minutes=window_minutes)
+        self.pad = timedelta(minutes=pad_minutes)
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.flush_size = flush_size
+
+        logger.info(f"Status reconciler initialized (rate: {rate_limit} req/sec, concurrency: {self.concurrency})")
+
+    def _windows(self, sent_times: List[datetime]) -> List[Tuple[datetime, datetime]]:
+        """Padded date_sent windows covering every window that holds at least one target"""
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        buckets = sorted({(t - epoch) // self.window for t in sent_times})
+        return [(epoch + b * self.window - self.pad, epoch + (b + 1) * self.window + self.pad) for b in buckets]
+
+    async def _call(self, request: Callable, stats: Dict):
+        for attempt in range(self.max_retries):
+            await self.limiter.acquire_async()
+            stats['api_calls'] += 1
+            try:
+                response = await request()
+                self.limiter.on_success()
+                return response
+            except TwilioRestException as e:
+                self.limiter.on_error(e.code)
+                if e.code in RETRYABLE_CODES and attempt < self.max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise
+
+    async def _drain(self, jobs: List, run: Callable, stats: Dict):
+        async def worker():
+            while jobs:
+                job = jobs.pop()
+                try:
+                    await run(job)
+                except Exception as e:
+                    stats['errors'] += 1
+                    logger.error(f"✗ Reconciliation request failed: {e}")
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, max(1, len(jobs))))))
+
+    async def reconcile_async(self, targets: Dict[str, datetime], on_events: Callable[[List[Dict]], None], use_listing: bool = True) -> Dict:
+        """targets: message_sid -> UTC time it was sent; on_events receives status events in chunks of flush_size"""
+        start_time = time.time()
+        client = Client(self.account_sid, self.auth_token, account_sid=self.subaccount_sid, http_client=self.http_client_factory())
+        remaining = set(targets)
+        events: List[Dict] = []
+        stats = {'targets': len(targets), 'resolved_by_list': 0, 'resolved_by_fetch': 0, 'not_found': 0, 'errors': 0, 'api_calls': 0, 'status_counts': {}}
+
+        def collect(message, source: str):
+            remaining.discard(message.sid)
+            stats[source] += 1
+            stats['status_counts'][message.status] = stats['status_counts'].get(message.status, 0) + 1
+            events.append({'message_sid': message.sid, 'status': message.status, 'error_code': message.error_code})
+            if len(events) >= self.flush_size:
+                on_events(events[:])
+                events.clear()
+
+        async def list_window(window: Tuple[datetime, datetime]):
+            after, before = window
+            page = await self._call(lambda: client.messages.page_async(date_sent_after=after, date_sent_before=before, page_size=self.page_size), stats)
+            while page is not None:
+                for message in page:
+                    if message.sid in remaining:
+                        collect(message, 'resolved_by_list')
+                page = await self._call(page.next_page_async, stats)
+
+        async def fetch_one(message_sid: str):
+            try:
+                collect(await self._call(client.messages(message_sid).fetch_async, stats), 'resolved_by_fetch')
+            except TwilioRestException as e:
+                stats['not_found' if e.status == 404 else 'errors'] += 1
+
+        try:
+            if use_listing and targets:
+                windows = self._windows(list(targets.values()))
+                logger.info(f"Listing {len(windows):,} date windows for {len(targets):,} messages")
+                await self._drain(windows, list_window, stats)
+
+            if remaining:
+                logger.info(f"Fetching {len(remaining):,} messages individually")
+                await self._drain(list(remaining), fetch_one, stats)
+        finally:
+            await client.http_client.close()
+            if events:
+                on_events(events)
+
+        stats['elapsed_time_seconds'] = time.time() - start_time
+        stats['unresolved'] = len(remaining)
+        logger.info(f"Reconciliation complete: {stats['resolved_by_list'] + stats['resolved_by_fetch']:,}/{len(targets):,} resolved "
+                    f"with {stats['api_calls']:,} API calls in {stats['elapsed_time_seconds']:.1f}s")
+        return stats
+
+    def reconcile(self, targets: Dict[str, datetime], on_events: Callable[[List[Dict]], None], use_listing: bool = True) -> Dict:
+        return asyncio.run(self.reconcile_async(targets=targets, on_events=on_events, use_listing=use_listing))
+
+
+    async def find_by_recipient_async(self, claimed: Dict[str, datetime]) -> Dict:
+        """claimed: phone -> UTC time its send started, for sends whose outcome was never recorded.
+        Returns the latest message created for each phone since then ('found'), the phones with none ('missing')
+        and the phones whose lookup failed (in neither)"""
+        start_time = time.time()
+        client = Client(self.account_sid, self.auth_token, account_sid=self.subaccount_sid, http_client=self.http_client_factory())
+        stats = {'targets': len(claimed), 'found': {}, 'missing': set(), 'errors': 0, 'api_calls': 0}
+
+        async def lookup(phone: str):
+            since = claimed[phone] - self.pad
+            # No DateSent filter: a message still queued has no date_sent yet, and the newest page is enough
+            page = await self._call(lambda: client.messages.page_async(to=f"whatsapp:{phone}", page_size=20), stats)
+            messages = [m for m in page if m.date_created is not None and m.date_created >= since]
+            if not messages:
+                stats['missing'].add(phone)
+                return
+            message = max(messages, key=lambda m: m.date_created)
+            stats['found'][phone] = {'message_sid': message.sid, 'status': message.status, 'error_code': message.error_code}
+
+        try:
+            await self._drain(list(claimed), lookup, stats)
+        finally:
+            await client.http_client.close()
+
+        stats['elapsed_time_seconds'] = time.time() - start_time
+        logger.info(f"In-flight lookup: {len(stats['found']):,} sent, {len(stats['missing']):,} never sent, {stats['errors']:,} errors "
+                    f"out of {len(claimed):,}")
+        return stats
+
+    def find_by_recipient(self, claimed: Dict[str, datetime]) -> Dict:
+        return asyncio.run(self.find_by_recipient_async(claimed))
+
+
+def to_utc(recorded_at: str) -> datetime:
+    """Outbox timestamps are naive local time"""
+    return datetime.fromisoformat(recorded_at).astimezone(timezone.utc)
+
+
+def resolve_in_flight(outbox: SendOutbox, reconciler: StatusReconciler) -> Dict:
+    """Settles the contacts a stopped run left in flight: sent if Twilio has a message for them, pending otherwise.
+    Contacts whose lookup failed stay in flight"""
+    rows = outbox.rows(states=[SendOutbox.IN_FLIGHT])
+    lookup = reconciler.find_by_recipient({row['client_phone']: to_utc(row['updated_at']) for row in rows})
+    outbox.settle_in_flight(lookup['found'], lookup['missing'])
+    lookup['unresolved'] = len(rows) - len(lookup['found']) - len(lookup['missing'])
+    return lookup
+
+
+def create_reconciler_from_env(concurrency: Optional[int] = None, rate_limit: Optional[int] = None) -> StatusReconciler:
+    account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+    auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+    if rate_limit is None:
+        rate_limit = int(os.getenv('RECONCILE_RATE_LIMIT', '50'))
+    if concurrency is None:
+        concurrency = int(os.getenv('SEND_CONCURRENCY', '10'))
+
+    if not all([account_sid, auth_token]):
+        raise ValueError("Missing required environment variables")
+
+    limiter = create_limiter_from_env(rate_limit)
+    transport = transport_settings_from_env()
+
+    return StatusReconciler(account_sid=account_sid, auth_token=auth_token, rate_limit=rate_limit, concurrency=concurrency, limiter=limiter,
+                            http_client_factory=lambda: PooledAsyncTwilioHttpClient(pool_size=concurrency, **transport))
@@ -0,0 +1,57 @@
+"""Result Sink Module - Streams send results to compressed NDJSON"""
+
+import gzip
+import json
+import threading
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSink:
+    """Writes each final send result as one gzip NDJSON line and keeps fixed-size counters"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self.counts = {'total': 0, 'sent': 0, 'failed': 0, 'attempts': 0}
+        self.error_counts: Dict[str, int] = {}
+
+        logger.info(f"Streaming results to {path}")
+
+    def write(self, result: Dict):
+        line = json.dumps(result, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self.counts['total'] += 1
+            self.counts['attempts'] += result.get('attempts', 0)
+            if result['status'] == 'sent':
+                self.counts['sent'] += 1
+            else:
+                self.counts['failed'] += 1
+                if result.get('error'):
+                    code = str(result['error']['code'])
+                    self.error_counts[code] = self.error_counts.get(code, 0) + 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {**self.counts, 'error_counts': dict(self.error_counts), 'results_file': self.path}
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_results(path: str):
+    """Iterates the results of a sink file without loading it whole"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
@@ -0,0 +1,28 @@
+"""Retry Queue Module - Time-ordered parking of transient send failures"""
+
+import heapq
+import itertools
+from typing import Any, List, Optional
+
+
+class RetryQueue:
+    """Min-heap of items keyed by the monotonic time they become due"""
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, due_at: float, item: Any):
+        heapq.heappush(self._heap, (due_at, next(self._counter), item))
+
+    def next_due(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Any]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            due.append(heapq.heappop(self._heap)[2])
+        return due
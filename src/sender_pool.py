@@ -0,0 +1,174 @@
+"""Sender Pool Module - Shards contacts across several WhatsApp numbers"""
+
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+import os
+
+from src.whatsapp_sender import WhatsAppSender
+from src.async_sender import AsyncWhatsAppSender
+from src.rate_limiter import create_limiter_from_env
+from src.outbox import SendOutbox
+from src.result_sink import ResultSink
+from src.http_transport import PooledTwilioHttpClient, PooledAsyncTwilioHttpClient, transport_settings_from_env
+
+logger = logging.getLogger(__name__)
+
+
+def rendezvous_shard(numbers: List[str], phone: str) -> int:
+    """Rendezvous hashing: a recipient keeps its number unless that number leaves the pool"""
+    scores = [hashlib.md5(f"{number}|{phone}".encode()).digest() for number in numbers]
+    return max(range(len(scores)), key=scores.__getitem__)
+
+
+class SenderPool:
+    """Sends through several numbers or subaccounts, each with its own rate budget"""
+
+    def __init__(self, senders: List[Union[WhatsAppSender, AsyncWhatsAppSender]]):
+        if not senders:
+            raise ValueError("SenderPool needs at least one sender")
+
+        self.senders = senders
+        self.numbers = [sender.whatsapp_number for sender in senders]
+
+        logger.info(f"Sender pool initialized ({len(senders)} numbers, total rate: {sum(s.rate_limit for s in senders)} msg/sec)")
+
+    def shard_for(self, phone: str) -> int:
+        return rendezvous_shard(self.numbers, phone)
+
+    def _partition(self, contacts: List[Dict]) -> List[List[int]]:
+        shards: List[List[int]] = [[] for _ in self.senders]
+        for i, contact in enumerate(contacts):
+            phone = contact.get('client_phone')
+            if not phone:
+                logger.warning(f"Skipping contact {i + 1}: No phone number")
+                continue
+            shards[self.shard_for(phone)].append(i)
+        return shards
+
+    def send_batch(self, contacts: List[Dict], template_sid: str, test_mode: bool = False, test_limit: int = 5,
+                   outbox: Optional[SendOutbox] = None, sink: Optional[ResultSink] = None) -> Dict:
+        if test_mode:
+            logger.warning(f"🧪 TEST MODE: Limiting to {test_limit} messages")
+            contacts = contacts[:test_limit]
+
+        shards = self._partition(contacts)
+        for number, indexes in zip(self.numbers, shards):
+            logger.info(f"Shard {number}: {len(indexes):,} contacts")
+
+        start_time = time.time()
+
+        def run_shard(shard: int) -> Dict:
+            sender = self.senders[shard]
+            shard_contacts = [contacts[i] for i in shards[shard]]
+            return sender.send_batch(contacts=shard_contacts, template_sid=template_sid, outbox=outbox, sink=sink)
+
+        with ThreadPoolExecutor(max_workers=len(self.senders)) as executor:
+            shard_summaries = list(executor.map(run_shard, range(len(self.senders))))
+
+        elapsed_time = time.time() - start_time
+        summary = self._merge(contacts, shards, shard_summaries, elapsed_time)
+        if sink is not None:
+            summary['results_file'] = sink.path
+        return summary
+
+    def _merge(self, contacts: List[Dict], shards: List[List[int]], shard_summaries: List[Dict], elapsed_time: float) -> Dict:
+        slots: List[Optional[Dict]] = [None] * len(contacts)
+        for indexes, shard_summary in zip(shards, shard_summaries):
+            for i, result in zip(indexes, shard_summary['detailed_results']):
+                slots[i] = result
+
+        results = [result for result in slots if result is not None]
+        attempted = sum(s['total_attempted'] for s in shard_summaries)
+        sent = sum(s['sent'] for s in shard_summaries)
+        failed = sum(s['failed'] for s in shard_summaries)
+        error_counts: Dict[str, int] = {}
+        for s in shard_summaries:
+            for code, count in s['error_counts'].items():
+                error_counts[code] = error_counts.get(code, 0) + count
+
+        summary = {
+            'total_attempted': attempted,
+            'sent': sent,
+            'failed': failed,
+            'success_rate': (sent / attempted * 100) if attempted else 0,
+            'elapsed_time_seconds': elapsed_time,
+            'messages_per_second': attempted / elapsed_time if elapsed_time > 0 else 0,
+            'errors': [error for s in shard_summaries for error in s['errors']],
+            'error_counts': error_counts,
+            'detailed_results': results,
+            'shards': {
+                number: {'total_attempted': s['total_attempted'], 'sent': s['sent'], 'failed': s['failed']}
+                for number, s in zip(self.numbers, shard_summaries)
+            }
+        }
+
+        logger.info(f"Pool batch complete: {sent:,} sent, {failed:,} failed ({summary['success_rate']:.1f}% success)")
+
+        return summary
+
+    def get_stats(self) -> Dict:
+        return {
+            'sent': sum(s.stats['sent'] for s in self.senders),
+            'failed': sum(s.stats['failed'] for s in self.senders),
+            'errors': [error for s in self.senders for error in s.stats['errors']],
+            'error_counts': {
+                code: sum(s.stats['error_counts'].get(code, 0) for s in self.senders)
+                for code in {code for s in self.senders for code in s.stats['error_counts']}
+            },
+            'current_rate': sum(s.limiter.current_rate for s in self.senders),
+            'http': {s.whatsapp_number: s.get_stats().get('http') for s in self.senders},
+            'metrics': {s.whatsapp_number: s.metrics.snapshot() for s in self.senders},
+        }
+
+
+def parse_sender_numbers(spec: str, default_rate: int) -> List[Dict]:
+    """Parses '+33100000001:20,+33100000002@ACxxx' into number/rate/subaccount entries"""
+    entries = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+
+        subaccount_sid = None
+        if '@' in item:
+            item, subaccount_sid = item.split('@', 1)
+
+        rate_limit = default_rate
+        if ':' in item:
+            item, rate = item.split(':', 1)
+            rate_limit = int(rate)
+
+        entries.append({'whatsapp_number': item, 'rate_limit': rate_limit, 'subaccount_sid': subaccount_sid})
+
+    return entries
+
+
+def create_sender_pool_from_env(use_async: bool = False, concurrency: Optional[int] = None) -> SenderPool:
+    account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+    auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+    numbers_spec = os.getenv('TWILIO_WHATSAPP_NUMBERS') or os.getenv('TWILIO_WHATSAPP_NUMBER')
+    rate_limit = int(os.getenv('RATE_LIMIT', '10'))
+    if concurrency is None:
+        concurrency = int(os.getenv('SEND_CONCURRENCY', '10'))
+
+    if not all([account_sid, auth_token, numbers_spec]):
+        raise ValueError("Missing required environment variables")
+
+    transport = transport_settings_from_env()
+    status_callback = os.getenv('STATUS_CALLBACK_URL')
+    senders = []
+    for entry in parse_sender_numbers(numbers_spec, rate_limit):
+        if use_async:
+            limiter = create_limiter_from_env(entry['rate_limit'])
+            senders.append(AsyncWhatsAppSender(account_sid=account_sid, auth_token=auth_token, concurrency=concurrency, limiter=limiter,
+                                               http_client_factory=lambda: PooledAsyncTwilioHttpClient(pool_size=concurrency, **transport),
+                                               status_callback=status_callback, **entry))
+        else:
+            limiter = create_limiter_from_env(entry['rate_limit'], capacity=1)
+            senders.append(WhatsAppSender(account_sid=account_sid, auth_token=auth_token, limiter=limiter,
+                                          http_client=PooledTwilioHttpClient(pool_size=1, **transport), status_callback=status_callback, **entry))
+
+    return SenderPool(senders)
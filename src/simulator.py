@@ -0,0 +1,284 @@
+"""Simulator Module - Dry-run campaigns on a virtual clock against a simulated Messages API"""
+
+import json
+import time
+import asyncio
+import logging
+import selectors
+from typing import Dict, List, Optional
+from twilio.http import AsyncHttpClient, HttpClient
+from twilio.http.response import Response
+import os
+
+from src.whatsapp_sender import WhatsAppSender
+from src.async_sender import AsyncWhatsAppSender
+from src.sender_pool import rendezvous_shard, parse_sender_numbers
+from src.rate_limiter import TokenBucket, AdaptiveRateLimiter
+from src.twilio_standin import MessagesApiModel
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_SID = 'AC' + '0' * 32
+
+
+class VirtualClock:
+    """Seconds since the start of the simulation; only moves when the event loop has nothing to run"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Never reports I/O: waiting for `timeout` just moves the virtual clock forward"""
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self._keys: Dict[int, selectors.SelectorKey] = {}
+
+    def register(self, fileobj, events, data=None):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        key = selectors.SelectorKey(fileobj, fd, events, data)
+        self._keys[fd] = key
+        return key
+
+    def unregister(self, fileobj):
+        return self._keys.pop(fileobj if isinstance(fileobj, int) else fileobj.fileno())
+
+    def get_key(self, fileobj):
+        return self._keys[fileobj if isinstance(fileobj, int) else fileobj.fileno()]
+
+    def get_map(self):
+        return self._keys
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("Simulation stalled: no timer pending and nothing ready to run")
+        self.clock.advance(timeout)
+        return []
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """asyncio loop whose time() is the virtual clock, so sleeps cost no wall time"""
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        super().__init__(_VirtualSelector(clock))
+
+    # asyncio runs timers due within its clock resolution without waiting, so a token bucket asking for a
+    # sub-nanosecond wait would spin with the virtual clock never moving; every timer waits at least this long
+    MIN_DELAY = 1e-6
+
+    def time(self) -> float:
+        return self.clock()
+
+    def call_later(self, delay, callback, *args, context=None):
+        return super().call_later(max(delay, self.MIN_DELAY), callback, *args, context=context)
+
+
+def _simulated_response(model: MessagesApiModel, accepted_at: List[float]) -> Response:
+    code = model.decide()
+
+    if code == 20429:
+        return Response(429, json.dumps({'code': 20429, 'message': 'Too Many Requests', 'status': 429}))
+    if code is not None:
+        return Response(400, json.dumps({'code': code, 'message': f'Simulated error {code}', 'status': 400}))
+
+    accepted_at.append(model.clock())
+    return Response(201, json.dumps({'sid': f"SM{len(accepted_at):032x}", 'status': 'queued'}))
+
+
+class SimulatedHttpClient(AsyncHttpClient):
+    """Answers Twilio API calls from a MessagesApiModel after a (virtual) latency"""
+
+    def __init__(self, model: MessagesApiModel, accepted_at: List[float]):
+        super().__init__(logger, is_async=True)
+        self.model = model
+        self.accepted_at = accepted_at
+
+    async def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None, allow_redirects=False) -> Response:
+        await asyncio.sleep(self.model.sample_latency())
+        return _simulated_response(self.model, self.accepted_at)
+
+    async def close(self):
+        pass
+
+
+class SimulatedSyncHttpClient(HttpClient):
+    """Blocking counterpart for the sync sender: the latency moves the virtual clock instead of sleeping"""
+
+    def __init__(self, model: MessagesApiModel, accepted_at: List[float], clock: VirtualClock):
+        super().__init__(logger, is_async=False)
+        self.model = model
+        self.accepted_at = accepted_at
+        self.clock = clock
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None, allow_redirects=False) -> Response:
+        self.clock.advance(self.model.sample_latency())
+        return _simulated_response(self.model, self.accepted_at)
+
+
+class _TallySink:
+    """ResultSink stand-in that only counts, so 500k results are never held in memory"""
+
+    path = None
+
+    def __init__(self):
+        self.counts = {'total': 0, 'sent': 0, 'failed': 0, 'attempts': 0}
+
+    def write(self, result: Dict):
+        self.counts['total'] += 1
+        self.counts['attempts'] += result['attempts']
+        self.counts['sent' if result['status'] == 'sent' else 'failed'] += 1
+
+
+class CampaignSimulator:
+    """Runs the real send path (sync or async sender) per sender number, each on its own virtual clock"""
+
+    def __init__(self, numbers: List[Dict], use_async: bool = True, concurrency: int = 10, adaptive: bool = False, max_rate: float = 80.0,
+                 latency: str = 'lognormal:0.15:0.4', quota: int = 0, throttle_probability: float = 0.0,
+                 error_mix: Optional[Dict[int, float]] = None, retry_count: int = 3, cost_per_message: float = 0.005,
+                 curve_seconds: int = 60, seed: Optional[int] = 42):
+        self.numbers = numbers
+        self.use_async = use_async
+        self.concurrency = concurrency if use_async else 1
+        self.adaptive = adaptive
+        self.max_rate = max_rate
+        self.latency = latency
+        self.quota = quota
+        self.throttle_probability = throttle_probability
+        self.error_mix = error_mix or {}
+        self.retry_count = retry_count
+        self.cost_per_message = cost_per_message
+        self.curve_seconds = curve_seconds
+        self.seed = seed
+
+    def _partition(self, contacts: List[Dict]) -> List[List[Dict]]:
+        """Same rendezvous hashing as SenderPool, so each number gets the contacts it would really send"""
+        if len(self.numbers) == 1:
+            return [contacts]
+        numbers = [n['whatsapp_number'] for n in self.numbers]
+        shards: List[List[Dict]] = [[] for _ in self.numbers]
+        for contact in contacts:
+            shards[rendezvous_shard(numbers, contact.get('client_phone') or '')].append(contact)
+        return shards
+
+    def _run_shard(self, number: Dict, contacts: List[Dict], template_sid: str, shard: int) -> Dict:
+        clock = VirtualClock()
+        seed = None if self.seed is None else self.seed + shard
+        model = MessagesApiModel(latency=self.latency, quota=self.quota, throttle_probability=self.throttle_probability,
+                                 error_mix=self.error_mix, seed=seed, clock=clock)
+        rate = number['rate_limit']
+        # Same bucket capacity as the send scripts' factories: one token for the sync sender
+        capacity = None if self.use_async else 1
+        if self.adaptive and rate > 0:
+            limiter = AdaptiveRateLimiter(rate, max_rate=max(self.max_rate, rate), capacity=capacity, clock=clock, sleep=clock.advance)
+        else:
+            limiter = TokenBucket(rate, capacity, clock=clock, sleep=clock.advance)
+
+        accepted_at: List[float] = []
+        sink = _TallySink()
+        if self.use_async:
+            sender = AsyncWhatsAppSender(ACCOUNT_SID, 'dry-run', number['whatsapp_number'], rate_limit=rate, concurrency=self.concurrency,
+                                         limiter=limiter, http_client_factory=lambda: SimulatedHttpClient(model, accepted_at), clock=clock)
+            loop = VirtualTimeEventLoop(clock)
+            try:
+                summary = loop.run_until_complete(sender.send_batch_async(contacts, template_sid, retry_count=self.retry_count, sink=sink))
+            finally:
+                loop.close()
+        else:
+            sender = WhatsAppSender(ACCOUNT_SID, 'dry-run', number['whatsapp_number'], rate_limit=rate, limiter=limiter,
+                                    http_client=SimulatedSyncHttpClient(model, accepted_at, clock), clock=clock, sleep=clock.advance)
+            summary = sender.send_batch(contacts, template_sid, retry_count=self.retry_count, sink=sink)
+
+        return {
+            'number': number['whatsapp_number'],
+            'duration_seconds': clock(),
+            'counts': sink.counts,
+            'api': dict(model.counts),
+            'error_counts': summary['error_counts'],
+            'retries': sender.metrics.snapshot()['retries'],
+            'final_rate': limiter.current_rate,
+            'accepted_at': accepted_at,
+        }
+
+    def run(self, contacts: List[Dict], template_sid: str = 'HX' + '0' * 32) -> Dict:
+        wall_start = time.perf_counter()
+        shards = [self._run_shard(number, shard_contacts, template_sid, i)
+                  for i, (number, shard_contacts) in enumerate(zip(self.numbers, self._partition(contacts)))]
+
+        duration = max(s['duration_seconds'] for s in shards)
+        curve = [0] * (int(duration // self.curve_seconds) + 1)
+        for s in shards:
+            for accepted in s['accepted_at']:
+                curve[int(accepted // self.curve_seconds)] += 1
+
+        sent = sum(s['counts']['sent'] for s in shards)
+        attempts = sum(s['counts']['attempts'] for s in shards)
+        total = sum(s['counts']['total'] for s in shards)
+        error_counts: Dict[str, int] = {}
+        retries: Dict[str, int] = {}
+        for s in shards:
+            for code, count in s['error_counts'].items():
+                error_counts[code] = error_counts.get(code, 0) + count
+            for code, count in s['retries'].items():
+                retries[code] = retries.get(code, 0) + count
+
+        return {
+            'messages': total,
+            'sent': sent,
+            'failed': total - sent,
+            'duration_seconds': duration,
+            'messages_per_second': total / duration if duration > 0 else 0,
+            'api_calls': sum(s['api']['requests'] for s in shards),
+            'retries': attempts - total,
+            'retries_by_code': retries,
+            'throttled': sum(s['api']['throttled'] for s in shards),
+            'error_counts': error_counts,
+            'estimated_cost': sent * self.cost_per_message,
+            'curve_seconds': self.curve_seconds,
+            'throughput_curve': [count / self.curve_seconds for count in curve],
+            'shards': [{'number': s['number'], 'messages': s['counts']['total'], 'duration_seconds': s['duration_seconds'],
+                        'final_rate': s['final_rate']} for s in shards],
+            'wall_time_seconds': time.perf_counter() - wall_start,
+        }
+
+
+def simulation_report_lines(report: Dict) -> List[str]:
+    lines = [
+        f"Projected duration: {report['duration_seconds'] / 60:.1f} min ({report['messages_per_second']:.1f} msg/sec)",
+        f"Messages: {report['messages']:,} ({report['sent']:,} sent, {report['failed']:,} failed)",
+        f"API calls: {report['api_calls']:,} | retries: {report['retries']:,} | throttled: {report['throttled']:,}",
+        f"Estimated cost: ${report['estimated_cost']:,.2f}",
+    ]
+    if report['retries_by_code']:
+        lines.append(f"Retries by code: {', '.join(f'{code}={count:,}' for code, count in sorted(report['retries_by_code'].items()))}")
+    if report['error_counts']:
+        lines.append(f"Final errors: {', '.join(f'{code}={count:,}' for code, count in sorted(report['error_counts'].items()))}")
+    for shard in report['shards']:
+        lines.append(f"{shard['number']}: {shard['messages']:,} messages in {shard['duration_seconds'] / 60:.1f} min, ends at {shard['final_rate']:.1f} msg/sec")
+    lines.append(f"Throughput per {report['curve_seconds']}s (msg/sec): " + ' '.join(f"{rate:.0f}" for rate in report['throughput_curve']))
+    lines.append(f"Simulated in {report['wall_time_seconds']:.1f}s")
+    return lines
+
+
+def create_simulator_from_env(use_async: bool = False, concurrency: Optional[int] = None, latency: str = 'lognormal:0.15:0.4',
+                              quota: int = 0, throttle_probability: float = 0.0, error_mix: Optional[Dict[int, float]] = None) -> CampaignSimulator:
+    """Same numbers, rates, limiter settings and sender (sync or async) the send scripts would use"""
+    numbers_spec = os.getenv('TWILIO_WHATSAPP_NUMBERS') or os.getenv('TWILIO_WHATSAPP_NUMBER') or '+10000000000'
+    rate_limit = int(os.getenv('RATE_LIMIT', '10'))
+    if concurrency is None:
+        concurrency = int(os.getenv('SEND_CONCURRENCY', '10'))
+
+    return CampaignSimulator(
+        numbers=parse_sender_numbers(numbers_spec, rate_limit), use_async=use_async, concurrency=concurrency,
+        adaptive=os.getenv('ADAPTIVE_RATE_LIMIT', 'false').lower() == 'true', max_rate=float(os.getenv('RATE_LIMIT_MAX', '80')),
+        latency=latency, quota=quota, throttle_probability=throttle_probability, error_mix=error_mix,
+        cost_per_message=float(os.getenv('COST_PER_MESSAGE', '0.005')),
+    )
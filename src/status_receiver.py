@@ -0,0 +1,145 @@
+"""Status Receiver Module - Twilio StatusCallback endpoint with batched writes"""
+
+import asyncio
+import logging
+import argparse
+from typing import Dict, List, Optional
+import os
+
+from aiohttp import web
+from twilio.request_validator import RequestValidator
+
+from src.delivery_status import DeliveryStatusStore, delivery_rate_lines
+
+logger = logging.getLogger(__name__)
+
+
+class StatusCallbackReceiver:
+    """Acknowledges each callback immediately and writes the queued statuses in batches"""
+
+    def __init__(self, store: DeliveryStatusStore, host: str = '0.0.0.0', port: int = 8080, path: str = '/twilio/status',
+                 batch_size: int = 500, flush_interval: float = 0.5, auth_token: Optional[str] = None, public_url: Optional[str] = None):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.validator = RequestValidator(auth_token) if auth_token else None
+        self.public_url = public_url
+
+        self._pending: List[Dict] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.counts = {'received': 0, 'written': 0, 'rejected': 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        form = await request.post()
+
+        if self.validator is not None:
+            signature = request.headers.get('X-Twilio-Signature', '')
+            if not self.validator.validate(self.public_url or str(request.url), dict(form), signature):
+                self.counts['rejected'] += 1
+                return web.Response(status=403)
+
+        if not form.get('MessageSid') or not form.get('MessageStatus'):
+            self.counts['rejected'] += 1
+            return web.Response(status=400)
+
+        self._pending.append({'message_sid': form['MessageSid'], 'status': form['MessageStatus'], 'error_code': form.get('ErrorCode')})
+        self.counts['received'] += 1
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+        return web.Response(status=204)
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        self.counts['written'] += await loop.run_in_executor(None, self.store.record_many, batch)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"✗ Status batch write failed: {e}")
+
+    async def start(self) -> 'StatusCallbackReceiver':
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=1024)
+        await site.start()
+        if self.port == 0:
+            self.port = self._runner.addresses[0][1]
+
+        self._wake = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"Status callback receiver listening on {self.url}")
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        await self._flush()
+        logger.info(f"Status receiver stopped: {self.counts['received']:,} callbacks, {self.counts['written']:,} written")
+
+
+def create_receiver_from_env(outbox_path: str, host: str = '0.0.0.0', port: int = 8080) -> StatusCallbackReceiver:
+    return StatusCallbackReceiver(
+        DeliveryStatusStore(outbox_path), host=host, port=port,
+        auth_token=os.getenv('TWILIO_AUTH_TOKEN') if os.getenv('STATUS_CALLBACK_VALIDATE', 'true').lower() == 'true' else None,
+        public_url=os.getenv('STATUS_CALLBACK_URL'),
+    )
+
+
+async def _serve(receiver: StatusCallbackReceiver, campaign: Optional[str]):
+    await receiver.start()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await receiver.stop()
+        if campaign:
+            for line in delivery_rate_lines(receiver.store.delivery_rates(campaign)):
+                print(f"   {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Receive Twilio message status callbacks into the campaign outbox')
+    parser.add_argument('outbox', help='Outbox database the campaign was sent with')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--campaign', help='Print delivery rates for this campaign on shutdown')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    receiver = create_receiver_from_env(args.outbox, host=args.host, port=args.port)
+    print(f"Status receiver on {receiver.url} (Ctrl+C to stop)")
+    try:
+        asyncio.run(_serve(receiver, args.campaign))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""Storage Module - Typed Parquet tables between pipeline stages, CSV kept for export"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('parquet', 'csv')
+
+# Explicit Arrow types of the contact columns; anything else is stored as text (or as inferred if not text)
+COLUMN_TYPES: Dict[str, pa.DataType] = {
+    'client_name': pa.string(),
+    'client_phone': pa.string(),
+    'client_email': pa.string(),
+    'first_name': pa.string(),
+    'test_group': pa.string(),
+    'city': pa.string(),
+    'quality_score': pa.int8(),
+}
+
+# Few distinct values: dictionary-encoded in the file, pandas categoricals once loaded
+CATEGORICAL_COLUMNS = ('first_name', 'test_group')
+
+# A partitioned table is a directory: one file per value of the partition column, listed in the manifest
+MANIFEST_FILE = 'manifest.json'
+PARTITION_COLUMN = 'test_group'
+
+
+def table_format(path: str) -> str:
+    return 'parquet' if path.endswith('.parquet') else 'csv'
+
+
+def arrow_schema(df: pd.DataFrame) -> pa.Schema:
+    fields = []
+    for column, dtype in df.dtypes.items():
+        if column in COLUMN_TYPES:
+            fields.append(pa.field(column, COLUMN_TYPES[column]))
+        elif dtype == object or isinstance(dtype, pd.CategoricalDtype):
+            fields.append(pa.field(column, pa.string()))
+        else:
+            fields.append(pa.field(column, pa.from_numpy_dtype(dtype)))
+    return pa.schema(fields)
+
+
+def categorize(df: pd.DataFrame) -> pd.DataFrame:
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Loads only `columns` (all if None); text stays text and CATEGORICAL_COLUMNS come back as categoricals"""
+    if is_partitioned(path):
+        return read_partitions(path, columns=columns)
+    columns = list(columns) if columns is not None else None
+    if table_format(path) == 'parquet':
+        df = pd.read_parquet(path, columns=columns, read_dictionary=list(CATEGORICAL_COLUMNS))
+    else:
+        text_columns = [c for c, t in COLUMN_TYPES.items() if t == pa.string()]
+        df = pd.read_csv(path, usecols=columns, dtype={c: str for c in text_columns})
+    return categorize(df)
+
+
+def write_table(df: pd.DataFrame, path: str):
+    if table_format(path) == 'parquet':
+        pq.write_table(pa.Table.from_pandas(df, schema=arrow_schema(df), preserve_index=False), path)
+    else:
+        df.to_csv(path, index=False)
+
+
+class TableWriter:
+    """Appends frames with the same columns to one CSV or Parquet file (one row group per frame)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = table_format(path)
+        self.rows = 0
+        self._started = False
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def write(self, df: pd.DataFrame):
+        if self.format == 'parquet':
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, arrow_schema(df))
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False))
+        else:
+            df.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_partitioned(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+class PartitionedWriter:
+    """Appends frames to a directory holding one CSV or Parquet file per value of `column`
+
+    The manifest (row count and SHA-256 of every file) is written last, on close, so a directory without
+    one is an interrupted run. Rows keep their order within each partition.
+    """
+
+    def __init__(self, directory: str, column: str = PARTITION_COLUMN, format: str = 'parquet'):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format: {format} (expected one of {', '.join(FORMATS)})")
+        self.directory = directory
+        self.column = column
+        self.format = format
+        self.rows = 0
+        self.columns: List[str] = []
+        self.manifest: Optional[dict] = None
+        self._writers: Dict[str, TableWriter] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+        values = df[self.column]
+        if values.isna().any():
+            raise ValueError(f"Cannot partition rows with no '{self.column}'")
+        codes, uniques = pd.factorize(values.astype(str), sort=True)
+        for code, value in enumerate(uniques):
+            writer = self._writers.get(value)
+            if writer is None:
+                path = os.path.join(self.directory, f'{self.column}={value}.{self.format}')
+                writer = self._writers[value] = TableWriter(path)
+            writer.write(df.take(np.flatnonzero(codes == code)))
+        self.columns = self.columns or list(df.columns)
+        self.rows += len(df)
+
+    def _close_files(self):
+        for writer in self._writers.values():
+            writer.close()
+
+    def close(self) -> dict:
+        self._close_files()
+        self.manifest = manifest = {
+            'partition_by': self.column,
+            'format': self.format,
+            'rows': self.rows,
+            'columns': self.columns,
+            'partitions': {
+                value: {'file': os.path.basename(writer.path), 'rows': writer.rows, 'sha256': file_sha256(writer.path)}
+                for value, writer in sorted(self._writers.items())
+            },
+        }
+        tmp_path = os.path.join(self.directory, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST_FILE))
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_files()
+
+
+def write_partitioned(df: pd.DataFrame, directory: str, column: str = PARTITION_COLUMN, format: str = 'parquet') -> dict:
+    """Writes df as a partitioned table; returns its manifest"""
+    with PartitionedWriter(directory, column, format) as writer:
+        writer.write(df)
+    return writer.manifest
+
+
+def read_partitions(path: str, values: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None,
+                    column: str = PARTITION_COLUMN, verify: bool = True) -> pd.DataFrame:
+    """Rows whose `column` is in `values` (all if None)
+
+    From a partitioned directory only the matching files are opened, each checked against the manifest
+    (checksum, row count) first. A single file is read whole and filtered.
+    """
+    if not is_partitioned(path):
+        df = read_table(path, columns)
+        if values is None:
+            return df
+        return df.take(np.flatnonzero(df[column].isin(list(values)).to_numpy()))
+
+    manifest = read_manifest(path)
+    if manifest['partition_by'] != column:
+        raise ValueError(f"{path} is partitioned by '{manifest['partition_by']}', not '{column}'")
+    wanted = sorted(manifest['partitions']) if values is None else [v for v in values if v in manifest['partitions']]
+
+    frames = []
+    for value in wanted:
+        entry = manifest['partitions'][value]
+        file_path = os.path.join(path, entry['file'])
+        if verify and file_sha256(file_path) != entry['sha256']:
+            raise ValueError(f"Partition {value} of {path} does not match its manifest checksum")
+        frame = read_table(file_path, columns)
+        if len(frame) != entry['rows']:
+            raise ValueError(f"Partition {value} of {path} has {len(frame):,} rows, manifest says {entry['rows']:,}")
+        frames.append(frame)
+
+    if not frames:
+        return categorize(pd.DataFrame(columns=list(columns) if columns is not None else manifest['columns']))
+    if len(frames) == 1:
+        return frames[0]
+    # concat keeps a categorical only where every part has the same categories
+    for name in CATEGORICAL_COLUMNS:
+        if name in frames[0].columns:
+            categories = pd.api.types.union_categoricals([frame[name] for frame in frames]).categories
+            for frame in frames:
+                frame[name] = frame[name].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def find_latest_table(data_dir: str, prefix: str) -> Optional[str]:
+    """Newest `<prefix><timestamp>` partitioned directory, .parquet or .csv in data_dir; for the same run the
+    partitioned table wins, then Parquet over a CSV export"""
+    if not os.path.isdir(data_dir):
+        return None
+    files: List[str] = [f for f in os.listdir(data_dir) if f.startswith(prefix) and
+                        (f.endswith(('.parquet', '.csv')) or is_partitioned(os.path.join(data_dir, f)))]
+    if not files:
+        return None
+    rank = {'.parquet': 1, '.csv': 0}
+    files.sort(key=lambda f: (os.path.splitext(f)[0], rank.get(os.path.splitext(f)[1], 2)), reverse=True)
+    return os.path.join(data_dir, files[0])
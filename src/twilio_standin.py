@@ -0,0 +1,342 @@
+"""Twilio Stand-in Module - Local HTTP imitation of the Messages API for load tests"""
+
+import json
+import math
+import bisect
+import time
+import random
+import logging
+import argparse
+import threading
+import queue
+from calendar import timegm
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode
+
+import requests
+
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_URL = 'https://api.twilio.com'
+
+
+def parse_latency(spec: str, seed: Optional[int] = None) -> Callable[[], float]:
+    """'fixed:0.1', 'uniform:0.05:0.2' or 'lognormal:<median>:<sigma>' -> seconds sampler"""
+    rng = random.Random(seed)
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1])
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_error_mix(spec: str) -> Dict[int, float]:
+    """'21211=0.01,63016=0.02' -> {21211: 0.01, 63016: 0.02}"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        code, probability = item.split('=')
+        mix[int(code)] = float(probability)
+    return mix
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MessagesApiModel:
+    """Latency, per-second quota, throttling and error-mix decisions of the Messages API"""
+
+    def __init__(self, latency: str = 'fixed:0.05', quota: int = 0, throttle_probability: float = 0.0,
+                 error_mix: Optional[Dict[int, float]] = None, seed: Optional[int] = None, clock: Callable[[], float] = time.time):
+        self.sample_latency = parse_latency(latency, seed)
+        self.quota = quota
+        self.throttle_probability = throttle_probability
+        self.error_mix = error_mix or {}
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._window = (0, 0)
+        self.counts = {'requests': 0, 'created': 0, 'throttled': 0, 'errors': 0}
+
+    def _over_quota(self) -> bool:
+        if self.quota <= 0:
+            return False
+        second = int(self.clock())
+        window_second, count = self._window
+        if window_second != second:
+            window_second, count = second, 0
+        self._window = (window_second, count + 1)
+        return count >= self.quota
+
+    def decide(self, create: bool = True) -> Optional[int]:
+        """Returns the Twilio error code to answer with, or None for success; reads are only throttled"""
+        with self._lock:
+            self.counts['requests'] += 1
+            if self._over_quota() or self.rng.random() < self.throttle_probability:
+                self.counts['throttled'] += 1
+                return 20429
+            if not create:
+                return None
+
+            draw = self.rng.random()
+            for code, probability in self.error_mix.items():
+                if draw < probability:
+                    self.counts['errors'] += 1
+                    return code
+                draw -= probability
+
+            self.counts['created'] += 1
+            return None
+
+
+class TwilioStandIn(MessagesApiModel):
+    """Serves the Messages create/list/fetch endpoints with configurable latency, quotas and error mixes, and fires StatusCallbacks"""
+
+    UNDELIVERED_CODE = 30003
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0.05', quota: int = 0,
+                 throttle_probability: float = 0.0, error_mix: Optional[Dict[int, float]] = None, seed: Optional[int] = None,
+                 undelivered_probability: float = 0.0, read_probability: float = 0.0, callback_workers: int = 8):
+        super().__init__(latency=latency, quota=quota, throttle_probability=throttle_probability, error_mix=error_mix, seed=seed)
+        self.undelivered_probability = undelivered_probability
+        self.read_probability = read_probability
+        self.messages: Dict[str, Dict] = {}
+        self._sent_times: List[float] = []
+        self._sent_sids: List[str] = []
+        self.counts.update({'callbacks': 0, 'callback_errors': 0})
+
+        self.server = _StandInServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+        self._callbacks: queue.Queue = queue.Queue()
+        self._callback_threads = [threading.Thread(target=self._callback_worker, daemon=True) for _ in range(callback_workers)]
+        for thread in self._callback_threads:
+            thread.start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'TwilioStandIn':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Twilio stand-in listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for _ in self._callback_threads:
+            self._callbacks.put(None)
+        for thread in self._callback_threads:
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _create_message(self, account_sid: str, form: Dict) -> Dict:
+        with self._lock:
+            sid = f"SM{len(self.messages):032x}"
+            sent_at = time.time()
+            message = {
+                'sid': sid,
+                'account_sid': account_sid,
+                'from': form.get('From'),
+                'to': form.get('To'),
+                'status': 'queued',
+                'body': '',
+                'num_segments': '1',
+                'direction': 'outbound-api',
+                'api_version': '2010-04-01',
+                'date_created': formatdate(usegmt=True),
+                'date_updated': formatdate(usegmt=True),
+                'date_sent': formatdate(sent_at, usegmt=True),
+                'error_code': None,
+                'error_message': None,
+                'uri': f"/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json",
+            }
+            self.messages[sid] = message
+            self._sent_times.append(sent_at)
+            self._sent_sids.append(sid)
+
+            if form.get('StatusCallback'):
+                statuses = ['sent', 'undelivered' if self.rng.random() < self.undelivered_probability else 'delivered']
+                if statuses[-1] == 'delivered' and self.rng.random() < self.read_probability:
+                    statuses.append('read')
+                self._callbacks.put((form['StatusCallback'], sid, statuses))
+        return message
+
+    def _list_messages(self, account_sid: str, query: Dict) -> Dict:
+        """One page of messages sent in [DateSent>, DateSent<] (and to To, if given), oldest first"""
+        def epoch(value: str) -> float:
+            return timegm(time.strptime(value, '%Y-%m-%dT%H:%M:%SZ'))
+
+        page = int(query.get('Page', 0))
+        page_size = min(int(query.get('PageSize', 50)), 1000)
+        with self._lock:
+            lo = bisect.bisect_left(self._sent_times, epoch(query['DateSent>'])) if 'DateSent>' in query else 0
+            hi = bisect.bisect_left(self._sent_times, epoch(query['DateSent<']) + 1) if 'DateSent<' in query else len(self._sent_times)
+            matching = self._sent_sids
+            if 'To' in query:
+                matching = [sid for sid in self._sent_sids[lo:hi] if self.messages[sid]['to'] == query['To']]
+                lo, hi = 0, len(matching)
+            start = lo + page * page_size
+            sids = matching[start:min(start + page_size, hi)]
+            records = [dict(self.messages[sid]) for sid in sids]
+
+        uri = f"/2010-04-01/Accounts/{account_sid}/Messages.json"
+        next_page_uri = None
+        if start + page_size < hi:
+            next_page_uri = f"{uri}?{urlencode({**query, 'Page': page + 1, 'PageSize': page_size})}"
+        return {
+            'messages': records, 'page': page, 'page_size': page_size, 'start': start - lo, 'end': start - lo + len(records) - 1,
+            'uri': f"{uri}?{urlencode(query)}", 'first_page_uri': f"{uri}?{urlencode({**query, 'Page': 0})}",
+            'next_page_uri': next_page_uri, 'previous_page_uri': None,
+        }
+
+    def _callback_worker(self):
+        session = requests.Session()
+        while True:
+            job = self._callbacks.get()
+            if job is None:
+                break
+            url, sid, statuses = job
+            message = self.messages[sid]
+            for status in statuses:
+                with self._lock:
+                    message['status'] = status
+                    message['date_updated'] = formatdate(usegmt=True)
+                    if status == 'undelivered':
+                        message['error_code'] = self.UNDELIVERED_CODE
+                payload = {'MessageSid': sid, 'MessageStatus': status, 'AccountSid': message['account_sid'],
+                           'From': message['from'], 'To': message['to']}
+                if message['error_code']:
+                    payload['ErrorCode'] = str(message['error_code'])
+                try:
+                    session.post(url, data=payload, timeout=10)
+                    outcome = 'callbacks'
+                except requests.RequestException:
+                    outcome = 'callback_errors'
+                with self._lock:
+                    self.counts[outcome] += 1
+
+    def _make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload: Dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                parts = self.path.split('?')[0].strip('/').split('/')
+
+                if len(parts) != 4 or parts[3] != 'Messages.json':
+                    self._reply(404, {'code': 20404, 'message': 'Not found', 'status': 404})
+                    return
+
+                time.sleep(standin.sample_latency())
+                code = standin.decide()
+
+                if code == 20429:
+                    self._reply(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429})
+                elif code is not None:
+                    self._reply(400, {'code': code, 'message': f'Simulated error {code}', 'status': 400})
+                else:
+                    self._reply(201, standin._create_message(parts[2], form))
+
+            def do_GET(self):
+                path, _, query_string = self.path.partition('?')
+                query = {k: v[0] for k, v in parse_qs(query_string).items()}
+                parts = path.strip('/').split('/')
+
+                time.sleep(standin.sample_latency())
+                if standin.decide(create=False) == 20429:
+                    self._reply(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429})
+                elif len(parts) == 4 and parts[3] == 'Messages.json':
+                    self._reply(200, standin._list_messages(parts[2], query))
+                elif len(parts) == 5 and parts[3] == 'Messages' and parts[4].removesuffix('.json') in standin.messages:
+                    with standin._lock:
+                        message = dict(standin.messages[parts[4].removesuffix('.json')])
+                    self._reply(200, message)
+                else:
+                    self._reply(404, {'code': 20404, 'message': 'Not found', 'status': 404})
+
+        return Handler
+
+
+class StandInHttpClient(TwilioHttpClient):
+    """TwilioHttpClient that sends every API call to a stand-in base URL"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, url.replace(TWILIO_API_URL, self.base_url, 1), *args, **kwargs)
+
+
+class AsyncStandInHttpClient(AsyncTwilioHttpClient):
+    """AsyncTwilioHttpClient that sends every API call to a stand-in base URL"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    async def request(self, method, url, *args, **kwargs):
+        return await super().request(method, url.replace(TWILIO_API_URL, self.base_url, 1), *args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local Twilio Messages API stand-in')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal:0.15:0.4', help="fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--quota', type=int, default=0, help='Accepted messages per second before 20429 (0 = unlimited)')
+    parser.add_argument('--throttle-prob', type=float, default=0.0, help='Random 20429 probability')
+    parser.add_argument('--error-mix', default='', help="e.g. 21211=0.01,63016=0.02")
+    parser.add_argument('--undelivered-prob', type=float, default=0.0, help="Share of StatusCallbacks ending 'undelivered'")
+    parser.add_argument('--read-prob', type=float, default=0.0, help="Share of delivered messages also reported 'read'")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    standin = TwilioStandIn(port=args.port, latency=args.latency, quota=args.quota, throttle_probability=args.throttle_prob,
+                            error_mix=parse_error_mix(args.error_mix), seed=args.seed,
+                            undelivered_probability=args.undelivered_prob, read_probability=args.read_prob)
+    print(f"Twilio stand-in on {standin.base_url} (Ctrl+C to stop)")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        standin.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
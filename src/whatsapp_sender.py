@@ -2,96 +2,211 @@
 
 import time
 import logging
-from typing import Dict, Optional, List
+from collections import deque
+from typing import Callable, Dict, Optional, List
 from twilio.rest import Client
+from twilio.http import HttpClient
+from twilio.base import values
 from twilio.base.exceptions import TwilioRestException
 import os
 
+from src.rate_limiter import TokenBucket, create_limiter_from_env
+from src.retry_queue import RetryQueue
+from src.outbox import SendOutbox
+from src.result_sink import ResultSink
+from src.http_transport import PooledTwilioHttpClient, transport_settings_from_env
+from src.metrics import SenderMetrics
+
 logger = logging.getLogger(__name__)
 
+RETRYABLE_CODES = [20429, 20003, 20005]
+MAX_ERRORS_KEPT = 100
+
+
+class SenderBase:
+    """Result handling shared by the sync and async senders; subclasses set stats, limiter, metrics and http_client"""
+    
+    def _new_result(self, to_number: str, template_sid: str, first_name: str) -> Dict:
+        return {
+            'to': to_number,
+            'first_name': first_name,
+            'template_sid': template_sid,
+            'status': 'unknown',
+            'message_sid': None,
+            'error': None,
+            'attempts': 0
+        }
+    
+    def _message_params(self, result: Dict) -> Dict:
+        return {
+            'from_': f"whatsapp:{self.whatsapp_number}",
+            'to': f"whatsapp:{result['to']}",
+            'content_sid': result['template_sid'],
+            'content_variables': f'{{"1":"{result["first_name"]}"}}',
+            'status_callback': self.status_callback or values.unset
+        }
+    
+    def _record_sent(self, result: Dict, message):
+        result['status'] = 'sent'
+        result['message_sid'] = message.sid
+        self.stats['sent'] += 1
+        self.limiter.on_success()
+        self.metrics.record_result('sent')
+        
+        logger.info(f"✓ Sent to {result['to']} (SID: {message.sid})")
+    
+    def _record_failure(self, result: Dict):
+        self.stats['failed'] += 1
+        self.stats['errors'].append(result['error'])
+        code = str(result['error']['code'])
+        self.stats['error_counts'][code] = self.stats['error_counts'].get(code, 0) + 1
+        self.metrics.record_result('failed', code)
+    
+    def _record_error(self, result: Dict, error: Exception, attempt: int, retry_count: int) -> Optional[float]:
+        """Returns the backoff before the next attempt, or None once the result is final"""
+        to_number = result['to']
+        
+        if isinstance(error, TwilioRestException):
+            result['error'] = {'code': error.code, 'message': str(error.msg), 'attempt': attempt + 1}
+            self.limiter.on_error(error.code)
+            
+            if error.code in RETRYABLE_CODES and attempt < retry_count - 1:
+                wait_time = 2 ** attempt
+                self.metrics.record_retry(error.code)
+                logger.warning(f"⚠ Retry {attempt + 1}/{retry_count} for {to_number} in {wait_time}s")
+                return wait_time
+            
+            result['status'] = 'failed'
+            self._record_failure(result)
+            logger.error(f"✗ Failed to send to {to_number}: Error {error.code} - {error.msg}")
+            return None
+        
+        result['status'] = 'failed'
+        result['error'] = {'code': 'UNEXPECTED', 'message': str(error), 'attempt': attempt + 1}
+        self._record_failure(result)
+        logger.error(f"✗ Unexpected error for {to_number}: {error}")
+        return None
+    
+    def _stats_snapshot(self) -> Dict:
+        return {'sent': self.stats['sent'], 'failed': self.stats['failed'], 'error_counts': dict(self.stats['error_counts'])}
+    
+    def _batch_summary(self, before: Dict, attempted: int, elapsed_time: float, results: List[Dict], sink: Optional[ResultSink] = None) -> Dict:
+        """Counts of this batch only: self.stats keeps running totals across batches"""
+        sent = self.stats['sent'] - before['sent']
+        failed = self.stats['failed'] - before['failed']
+        error_counts = {code: count - before['error_counts'].get(code, 0) for code, count in self.stats['error_counts'].items()}
+        
+        summary = {
+            'total_attempted': attempted,
+            'sent': sent,
+            'failed': failed,
+            'success_rate': (sent / attempted * 100) if attempted else 0,
+            'elapsed_time_seconds': elapsed_time,
+            'messages_per_second': attempted / elapsed_time if elapsed_time > 0 else 0,
+            'errors': list(self.stats['errors'])[-failed:] if failed else [],
+            'error_counts': {code: count for code, count in error_counts.items() if count},
+            'detailed_results': results
+        }
+        if sink is not None:
+            summary['results_file'] = sink.path
+        
+        self._log_http_stats()
+        logger.info(f"Batch complete: {summary['sent']:,} sent, {summary['failed']:,} failed ({summary['success_rate']:.1f}% success)")
+        
+        return summary
+    
+    def get_stats(self) -> Dict:
+        stats = self.stats.copy()
+        stats['errors'] = list(stats['errors'])
+        stats['error_counts'] = dict(stats['error_counts'])
+        stats['current_rate'] = self.limiter.current_rate
+        if hasattr(self.http_client, 'pool_stats'):
+            stats['http'] = self.http_client.pool_stats()
+        stats['metrics'] = self.metrics.snapshot()
+        return stats
+    
+    def _log_http_stats(self):
+        if hasattr(self.http_client, 'pool_stats'):
+            http = self.http_client.pool_stats()
+            logger.info(f"HTTP pool: {http['requests']:,} requests over {http['connections_opened']:,} connections "
+                        f"(peak in flight: {http['peak_in_flight']}/{http['pool_size']}, errors: {http['errors']:,})")
+
 
-class WhatsAppSender:
+class WhatsAppSender(SenderBase):
     """Sends WhatsApp messages via Twilio API"""
     
-    def __init__(self, account_sid: str, auth_token: str, whatsapp_number: str, rate_limit: int = 10):
-        self.client = Client(account_sid, auth_token)
+    def __init__(self, account_sid: str, auth_token: str, whatsapp_number: str, rate_limit: int = 10, subaccount_sid: Optional[str] = None,
+                 limiter: Optional[TokenBucket] = None, http_client: Optional[HttpClient] = None, status_callback: Optional[str] = None,
+                 metrics: Optional[SenderMetrics] = None, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.http_client = http_client or PooledTwilioHttpClient(pool_size=1)
+        self.client = Client(account_sid, auth_token, account_sid=subaccount_sid, http_client=self.http_client)
         self.whatsapp_number = whatsapp_number
         self.rate_limit = rate_limit
-        self.min_interval = 1.0 / rate_limit if rate_limit > 0 else 0
-        self.last_send_time = 0
+        self.limiter = limiter or TokenBucket(rate_limit, capacity=1, clock=clock, sleep=sleep)
+        self.status_callback = status_callback
+        self.clock = clock
+        self.sleep = sleep
+        self.metrics = metrics or SenderMetrics(whatsapp_number, rate_source=lambda: self.limiter.current_rate, clock=clock)
         
-        self.stats = {'sent': 0, 'failed': 0, 'errors': []}
+        self.stats = {'sent': 0, 'failed': 0, 'errors': deque(maxlen=MAX_ERRORS_KEPT), 'error_counts': {}}
         
         logger.info(f"WhatsApp Sender initialized (rate: {rate_limit} msg/sec)")
     
     def _enforce_rate_limit(self):
-        if self.rate_limit > 0:
-            elapsed = time.time() - self.last_send_time
-            if elapsed < self.min_interval:
-                sleep_time = self.min_interval - elapsed
-                time.sleep(sleep_time)
+        self.metrics.observe_limiter_wait(self.limiter.acquire())
     
-    def send_template_message(self, to_number: str, template_sid: str, first_name: str, retry_count: int = 3) -> Dict:
+    def _create_message(self, result: Dict):
+        self.metrics.call_started()
+        call_start = self.metrics.clock()
+        outcome = 'UNEXPECTED'
+        try:
+            message = self.client.messages.create(**self._message_params(result))
+            outcome = 'ok'
+            return message
+        except TwilioRestException as e:
+            outcome = str(e.code)
+            raise
+        finally:
+            self.metrics.call_finished(self.metrics.clock() - call_start, outcome)
+    
+    def _attempt_send(self, result: Dict, attempt: int, retry_count: int) -> Optional[float]:
+        """Makes one send attempt; returns the backoff before the next one, or None once the result is final"""
         self._enforce_rate_limit()
         
-        result = {
-            'to': to_number,
-            'first_name': first_name,
-            'template_sid': template_sid,
-            'status': 'unknown',
-            'message_sid': None,
-            'error': None
-        }
+        result['attempts'] = attempt + 1
         
-        from_whatsapp = f"whatsapp:{self.whatsapp_number}"
-        to_whatsapp = f"whatsapp:{to_number}"
+        try:
+            message = self._create_message(result)
+        except Exception as e:
+            return self._record_error(result, e, attempt, retry_count)
+        
+        self._record_sent(result, message)
+        return None
+    
+    def send_template_message(self, to_number: str, template_sid: str, first_name: str, retry_count: int = 3) -> Dict:
+        result = self._new_result(to_number, template_sid, first_name)
         
         for attempt in range(retry_count):
-            try:
-                message = self.client.messages.create(
-                    from_=from_whatsapp,
-                    to=to_whatsapp,
-                    content_sid=template_sid,
-                    content_variables=f'{{"1":"{first_name}"}}'
-                )
-                
-                result['status'] = 'sent'
-                result['message_sid'] = message.sid
-                self.stats['sent'] += 1
-                
-                logger.info(f"✓ Sent to {to_number} (SID: {message.sid})")
-                
-                self.last_send_time = time.time()
-                return result
-                
-            except TwilioRestException as e:
-                result['error'] = {'code': e.code, 'message': str(e.msg), 'attempt': attempt + 1}
-                
-                retryable_codes = [20429, 20003, 20005]
-                
-                if e.code in retryable_codes and attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.warning(f"⚠ Retry {attempt + 1}/{retry_count} for {to_number}. Waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    result['status'] = 'failed'
-                    self.stats['failed'] += 1
-                    self.stats['errors'].append(result['error'])
-                    logger.error(f"✗ Failed to send to {to_number}: Error {e.code} - {e.msg}")
-                    return result
-            
-            except Exception as e:
-                result['status'] = 'failed'
-                result['error'] = {'code': 'UNEXPECTED', 'message': str(e), 'attempt': attempt + 1}
-                self.stats['failed'] += 1
-                self.stats['errors'].append(result['error'])
-                logger.error(f"✗ Unexpected error for {to_number}: {e}")
-                return result
+            wait_time = self._attempt_send(result, attempt, retry_count)
+            if wait_time is None:
+                break
+            self.sleep(wait_time)
         
         return result
     
-    def send_batch(self, contacts: List[Dict], template_sid: str, test_mode: bool = False, test_limit: int = 5) -> Dict:
+    def _send_or_park(self, result: Dict, attempt: int, retries: RetryQueue, retry_count: int, outbox: Optional[SendOutbox] = None, sink: Optional[ResultSink] = None):
+        wait_time = self._attempt_send(result, attempt, retry_count)
+        if wait_time is not None:
+            retries.push(self.clock() + wait_time, (result, attempt + 1))
+            return
+        if outbox is not None:
+            outbox.record(result)
+        if sink is not None:
+            sink.write(result)
+    
+    def send_batch(self, contacts: List[Dict], template_sid: str, test_mode: bool = False, test_limit: int = 5, retry_count: int = 3,
+                   outbox: Optional[SendOutbox] = None, sink: Optional[ResultSink] = None) -> Dict:
+        """With a sink, results are streamed to it and detailed_results stays empty"""
         if test_mode:
             logger.warning(f"🧪 TEST MODE: Limiting to {test_limit} messages")
             contacts = contacts[:test_limit]
@@ -99,9 +214,15 @@ class WhatsAppSender:
         logger.info(f"Starting batch send: {len(contacts):,} contacts")
         
         results = []
-        start_time = time.time()
+        attempted = 0
+        retries = RetryQueue()
+        before = self._stats_snapshot()
+        start_time = self.clock()
         
         for i, contact in enumerate(contacts, 1):
+            for result, attempt in retries.pop_due(self.clock()):
+                self._send_or_park(result, attempt, retries, retry_count, outbox, sink)
+            
             phone = contact.get('client_phone')
             first_name = contact.get('first_name', 'Client')
             
@@ -109,31 +230,28 @@ class WhatsAppSender:
                 logger.warning(f"Skipping contact {i}: No phone number")
                 continue
             
-            result = self.send_template_message(to_number=phone, template_sid=template_sid, first_name=first_name)
-            results.append(result)
+            result = self._new_result(phone, template_sid, first_name)
+            attempted += 1
+            if sink is None:
+                results.append(result)
+            if outbox is not None:
+                outbox.claim(phone, first_name, template_sid)
+            self._send_or_park(result, 0, retries, retry_count, outbox, sink)
             
             if i % 100 == 0:
                 logger.info(f"Progress: {i:,}/{len(contacts):,} ({i/len(contacts)*100:.1f}%)")
         
-        elapsed_time = time.time() - start_time
+        while retries:
+            self.sleep(max(0.0, retries.next_due() - self.clock()))
+            for result, attempt in retries.pop_due(self.clock()):
+                self._send_or_park(result, attempt, retries, retry_count, outbox, sink)
         
-        summary = {
-            'total_attempted': len(results),
-            'sent': self.stats['sent'],
-            'failed': self.stats['failed'],
-            'success_rate': (self.stats['sent'] / len(results) * 100) if results else 0,
-            'elapsed_time_seconds': elapsed_time,
-            'messages_per_second': len(results) / elapsed_time if elapsed_time > 0 else 0,
-            'errors': self.stats['errors'],
-            'detailed_results': results
-        }
+        if outbox is not None:
+            outbox.flush()
         
-        logger.info(f"Batch complete: {summary['sent']:,} sent, {summary['failed']:,} failed ({summary['success_rate']:.1f}% success)")
+        elapsed_time = self.clock() - start_time
         
-        return summary
-    
-    def get_stats(self) -> Dict:
-        return self.stats.copy()
+        return self._batch_summary(before, attempted, elapsed_time, results, sink)
 
 
 def create_sender_from_env() -> WhatsAppSender:
@@ -145,4 +263,8 @@ def create_sender_from_env() -> WhatsAppSender:
     if not all([account_sid, auth_token, whatsapp_number]):
         raise ValueError("Missing required environment variables")
     
-    return WhatsAppSender(account_sid=account_sid, auth_token=auth_token, whatsapp_number=whatsapp_number, rate_limit=rate_limit)
+    limiter = create_limiter_from_env(rate_limit, capacity=1)
+    http_client = PooledTwilioHttpClient(pool_size=1, **transport_settings_from_env())
+    
+    return WhatsAppSender(account_sid=account_sid, auth_token=auth_token, whatsapp_number=whatsapp_number, rate_limit=rate_limit, limiter=limiter,
+                          http_client=http_client, status_callback=os.getenv('STATUS_CALLBACK_URL'))